@@ -0,0 +1,39 @@
+import random
+
+from django.test import override_settings
+
+from forum.models import Forum
+from user.models import User
+
+# seeded accounts only exist to own and join forums; hashing their passwords with
+# the production work factor would make seeding dominate the run
+SEED_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+def seed_users(count: int, prefix: str = "seed") -> list:
+    with override_settings(PASSWORD_HASHERS=SEED_HASHERS):
+        return [User.register(f"{prefix} user {number}", f"{prefix}{number}", "password") for number in range(count)]
+
+
+def seed_forums(users: list, count: int, participants: int, seed: int = 0) -> list:
+    """
+    Create `count` forums through `Forum.create_forum_with_users`, each started
+    by a random seeded user with `participants` other random users waiting.
+    The users are already loaded, so they are not looked up again.
+    """
+    randomizer = random.Random(seed)
+    forums = []
+    for number in range(count):
+        initiator, *members = randomizer.sample(users, min(len(users), participants + 1))
+        forums.append(Forum.create_forum_with_users(
+            topic=f"seeded forum {number}",
+            description=f"description of seeded forum {number}",
+            initiator=initiator,
+            users=members,
+        ))
+    return forums
+
+
+def seed(users: int, forums: int, participants: int, seed: int = 0) -> dict:
+    seeded_users = seed_users(users)
+    return {"users": seeded_users, "forums": seed_forums(seeded_users, forums, participants, seed)}
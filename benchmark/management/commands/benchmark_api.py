@@ -0,0 +1,106 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmark.generators import seed
+from benchmark.runner import run_scenario, unthrottled
+from benchmark.scenarios import get_scenarios
+from util.benchmark import isolated_database
+
+SCENARIOS = list(get_scenarios(0))
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and replay each API scenario in-process, reporting req/s, "
+        "p50/p95/p99 latency and queries per request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500, help="seeded users")
+        parser.add_argument("--forums", type=int, default=50, help="seeded forums")
+        parser.add_argument("--participants", type=int, default=50, help="participants per seeded forum")
+        parser.add_argument("--create-participants", type=int, default=200, help="participants per create_forum request")
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument("--db-name", help="on-disk SQLite file instead of the in-memory test database")
+        parser.add_argument("--json", help="write the results to this file")
+        parser.add_argument("--compare", help="results file from an earlier run to diff against")
+
+    def handle(self, *args, **options):
+        if options["participants"] >= options["users"]:
+            raise CommandError("--participants must be lower than --users")
+        baseline = self.load(options["compare"]) if options["compare"] else {}
+
+        results = []
+        with isolated_database(name=options["db_name"]), unthrottled():
+            data = seed(options["users"], options["forums"], options["participants"])
+            scenarios = get_scenarios(options["create_participants"])
+
+            self.stdout.write(
+                f"{'scenario':>16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}"
+            )
+            for name in options["scenarios"]:
+                result = run_scenario(scenarios[name], data, options["iterations"], options["warmup"])
+                results.append(result)
+                self.stdout.write(
+                    f"{name:>16} {result['rate']:>9.1f} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+                    f"{result['p99']:>8.2f} {result['queries']:>8.1f} {result['errors']:>7}"
+                )
+            vendor = connection.vendor
+
+        if baseline:
+            self.write_comparison(baseline, results)
+        if options["json"]:
+            report = {"meta": self.get_meta(options, vendor), "results": results}
+            with open(options["json"], "w") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"results written to {options['json']}")
+
+    def get_meta(self, options: dict, vendor: str) -> dict:
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        parameters = ("users", "forums", "participants", "create_participants", "iterations", "warmup")
+        return {
+            "commit": commit,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": vendor,
+            "hashers": settings.PASSWORD_HASHERS[:1],
+            **{name: options[name] for name in parameters},
+        }
+
+    def load(self, path: str) -> dict:
+        try:
+            with open(path) as file:
+                report = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"cannot read {path}: {error}")
+        return {result["scenario"]: result for result in report["results"]}
+
+    def write_comparison(self, baseline: dict, results: list):
+        self.stdout.write(f"\n{'scenario':>16} {'req/s':>9} {'p95':>9} {'queries':>9}   (change against --compare)")
+        for result in results:
+            before = baseline.get(result["scenario"])
+            if before is None:
+                continue
+            changes = [
+                self.change(before[field], result[field])
+                for field in ("rate", "p95", "queries")
+            ]
+            self.stdout.write(f"{result['scenario']:>16} {changes[0]:>9} {changes[1]:>9} {changes[2]:>9}")
+
+    def change(self, before: float, after: float) -> str:
+        if not before:
+            return "n/a"
+        return f"{(after - before) / before * 100:+.1f}%"
@@ -0,0 +1,56 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.test import override_settings
+
+from util.queries import record_queries
+
+
+def unthrottled():
+    """Lift the login throttles, which would otherwise reject most of a run."""
+    rates = {scope: "1000000/second" for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+def percentiles(latencies: list) -> dict:
+    if len(latencies) < 2:
+        value = latencies[0] if latencies else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {"p50": quantiles[49], "p95": quantiles[94], "p99": quantiles[98]}
+
+
+def run_scenario(scenario, data: dict, iterations: int, warmup: int = 0) -> dict:
+    """
+    Replay `scenario` sequentially in-process: `warmup` untimed requests, then
+    `iterations` timed ones. Latencies are in milliseconds; `queries` is the
+    mean number of SQL queries per request.
+    """
+    scenario.setup(data, warmup + iterations)
+    for number in range(warmup):
+        scenario.run(number)
+
+    latencies = []
+    queries = 0
+    errors = 0
+    started = time.perf_counter()
+    for number in range(warmup, warmup + iterations):
+        with record_queries() as recorder:
+            start = time.perf_counter()
+            status = scenario.run(number)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries += recorder.count
+        if status >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": scenario.name,
+        "requests": iterations,
+        "errors": errors,
+        "rate": iterations / elapsed if elapsed else 0.0,
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        **percentiles(latencies),
+        "queries": queries / iterations if iterations else 0.0,
+    }
@@ -0,0 +1,121 @@
+import random
+
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from forum.models import Forum
+from user.models import User
+
+
+class Scenario:
+    """
+    One kind of request, replayed by the runner. `setup` runs once against the
+    seeded data before any timing; `run` performs request number `number` and
+    returns its HTTP status.
+    """
+
+    name = None
+
+    def setup(self, data: dict, iterations: int):
+        self.client = APIClient()
+
+    def authenticate(self, user: User):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {user.generate_token()["access"]}')
+
+    def run(self, number: int) -> int:
+        raise NotImplementedError
+
+
+class RegisterScenario(Scenario):
+    name = "register"
+
+    def run(self, number):
+        data = {"name": f"Benchmark User {number}", "username": f"benchmark{number}", "password": "password"}
+        return self.client.post('/users/auth/register/', data, format='json').status_code
+
+
+class LoginScenario(Scenario):
+    name = "login"
+
+    def setup(self, data, iterations):
+        super().setup(data, iterations)
+        # registered with the configured hashers, unlike the seeded users
+        User.register("Benchmark Login", "benchmark-login", "password")
+
+    def run(self, number):
+        data = {"username": "benchmark-login", "password": "password"}
+        return self.client.post('/users/auth/login/', data, format='json').status_code
+
+
+class CreateForumScenario(Scenario):
+    name = "create_forum"
+
+    def __init__(self, participants: int):
+        self.participants = participants
+
+    def setup(self, data, iterations):
+        super().setup(data, iterations)
+        self.initiator, *users = data["users"]
+        self.user_ids = [user.id for user in users]
+        self.random = random.Random(0)
+        self.authenticate(self.initiator)
+
+    def run(self, number):
+        participants = self.random.sample(self.user_ids, min(self.participants, len(self.user_ids)))
+        data = {"topic": f"benchmark forum {number}", "description": "benchmark", "participants": participants}
+        return self.client.post('/forums/', data, format='json').status_code
+
+
+class CloseForumScenario(Scenario):
+    """`Forum.close_by` has no endpoint yet, so this one calls the model inside a request-like transaction."""
+
+    name = "close_by"
+
+    def setup(self, data, iterations):
+        super().setup(data, iterations)
+        self.initiator, participant = data["users"][:2]
+        self.forums = [
+            Forum.create_forum(f"closing forum {number}", "benchmark", self.initiator, [participant.id])
+            for number in range(iterations)
+        ]
+
+    def run(self, number):
+        with transaction.atomic():
+            self.forums[number % len(self.forums)].close_by(self.initiator)
+        return 200
+
+
+class ForumListScenario(Scenario):
+    name = "forum_list"
+
+    def setup(self, data, iterations):
+        super().setup(data, iterations)
+        self.authenticate(data["users"][0])
+
+    def run(self, number):
+        return self.client.get('/forums/').status_code
+
+
+class ParticipantListScenario(Scenario):
+    name = "participant_list"
+
+    def setup(self, data, iterations):
+        super().setup(data, iterations)
+        self.authenticate(data["users"][0])
+        self.forum_ids = [forum.id for forum in data["forums"]]
+
+    def run(self, number):
+        forum_id = self.forum_ids[number % len(self.forum_ids)]
+        return self.client.get(f'/forums/{forum_id}/participants/').status_code
+
+
+def get_scenarios(create_participants: int) -> dict:
+    scenarios = [
+        RegisterScenario(),
+        LoginScenario(),
+        CreateForumScenario(create_participants),
+        CloseForumScenario(),
+        ForumListScenario(),
+        ParticipantListScenario(),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from forum.models import Forum, ForumParticipant
+from user.last_login import last_logins
+from user.models import User
+from .generators import seed
+from .runner import percentiles, run_scenario, unthrottled
+from .scenarios import get_scenarios
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        self.data = seed(users=6, forums=2, participants=3)
+        self.scenarios = get_scenarios(create_participants=4)
+
+    def tearDown(self):
+        last_logins.clear()
+
+    def test_seed_goes_through_the_models(self):
+        self.assertEqual(User.objects.count(), 6)
+        self.assertEqual(Forum.objects.count(), 2)
+        self.assertEqual(ForumParticipant.objects.count(), 8)
+        self.assertEqual([forum.waiting_count for forum in self.data["forums"]], [3, 3])
+
+    def test_run_scenario_reports_latency_and_queries(self):
+        result = run_scenario(self.scenarios["participant_list"], self.data, iterations=4, warmup=1)
+
+        self.assertEqual(result["scenario"], "participant_list")
+        self.assertEqual(result["requests"], 4)
+        self.assertEqual(result["errors"], 0)
+        self.assertEqual(result["queries"], 2)
+        self.assertGreater(result["rate"], 0)
+        self.assertLessEqual(result["p50"], result["p99"])
+
+    def test_write_scenarios_succeed(self):
+        with unthrottled():
+            for name in ("create_forum", "close_by"):
+                result = run_scenario(self.scenarios[name], self.data, iterations=2)
+                self.assertEqual(result["errors"], 0, name)
+
+        self.assertEqual(Forum.objects.filter(status=Forum.CLOSED).count(), 2)
+
+    def test_percentiles(self):
+        self.assertEqual(percentiles([5.0]), {"p50": 5.0, "p95": 5.0, "p99": 5.0})
+        self.assertEqual(percentiles(list(range(1, 102)))["p50"], 51)
@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import async_views
+
+
+app_name = 'forum-async'
+
+urlpatterns = [
+    path('', async_views.forums, name='forum-list'),
+    path('events/', async_views.events, name='forum-events'),
+    path('<int:pk>/', async_views.forum_detail, name='forum-detail'),
+    path('<int:pk>/participants/', async_views.participants, name='forum-participants'),
+    path('<int:pk>/stream/', async_views.stream, name='forum-stream'),
+]
@@ -0,0 +1,244 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import MethodNotAllowed, ValidationError
+
+from user.authentication import token_required
+from util.pagination import KeysetPagination
+from util.pubsub import SlowConsumer, hub
+from util.routers import use_primary
+from util.views import async_api_view, conditional_response, get_json_body, set_validators
+from .models import Forum, ForumEvent
+from .serializers import (
+    AddParticipantsSerializer,
+    CreateForumSerializer,
+    ForumEventPollSerializer,
+    ForumEventSerializer,
+    ForumSerializer,
+    ForumStreamSerializer,
+    ParticipantSerializer,
+)
+
+# events replayed per query when a stream resumes
+REPLAY_BATCH_SIZE = 500
+
+User = get_user_model()
+
+
+@async_api_view
+@token_required
+async def forums(request):
+    if request.method == 'POST':
+        return await create_forum(request)
+    if request.method == 'GET':
+        return await list_forums(request)
+    raise MethodNotAllowed(request.method)
+
+
+async def list_forums(request):
+    paginator = KeysetPagination()
+    paginator.request = request
+    queryset = paginator.get_page_queryset(Forum.objects.all(), request.GET)
+    page = paginator.set_page([forum async for forum in queryset])
+
+    serializer = ForumSerializer(page, many=True)
+    return JsonResponse({"next": paginator.get_next_link(), "results": serializer.data})
+
+
+async def create_forum(request):
+    serializer = CreateForumSerializer(data=get_json_body(request))
+    serializer.is_valid(raise_exception=True)
+    validated_data = serializer.validated_data
+
+    forum = await Forum.acreate_forum(
+        topic=validated_data["topic"],
+        description=validated_data.get("description"),
+        initiator=await User.aget_active_user(request.user.id),
+        participants=validated_data["participants"],
+    )
+
+    return JsonResponse(ForumSerializer(forum).data, status=201)
+
+
+@async_api_view
+@token_required
+async def forum_detail(request, pk):
+    if request.method != 'GET':
+        raise MethodNotAllowed(request.method)
+
+    forum = await Forum.aget_forum(pk)
+    validators = forum.get_validators('detail')
+    response = conditional_response(request, *validators)
+    if response is not None:
+        return response
+    return set_validators(JsonResponse(ForumSerializer(forum).data), *validators)
+
+
+@async_api_view
+@token_required
+async def participants(request, pk):
+    if request.method == 'POST':
+        return await add_participants(request, pk)
+    if request.method == 'GET':
+        return await list_participants(request, pk)
+    raise MethodNotAllowed(request.method)
+
+
+async def list_participants(request, pk):
+    forum = await Forum.aget_forum(pk)
+    validators = forum.get_validators('participants')
+    response = conditional_response(request, *validators)
+    if response is not None:
+        return response
+
+    paginator = KeysetPagination()
+    paginator.request = request
+    queryset = paginator.get_page_queryset(forum.get_participants().with_users(), request.GET)
+    page = paginator.set_page([participant async for participant in queryset])
+
+    serializer = ParticipantSerializer(page, many=True)
+    response = JsonResponse({"next": paginator.get_next_link(), "results": serializer.data})
+    return set_validators(response, *validators)
+
+
+async def add_participants(request, pk):
+    serializer = AddParticipantsSerializer(data=get_json_body(request))
+    serializer.is_valid(raise_exception=True)
+
+    forum = await Forum.aget_forum(pk)
+    if request.user.id != forum.initiator_id:
+        raise ValidationError("only initiator user can add participants")
+    users = await User.aget_active_users(serializer.validated_data["participants"])
+    participants = await forum.aadd_participants(users)
+
+    return JsonResponse({"participants": [participant.id for participant in participants]}, status=201)
+
+
+@async_api_view
+@token_required
+async def events(request):
+    """
+    Long-poll the change feed: answer as soon as there are events after
+    `after`, or with an empty page once `wait` seconds have passed. The feed
+    is read again when an event is published, and every
+    FORUM_EVENTS_POLL_INTERVAL seconds for events the hub does not reach.
+    """
+    if request.method != 'GET':
+        raise MethodNotAllowed(request.method)
+
+    serializer = ForumEventPollSerializer(data=request.GET)
+    serializer.is_valid(raise_exception=True)
+    after, limit = serializer.validated_data["after"], serializer.validated_data["limit"]
+    deadline = time.monotonic() + serializer.validated_data["wait"]
+
+    # subscribe before the first read, so an event committed in between wakes us
+    subscription = hub.subscribe(ForumEvent.FEED_TOPIC)
+    try:
+        woken = False
+        while True:
+            events = await get_events(after, limit, primary=woken)
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                break
+            try:
+                message = await subscription.get(timeout=min(settings.FORUM_EVENTS_POLL_INTERVAL, remaining))
+            except SlowConsumer:
+                subscription = hub.subscribe(ForumEvent.FEED_TOPIC)
+                message = {}
+            woken = message is not None
+    finally:
+        subscription.close()
+
+    return JsonResponse({
+        "after": events[-1].id if events else after,
+        "results": ForumEventSerializer(events, many=True).data,
+    })
+
+
+async def get_events(after: int, limit: int, primary: bool):
+    if not primary:
+        return [event async for event in ForumEvent.get_events(after, limit)]
+    # the event that woke the poll may not have reached the replicas yet
+    with use_primary():
+        return [event async for event in ForumEvent.get_events(after, limit)]
+
+
+@async_api_view
+@token_required
+async def stream(request, pk):
+    """
+    Server-sent events for one forum: participants added, participant status
+    changes and the forum closing, as they commit. Each event's id is its change
+    feed id, so a client resuming with Last-Event-ID (or `after`) first gets
+    what it missed. The stream ends after `forum.closed`, when the client falls
+    too far behind, and after FORUM_STREAM_MAX_AGE; answering a closed forum
+    with 204 tells EventSource to stop reconnecting.
+    """
+    if request.method != 'GET':
+        raise MethodNotAllowed(request.method)
+
+    serializer = ForumStreamSerializer(data=request.GET)
+    serializer.is_valid(raise_exception=True)
+    after = serializer.validated_data.get("after")
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    if last_event_id.isdigit():
+        after = int(last_event_id)
+
+    forum = await Forum.aget_forum(pk)
+    if forum.status == Forum.CLOSED and (after is None or not await forum.events.filter(id__gt=after).aexists()):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(stream_events(forum.id, after), content_type='text/event-stream')
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def stream_events(forum_id: int, after: int = None):
+    deadline = time.monotonic() + settings.FORUM_STREAM_MAX_AGE
+    # subscribed here, so a response that is never iterated holds no subscription,
+    # and before reading the backlog, so nothing committed in between is missed
+    subscription = hub.subscribe(ForumEvent.get_topic(forum_id))
+    try:
+        replayed = after or 0
+        while after is not None:
+            # from the primary: a lagging replica could miss events already published before we subscribed
+            with use_primary():
+                events = [event async for event in ForumEvent.get_forum_events(forum_id, replayed, REPLAY_BATCH_SIZE)]
+            for event in events:
+                replayed = event.id
+                yield format_event(event.as_message())
+                if event.kind == ForumEvent.FORUM_CLOSED:
+                    return
+            if len(events) < REPLAY_BATCH_SIZE:
+                break
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                message = await subscription.get(timeout=min(settings.FORUM_STREAM_HEARTBEAT, remaining))
+            except SlowConsumer:
+                return
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            if message["id"] <= replayed:
+                # events commit in id order, so the replay already had this one; live
+                # messages are compared with the replay only, as they may arrive out of order
+                continue
+            yield format_event(message)
+            if message["kind"] == ForumEvent.FORUM_CLOSED:
+                return
+    finally:
+        subscription.close()
+
+
+def format_event(message: dict) -> str:
+    data = json.dumps(message, cls=DjangoJSONEncoder)
+    return f"id: {message['id']}\nevent: {message['kind']}\ndata: {data}\n\n"
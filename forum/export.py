@@ -0,0 +1,112 @@
+import csv
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Forum
+from .sharding import is_sharded
+
+User = get_user_model()
+
+FORUM_COLUMNS = (
+    "id",
+    "topic",
+    "description",
+    "status",
+    "closed_at",
+    "initiator",
+    "accepted_count",
+    "denied_count",
+    "waiting_count",
+    "created_at",
+)
+
+PARTICIPANT_COLUMNS = (
+    "id",
+    "user",
+    "name",
+    "username",
+    "initiator",
+    "status",
+    "created_at",
+)
+
+FORMATS = ("ndjson", "csv")
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def forum_rows(chunk_size: int = 2000):
+    """
+    Yield every forum as a tuple of FORUM_COLUMNS values. `iterator()` streams
+    the result in chunks (a server-side cursor on PostgreSQL), so memory stays
+    flat however many forums there are.
+    """
+    fields = ["initiator_id" if column == "initiator" else column for column in FORUM_COLUMNS]
+    return Forum.objects.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def participant_rows(forum: Forum, chunk_size: int = 2000):
+    """
+    Yield a forum's participants, joined to their users, as tuples of
+    PARTICIPANT_COLUMNS values in `get_participants()` order.
+    """
+    if is_sharded():
+        return sharded_participant_rows(forum, chunk_size)
+    queryset = forum.get_participants().values_list(
+        'id', 'user_id', 'user__first_name', 'user__last_name', 'user__username', 'initiator', 'status', 'created_at',
+    )
+    return (
+        (id, user_id, User.format_name(first_name, last_name), username, initiator, status, created_at)
+        for id, user_id, first_name, last_name, username, initiator, status, created_at
+        in queryset.iterator(chunk_size)
+    )
+
+
+def sharded_participant_rows(forum: Forum, chunk_size: int):
+    """
+    `participant_rows` when the users are on another database: one user query
+    per chunk. Like the join, it skips participants whose user row is gone.
+    """
+    rows = forum.get_participants().values_list('id', 'user_id', 'initiator', 'status', 'created_at')
+    rows = rows.iterator(chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        users = User.objects.only('first_name', 'last_name', 'username').in_bulk({row[1] for row in chunk})
+        for id, user_id, initiator, status, created_at in chunk:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            yield (id, user_id, user.name, user.username, initiator, status, created_at)
+
+
+def render_ndjson(columns, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render(output: str, columns, rows):
+    if output == "csv":
+        return render_csv(columns, rows)
+    return render_ndjson(columns, rows)
@@ -0,0 +1,58 @@
+from itertools import islice
+
+from django.utils import timezone
+
+from job.registry import register
+from .models import INVITE_JOB, TOUCH_USER_FORUMS_JOB, WRITE_PARTICIPANTS_JOB, Forum, ForumParticipant
+from .signals import participants_invited
+
+BATCH_SIZE = 500
+
+
+@register(INVITE_JOB)
+def invite_participants(forum_id: int, participant_ids: list = None):
+    """
+    Fan out `participants_invited` for the waiting participants of a forum,
+    all of them for a new forum or `participant_ids` for later invites.
+    """
+    forum = Forum.objects.filter(id=forum_id).first()
+    if forum is None:
+        return
+    participants = forum.get_participants().filter(initiator=False).with_users().order_by('id')
+    if participant_ids is not None:
+        participants = participants.filter(id__in=participant_ids)
+
+    rows = participants.iterator(chunk_size=BATCH_SIZE)
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        participants_invited.send(sender=Forum, forum=forum, participants=batch)
+
+
+@register(TOUCH_USER_FORUMS_JOB)
+def touch_user_forums(user_id: int):
+    """
+    Bump `updated_at` of every forum `user_id` takes part in, so cached
+    participant lists showing their old name fail revalidation.
+    """
+    now = timezone.now()
+    for participants in ForumParticipant.on_every_shard():
+        forum_ids = participants.filter(user_id=user_id).values_list('forum_id', flat=True).iterator(BATCH_SIZE)
+        while True:
+            batch = list(islice(forum_ids, BATCH_SIZE))
+            if not batch:
+                break
+            Forum.objects.filter(id__in=batch).update(updated_at=now)
+
+
+@register(WRITE_PARTICIPANTS_JOB)
+def write_participants(forum_id: int, participants: list):
+    """
+    Insert participants whose shard write failed after their forum committed,
+    see `ForumParticipant.write_on_shard`. Rows already on the shard are skipped.
+    """
+    ForumParticipant.on_shard(forum_id).bulk_create(
+        [ForumParticipant(forum_id=forum_id, **fields) for fields in participants],
+        ignore_conflicts=True,
+    )
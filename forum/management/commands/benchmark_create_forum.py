@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from forum.models import Forum
+from util.benchmark import isolated_database, measure
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Count queries and time spent by Forum.create_forum for growing participant lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000])
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            initiator = User.register("Benchmark Initiator", "benchmark", "password")
+            users = User.objects.bulk_create(
+                User(username=f"benchmark{number}", first_name=f"user {number}")
+                for number in range(max(options["sizes"]))
+            )
+            user_ids = [user.id for user in users]
+
+            self.stdout.write(f"{'participants':>12} {'queries':>8} {'seconds':>10}")
+            for size in options["sizes"]:
+                with transaction.atomic():
+                    with measure() as result:
+                        Forum.create_forum("benchmark", "benchmark", initiator, user_ids[:size])
+                    transaction.set_rollback(True)
+                self.stdout.write(f"{size:>12} {result['queries']:>8} {result['seconds']:>10.4f}")
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from forum.models import Forum, ForumParticipant
+from forum.views import ForumView
+from util.benchmark import isolated_database, measure
+
+User = get_user_model()
+
+STATUSES = (ForumParticipant.WAITING, ForumParticipant.ACCEPT, ForumParticipant.DENY)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the inbox API for a user in many forums against walking User.participants with a "
+        "per-row .forum lookup, on the first page and a deep page"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forums", type=int, default=50000, help="forums the benchmark user participates in")
+        parser.add_argument("--others", type=int, default=2, help="other participants per forum")
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = ForumView.as_view({'get': 'inbox'})
+        page_size = options["page_size"]
+
+        with isolated_database():
+            user = self.seed(options["forums"], options["others"])
+            self.stdout.write(self.get_plan(user, ForumParticipant.WAITING))
+
+            # a cursor halfway through the user's waiting forums
+            middle = ForumParticipant.get_inbox(user.id, ForumParticipant.WAITING).order_by('-created_at', '-id')[
+                options["forums"] // len(STATUSES) // 2
+            ]
+            cursor = view.cls.pagination_class().encode_cursor(middle)
+
+            self.stdout.write(f"\n{'request':>24} {'queries':>8} {'ms':>9}")
+            for label, query in (
+                (None, f"?status={ForumParticipant.ACCEPT}"),  # warm-up
+                ("inbox first page", f"?page_size={page_size}"),
+                ("inbox waiting", f"?status={ForumParticipant.WAITING}&page_size={page_size}"),
+                ("inbox waiting deep page", f"?status={ForumParticipant.WAITING}&page_size={page_size}&cursor={cursor}"),
+            ):
+                request = factory.get(f"/forums/inbox/{query}")
+                force_authenticate(request, user=user)
+                with measure() as result:
+                    view(request).render()
+                if label is not None:
+                    self.stdout.write(f"{label:>24} {result['queries']:>8} {result['seconds'] * 1000:>9.2f}")
+
+            with measure() as result:
+                participants = user.participants.filter(status=ForumParticipant.WAITING).order_by('-created_at')
+                for participant in participants[:page_size]:
+                    participant.forum.initiator
+            self.stdout.write(f"{'per-row .forum':>24} {result['queries']:>8} {result['seconds'] * 1000:>9.2f}")
+
+    def seed(self, forums: int, others: int):
+        user = User.register("Benchmark User", "benchmark", "password")
+        initiator = User.objects.create(username="benchmark-initiator", first_name="Initiator")
+        noise = User.objects.bulk_create(
+            User(username=f"benchmark{number}", first_name=f"user {number}") for number in range(others)
+        )
+        created = Forum.objects.bulk_create(
+            (
+                Forum(topic=f"forum {number}", topic_lowercase=f"forum {number}", initiator=initiator, status=Forum.OPEN)
+                for number in range(forums)
+            ),
+            batch_size=5000,
+        )
+        ForumParticipant.objects.bulk_create(
+            (
+                ForumParticipant(forum=forum, user=participant, status=STATUSES[number % len(STATUSES)])
+                for number, forum in enumerate(created)
+                for participant in [user, *noise]
+            ),
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return user
+
+    def get_plan(self, user, status: int) -> str:
+        participants = ForumParticipant.get_inbox(user.id, status).order_by('-created_at', '-id')
+        sql, params = participants.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {"QUERY PLAN " if connection.vendor == "sqlite" else ""}{sql}', params)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from forum.models import Forum, ForumParticipant
+from forum.views import ForumView
+from util.benchmark import isolated_database
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Time the first and the last page of the participant listing API for growing forums"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10, 10000, 100000])
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = ForumView.as_view({'get': 'participants'})
+
+        with isolated_database():
+            user = User.register("Benchmark Initiator", "benchmark", "password")
+
+            self.stdout.write(f"{'participants':>12} {'first page ms':>14} {'last page ms':>13}")
+            for size in options["sizes"]:
+                forum = Forum(description="benchmark")
+                forum.set_topic("benchmark")
+                forum.save()
+                ForumParticipant.objects.bulk_create(
+                    (ForumParticipant(forum=forum, user=user) for _ in range(size)),
+                    batch_size=5000,
+                )
+
+                # the cursor of the (page size + 1)th oldest row lands on the last page
+                last_page_start = forum.get_participants().reverse()[min(options["page_size"], size - 1)]
+                cursor = view.cls.pagination_class().encode_cursor(last_page_start)
+                timings = []
+                for query in (f"?page_size={options['page_size']}", f"?page_size={options['page_size']}&cursor={cursor}"):
+                    request = factory.get(f"/forums/{forum.id}/participants/{query}")
+                    force_authenticate(request, user=user)
+                    start = time.perf_counter()
+                    view(request, pk=forum.id).render()
+                    timings.append((time.perf_counter() - start) * 1000)
+
+                self.stdout.write(f"{size:>12} {timings[0]:>14.2f} {timings[1]:>13.2f}")
@@ -0,0 +1,50 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from forum.models import Forum
+from forum.search import ScanSearchBackend, get_search_backend
+from util.benchmark import isolated_database
+
+WORDS = (
+    "python django database index query cache forum topic release meeting "
+    "planning review design migration deploy incident backlog roadmap budget "
+    "hiring security performance latency storage network billing support"
+).split() + [f"term{number}" for number in range(20000)]
+
+
+class Command(BaseCommand):
+    help = "Compare full-text forum search against a substring scan over a large generated forum table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forums", type=int, default=1000000)
+        parser.add_argument("--queries", nargs="+", default=["python", "term42", "python review", "incid"])
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        generator = random.Random(0)
+
+        with isolated_database():
+            start = time.perf_counter()
+            for offset in range(0, options["forums"], options["batch_size"]):
+                size = min(options["batch_size"], options["forums"] - offset)
+                forums = []
+                for _ in range(size):
+                    forum = Forum(description=" ".join(generator.choices(WORDS, k=12)))
+                    forum.set_topic(" ".join(generator.choices(WORDS, k=3)))
+                    forums.append(forum)
+                Forum.objects.bulk_create(forums)
+            get_search_backend().rebuild()
+            self.stdout.write(f"seeded and indexed {options['forums']} forums in {time.perf_counter() - start:.1f}s")
+
+            backends = (("index", get_search_backend()), ("scan", ScanSearchBackend()))
+            self.stdout.write(f"{'query':>16} {'backend':>8} {'page 1 ms':>10} {'page 50 ms':>11}")
+            for query in options["queries"]:
+                for name, backend in backends:
+                    timings = []
+                    for offset in (0, 49 * 20):
+                        start = time.perf_counter()
+                        backend.search(query, limit=20, offset=offset)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    self.stdout.write(f"{query:>16} {name:>8} {timings[0]:>10.2f} {timings[1]:>11.2f}")
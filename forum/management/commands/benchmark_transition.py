@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from forum.models import Forum, ForumParticipant
+from util.benchmark import isolated_database, measure
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare bulk participant transitions against one set_status call per row"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--participants", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        size = options["participants"]
+
+        with isolated_database():
+            initiator = User.register("Benchmark Initiator", "benchmark", "password")
+            users = User.objects.bulk_create(
+                User(username=f"benchmark{number}", first_name=f"user {number}")
+                for number in range(size)
+            )
+            forum = Forum.create_forum("benchmark", "benchmark", initiator, [user.id for user in users])
+            participant_ids = list(forum.get_participants().filter(initiator=False).values_list('id', flat=True))
+
+            self.stdout.write(f"{'strategy':>12} {'rows':>8} {'queries':>8} {'seconds':>10}")
+            with transaction.atomic():
+                with measure() as result:
+                    moved = forum.transition_participants_by(initiator, participant_ids, ForumParticipant.ACCEPT)
+                transaction.set_rollback(True)
+            self.stdout.write(f"{'bulk':>12} {len(moved):>8} {result['queries']:>8} {result['seconds']:>10.4f}")
+
+            forum.refresh_from_db()
+            with transaction.atomic():
+                with measure() as result:
+                    for participant in forum.get_participants().filter(initiator=False).select_related('forum'):
+                        participant.set_status(ForumParticipant.ACCEPT)
+                transaction.set_rollback(True)
+            self.stdout.write(f"{'per row':>12} {size:>8} {result['queries']:>8} {result['seconds']:>10.4f}")
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import NotFound
+
+from forum import export
+from forum.models import Forum
+
+
+class Command(BaseCommand):
+    help = "Stream every forum, or one forum's participants, as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forum", type=int, help="export the participants of this forum instead of the forums")
+        parser.add_argument("--output", choices=export.FORMATS, default="ndjson")
+        parser.add_argument("--file", help="write to this path instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["forum"] is None:
+            columns, rows = export.FORUM_COLUMNS, export.forum_rows(options["chunk_size"])
+        else:
+            try:
+                forum = Forum.get_forum(options["forum"])
+            except NotFound as error:
+                raise CommandError(error.detail)
+            columns, rows = export.PARTICIPANT_COLUMNS, export.participant_rows(forum, options["chunk_size"])
+
+        started = time.perf_counter()
+        lines = export.render(options["output"], columns, rows)
+        if options["file"]:
+            with open(options["file"], "w", newline="") as stream:
+                written = self.write_lines(stream.write, lines)
+        else:
+            written = self.write_lines(lambda line: self.stdout.write(line, ending=""), lines)
+
+        if options["output"] == "csv":
+            written -= 1
+        self.stderr.write(f"exported {written} row(s) in {time.perf_counter() - started:.2f}s")
+
+    def write_lines(self, write, lines):
+        count = 0
+        for line in lines:
+            write(line)
+            count += 1
+        return count
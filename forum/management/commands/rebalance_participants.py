@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models.functions import Mod
+
+from forum.models import ForumParticipant
+from forum.sharding import get_shard, is_sharded
+
+
+class Command(BaseCommand):
+    """
+    Shards are picked by forum id modulo the number of shards, so changing
+    that number moves almost every forum to another shard. Until this command
+    has finished, `get_participants()` finds nothing for those forums and
+    adding one of their participants again writes a duplicate on the new
+    shard: stop writes to participants while it runs.
+    """
+    help = (
+        "Move forum participants to the shard their forum id maps to: from the default database after "
+        "DB_SHARDS is first set, and between shards after shards are added or removed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="only count the participants that would move")
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError("DB_SHARDS is not set, participants stay on the default database")
+
+        for source in [DEFAULT_DB_ALIAS, *settings.PARTICIPANT_SHARDS['ALIASES']]:
+            misplaced = self.get_misplaced(source)
+            if options["dry_run"]:
+                self.stdout.write(f"{source}: {misplaced.count()} participant(s) to move")
+                continue
+            moved, conflicts = self.move(misplaced, source, options["batch_size"])
+            self.stdout.write(f"{source}: moved {moved} participant(s)")
+            if conflicts:
+                self.stderr.write(
+                    f"{source}: kept {len(conflicts)} participant(s) whose id is taken on their shard "
+                    f"by another participant: {', '.join(str(id) for id in conflicts)}"
+                )
+
+    def get_misplaced(self, source: str):
+        participants = ForumParticipant.objects.using(source)
+        aliases = settings.PARTICIPANT_SHARDS['ALIASES']
+        if source not in aliases:
+            return participants
+        return participants.alias(shard=Mod('forum_id', len(aliases))).exclude(shard=aliases.index(source))
+
+    def move(self, misplaced, source: str, batch_size: int) -> tuple:
+        """
+        Copy each batch to its shard, then delete from `source` the rows that
+        are now on the shard. A run that stops between the two steps is
+        finished by the next one: rows already copied are skipped as conflicts.
+        A row whose id the shard holds for a different participant is left in
+        place and returned with the conflicts.
+        """
+        moved = 0
+        conflicts = []
+        while True:
+            batch = list(misplaced.exclude(id__in=conflicts).order_by('id')[:batch_size])
+            if not batch:
+                return moved, conflicts
+            by_shard = defaultdict(list)
+            for participant in batch:
+                by_shard[get_shard(participant.forum_id)].append(participant)
+            landed = []
+            for shard, participants in by_shard.items():
+                # plain QuerySet.bulk_create keeps `updated_at`: moving a row does not change it
+                models.QuerySet.bulk_create(
+                    ForumParticipant.objects.using(shard), participants, ignore_conflicts=True,
+                )
+                ids = [participant.id for participant in participants]
+                copies = ForumParticipant.objects.using(shard).in_bulk(ids)
+                for participant in participants:
+                    if self.is_copy(copies.get(participant.id), participant):
+                        landed.append(participant.id)
+                    else:
+                        conflicts.append(participant.id)
+            ForumParticipant.objects.using(source).filter(id__in=landed).delete()
+            moved += len(landed)
+
+    @staticmethod
+    def is_copy(row, participant) -> bool:
+        return row is not None and (row.forum_id, row.user_id) == (participant.forum_id, participant.user_id)
@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from forum.models import Forum, ForumParticipant
+
+COUNTED_FIELDS = ['initiator_id'] + list(ForumParticipant.COUNTER_FIELDS.values())
+
+
+class Command(BaseCommand):
+    help = "Verify the participant counters and initiator stored on every forum and repair the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="only report mismatches, exit with an error if any")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        stale_ids = []
+        last_id = 0
+        # one chunk of forums, and the participant counts of just those, at a time
+        while True:
+            forums = list(Forum.objects.filter(id__gt=last_id).order_by('id').only('id', *COUNTED_FIELDS)[:batch_size])
+            if not forums:
+                break
+            stale = self.get_stale(forums, last_id)
+            last_id = forums[-1].id
+
+            stale_ids += [forum.id for forum in stale]
+            if not options["check"]:
+                Forum.objects.bulk_update(stale, COUNTED_FIELDS, batch_size=batch_size)
+
+        if options["check"]:
+            if stale_ids:
+                raise CommandError(f"{len(stale_ids)} forum(s) have stale counters: {stale_ids}")
+            self.stdout.write("all forum counters are up to date")
+            return
+
+        self.stdout.write(f"repaired {len(stale_ids)} forum(s)")
+
+    def get_stale(self, forums: list, after: int) -> list:
+        """
+        Set the expected counters and initiator on `forums`, the next chunk of
+        forums by id after `after`, and return the ones that drifted.
+        """
+        counts = defaultdict(dict)
+        initiators = {}
+        # every forum's participants are on one shard, so the per-shard counts never overlap
+        for participants in ForumParticipant.on_every_shard():
+            participants = participants.filter(forum_id__gt=after, forum_id__lte=forums[-1].id)
+            rows = (
+                participants.order_by()
+                .values('forum_id', 'status')
+                .annotate(total=Count('id'))
+                .values_list('forum_id', 'status', 'total')
+            )
+            for forum_id, status, total in rows:
+                counts[forum_id][status] = total
+            initiators.update(participants.filter(initiator=True).values_list('forum_id', 'user_id'))
+
+        stale = []
+        for forum in forums:
+            expected = {'initiator_id': initiators.get(forum.id)}
+            for status, name in ForumParticipant.COUNTER_FIELDS.items():
+                expected[name] = counts[forum.id].get(status, 0)
+
+            if any(getattr(forum, name) != value for name, value in expected.items()):
+                for name, value in expected.items():
+                    setattr(forum, name, value)
+                stale.append(forum)
+        return stale
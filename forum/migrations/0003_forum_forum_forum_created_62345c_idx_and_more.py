@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0002_forum_closed_at_forum_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forum',
+            index=models.Index(fields=['created_at', 'id'], name='forum_forum_created_62345c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumparticipant',
+            index=models.Index(fields=['forum', 'created_at'], name='forum_forum_forum_i_544e39_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumparticipant',
+            index=models.Index(fields=['user', 'status'], name='forum_forum_user_id_420fd0_idx'),
+        ),
+    ]
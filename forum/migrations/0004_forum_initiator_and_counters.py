@@ -0,0 +1,66 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_initiator_and_counters(apps, schema_editor):
+    Forum = apps.get_model('forum', 'Forum')
+    ForumParticipant = apps.get_model('forum', 'ForumParticipant')
+    counter_fields = {1: 'accepted_count', 2: 'denied_count', 3: 'waiting_count'}
+    batch_size = 1000
+
+    # one chunk of forums, and the participant counts of just those, at a time
+    last_id = 0
+    while True:
+        forums = {forum.id: forum for forum in Forum.objects.filter(id__gt=last_id).order_by('id')[:batch_size]}
+        if not forums:
+            break
+        participants = ForumParticipant.objects.filter(forum_id__gt=last_id, forum_id__lte=max(forums))
+        last_id = max(forums)
+
+        rows = (
+            participants.order_by()
+            .values('forum_id', 'status')
+            .annotate(total=models.Count('id'))
+            .values_list('forum_id', 'status', 'total')
+        )
+        for forum_id, status, total in rows:
+            setattr(forums[forum_id], counter_fields[status], total)
+        for forum_id, user_id in participants.filter(initiator=True).values_list('forum_id', 'user_id'):
+            forums[forum_id].initiator_id = user_id
+
+        Forum.objects.bulk_update(forums.values(), ['initiator', *counter_fields.values()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forum', '0003_forum_forum_forum_created_62345c_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forum',
+            name='accepted_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forum',
+            name='denied_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forum',
+            name='initiator',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='initiated_forums', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='forum',
+            name='waiting_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_initiator_and_counters, migrations.RunPython.noop),
+    ]
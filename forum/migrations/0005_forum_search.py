@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE forum_forum_search USING fts5(topic, description, tokenize='unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO forum_forum_search (rowid, topic, description) "
+            "SELECT id, topic, COALESCE(description, '') FROM forum_forum"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE forum_forum_search ("
+            "forum_id bigint PRIMARY KEY REFERENCES forum_forum (id) DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX forum_forum_search_document_idx ON forum_forum_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO forum_forum_search (forum_id, document) "
+            "SELECT id, setweight(to_tsvector('simple', topic), 'A') || "
+            "setweight(to_tsvector('simple', COALESCE(description, '')), 'B') FROM forum_forum"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE forum_forum_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0004_forum_initiator_and_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:11
+
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    for name in ('Forum', 'ForumParticipant'):
+        model = apps.get_model('forum', name)
+        model.objects.filter(updated_at__isnull=True).update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0005_forum_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forum',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forumparticipant',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
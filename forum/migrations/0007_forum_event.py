@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0006_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForumEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=32)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('forum', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='events', to='forum.forum')),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0007_forum_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forumparticipant',
+            index=models.Index(fields=['user', 'status', 'created_at', 'id', 'forum'], name='forum_forum_user_id_c3e1e4_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='forumparticipant',
+            name='forum_forum_user_id_420fd0_idx',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forum', '0008_inbox_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forumparticipant',
+            name='forum',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='participants', to='forum.forum'),
+        ),
+        migrations.AlterField(
+            model_name='forumparticipant',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='participants', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
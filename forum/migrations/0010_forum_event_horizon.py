@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 21:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0009_participant_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumevent',
+            name='horizon',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.5 on 2026-10-18 21:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class AlterFieldOffShards(migrations.AlterField):
+    """
+    AlterField that leaves the PARTICIPANT_SHARDS databases alone: their forum
+    and user tables stay empty, so participants there cannot reference them.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias not in settings.PARTICIPANT_SHARDS['ALIASES']:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias not in settings.PARTICIPANT_SHARDS['ALIASES']:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forum', '0010_forum_event_horizon'),
+    ]
+
+    operations = [
+        AlterFieldOffShards(
+            model_name='forumparticipant',
+            name='forum',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='participants', to='forum.forum'),
+        ),
+        AlterFieldOffShards(
+            model_name='forumparticipant',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='participants', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,12 +1,41 @@
-from django.db import models
+import json
+import logging
+from datetime import timedelta
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, models, router, transaction
+from django.db.models import Exists, F, Max, OuterRef, Prefetch, prefetch_related_objects
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError, NotFound
 
-from util.models import BaseModel
+from job.models import Job
+from util.models import BaseManager, BaseModel, BaseQuerySet, Sequence
+from util.pubsub import hub
+from .search import get_search_backend
+from .sharding import get_participant_databases, get_shard, is_sharded
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
+# fans `signals.participants_invited` out from a worker, see `jobs.invite_participants`
+INVITE_JOB = 'forum.invite_participants'
+
+# bumps the forums of a changed user, see `jobs.touch_user_forums`
+TOUCH_USER_FORUMS_JOB = 'forum.touch_user_forums'
+
+# retries a participant insert that failed on its shard, see `ForumParticipant.write_on_shard`
+WRITE_PARTICIPANTS_JOB = 'forum.write_participants'
+
+# user columns shown in participant lists
+PARTICIPANT_USER_FIELDS = {'first_name', 'last_name', 'username'}
+
 
 class Forum(BaseModel):
     topic = models.CharField(max_length=100)
@@ -22,23 +51,107 @@ class Forum(BaseModel):
     status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=OPEN)
     closed_at = models.DateTimeField(null=True)
 
+    initiator = models.ForeignKey(User, on_delete=models.PROTECT, null=True, related_name='initiated_forums')
+    accepted_count = models.PositiveIntegerField(default=0)
+    denied_count = models.PositiveIntegerField(default=0)
+    waiting_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        forum = super().from_db(db, field_names, values)
+        forum._indexed_document = forum.get_search_document()
+        return forum
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        document = self.get_search_document()
+        if document != getattr(self, '_indexed_document', None):
+            get_search_backend().index(self)
+            self._indexed_document = document
+
+    def get_search_document(self):
+        # read through __dict__ so deferred fields are not loaded just to compare them
+        return (self.__dict__.get('topic'), self.__dict__.get('description'))
+
+    @classmethod
+    def search(cls, query: str, limit: int, offset: int = 0):
+        ranks = dict(get_search_backend().search(query, limit, offset))
+        forums = cls.objects.in_bulk(list(ranks))
+        results = []
+        for forum_id, rank in ranks.items():
+            if forum_id in forums:
+                forums[forum_id].rank = rank
+                results.append(forums[forum_id])
+        return results
+
+    @classmethod
+    def get_forum(cls, id):
+        forum = cls.objects.filter(id=id).first()
+        if forum is None:
+            raise NotFound(f'forum with id of {id} not found')
+        return forum
+
+    @classmethod
+    async def aget_forum(cls, id):
+        forum = await cls.objects.filter(id=id).afirst()
+        if forum is None:
+            raise NotFound(f'forum with id of {id} not found')
+        return forum
+
     @classmethod
     def create_forum(cls, topic: str, description: str, initiator: User, participants: list):
         if len(participants) == 0:
             raise ValidationError("cannot create forum with 0 participants")
 
+        users = User.get_active_users(participants)
+        return cls.create_forum_with_users(topic, description, initiator, users)
+
+    @classmethod
+    async def acreate_forum(cls, topic: str, description: str, initiator: User, participants: list):
+        if len(participants) == 0:
+            raise ValidationError("cannot create forum with 0 participants")
+
+        users = await User.aget_active_users(participants)
+        # transactions don't work in async code yet, so the writes run as one
+        # synchronous atomic block on the sync thread
+        create = transaction.atomic(cls.create_forum_with_users)
+        return await sync_to_async(create)(topic, description, initiator, users)
+
+    @classmethod
+    def create_forum_with_users(cls, topic: str, description: str, initiator: User, users: list):
         forum = cls(description=description)
         forum.set_topic(topic)
         forum.save()
         
         ForumParticipant.create_participant(forum, initiator, True)
-
-        for participant_id in participants:
-            user = User.get_active_user(participant_id)
-            forum.add_participant(user)
+        ForumParticipant.create_participants(forum, users, False)
+        ForumEvent.record(
+            forum,
+            ForumEvent.FORUM_CREATED,
+            topic=forum.topic,
+            initiator=initiator.id,
+            participants=[user.id for user in users],
+        )
+        Job.enqueue(INVITE_JOB, forum_id=forum.id)
         
         return forum
     
+    def get_validators(self, representation: str):
+        """
+        ETag and Last-Modified for a representation of this forum. Every
+        participant write goes through `update_counters`, which bumps the
+        forum's `updated_at`, so the row also versions the participant list.
+        The list shows user names too: saving a user bumps their forums from
+        a worker, see `touch_user_forums`.
+        """
+        modified = self.updated_at or self.created_at
+        return f'{representation}-{self.pk}-{modified.timestamp():.6f}', modified
+
     def set_topic(self, name: str):
         self.topic = name
         self.topic_lowercase = name.lower()
@@ -50,28 +163,114 @@ class Forum(BaseModel):
             user=user,
             initiator=False,
         )
+        ForumEvent.record(self, ForumEvent.PARTICIPANTS_ADDED, **ForumEvent.participants_added([participant]))
+        Job.enqueue(INVITE_JOB, forum_id=self.id, participant_ids=[participant.id])
         return participant
 
+    def add_participants(self, users: list):
+        self.check_forum_is_closed()
+        participants = ForumParticipant.create_participants(
+            forum=self,
+            users=users,
+            initiator=False,
+        )
+        ForumEvent.record(self, ForumEvent.PARTICIPANTS_ADDED, **ForumEvent.participants_added(participants))
+        Job.enqueue(INVITE_JOB, forum_id=self.id, participant_ids=[participant.id for participant in participants])
+        return participants
+
+    async def aadd_participants(self, users: list):
+        self.check_forum_is_closed()
+        participants = await ForumParticipant.acreate_participants(
+            forum=self,
+            users=users,
+            initiator=False,
+        )
+        await ForumEvent.arecord(self, ForumEvent.PARTICIPANTS_ADDED, **ForumEvent.participants_added(participants))
+        await Job.aenqueue(INVITE_JOB, forum_id=self.id, participant_ids=[participant.id for participant in participants])
+        return participants
+
     def get_participant_users(self):
-        participants = self.get_participants().select_related('user')
+        participants = self.get_participants().with_users()
         return [participant.user for participant in participants]
     
     def get_participants(self):
-        return ForumParticipant.objects.filter(forum=self).order_by('-created_at')
+        return ForumParticipant.on_shard(self.id).filter(forum=self).order_by('-created_at', '-id')
+
+    def update_counters(self, changes: dict, **fields):
+        """
+        Apply `{participant status: delta}` to the participant counters with one
+        UPDATE using F() expressions, so concurrent changes never overwrite each other.
+        """
+        fields = self.get_counter_updates(changes, **fields)
+        if fields:
+            Forum.objects.filter(pk=self.pk).update(**fields)
+
+    async def aupdate_counters(self, changes: dict, **fields):
+        fields = self.get_counter_updates(changes, **fields)
+        if fields:
+            await Forum.objects.filter(pk=self.pk).aupdate(**fields)
+
+    def get_counter_updates(self, changes: dict, **fields):
+        for status, delta in changes.items():
+            if delta == 0:
+                continue
+            name = ForumParticipant.COUNTER_FIELDS[status]
+            fields[name] = F(name) + delta
+            setattr(self, name, getattr(self, name) + delta)
+        if fields:
+            self.updated_at = fields.setdefault('updated_at', timezone.now())
+        return fields
 
     def close_by(self, user):
         self.check_forum_is_closed()
-        initiator = ForumParticipant.get_initiator(self)
-        if user != initiator:
-            raise ValidationError("only initiator user can close this forum")
+        self.check_initiator(user, "only initiator user can close this forum")
         self.closed_at = timezone.now()
         self.status = self.CLOSED
-        self.save()
+        # only these columns: a full save would write back stale counters over concurrent F() updates
+        self.save(update_fields=['status', 'closed_at', 'updated_at'])
+        ForumEvent.record(self, ForumEvent.FORUM_CLOSED, closed_by=user.id)
     
+    def transition_participants_by(self, user, participant_ids: list, status: int):
+        """
+        Accept or deny waiting participants in bulk. `participant_ids=None` moves
+        every waiting participant. Returns the ids that actually changed.
+        """
+        self.check_forum_is_closed()
+        self.check_initiator(user, "only initiator user can moderate participants")
+        if status not in (ForumParticipant.ACCEPT, ForumParticipant.DENY):
+            raise ValidationError("participants can only be moved to accept or deny")
+
+        ids = ForumParticipant.transition_waiting(self, participant_ids, status)
+        self.update_counters({ForumParticipant.WAITING: -len(ids), status: len(ids)})
+        if ids:
+            ForumEvent.record(self, ForumEvent.PARTICIPANTS_STATUS, participants=ids, status=status)
+        return ids
+
     def check_forum_is_closed(self):
         if self.status == self.CLOSED:
             raise ValidationError("forum already closed")
 
+    def check_initiator(self, user, message: str):
+        if self.initiator_id is None:
+            raise NotFound("initiator not found")
+        if user.id != self.initiator_id:
+            raise ValidationError(message)
+
+
+class ParticipantQuerySet(BaseQuerySet):
+    def with_users(self):
+        # a shard holds no users to join, so there they are loaded with one more query
+        if is_sharded():
+            return self.prefetch_related('user')
+        return self.select_related('user')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not PARTICIPANT_USER_FIELDS & set(update_fields)):
+        return
+    Job.enqueue(TOUCH_USER_FORUMS_JOB, user_id=instance.pk)
+
 
 class ForumParticipant(BaseModel):
     forum = models.ForeignKey(Forum, on_delete=models.PROTECT, related_name='participants')
@@ -88,17 +287,375 @@ class ForumParticipant(BaseModel):
     )
     status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=WAITING)
 
+    COUNTER_FIELDS = {
+        ACCEPT: 'accepted_count',
+        DENY: 'denied_count',
+        WAITING: 'waiting_count',
+    }
+
+    # the participant columns `get_inbox` reads, all held by the inbox index
+    INBOX_FIELDS = (
+        'id', 'user', 'status', 'created_at', 'forum',
+        'forum__topic', 'forum__status', 'forum__closed_at', 'forum__created_at',
+        'forum__initiator__username', 'forum__initiator__first_name', 'forum__initiator__last_name',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['forum', 'created_at']),
+            # inbox: seek to (user, status), read in keyset order, and cover
+            # id and forum so the participant side is an index-only scan
+            models.Index(fields=['user', 'status', 'created_at', 'id', 'forum']),
+        ]
+
+    objects = BaseManager.from_queryset(ParticipantQuerySet)()
+
+    @classmethod
+    def on_shard(cls, forum_id: int):
+        """
+        Participants on the database that holds `forum_id`'s: its shard when
+        PARTICIPANT_SHARDS is set, otherwise wherever the routers send them.
+        """
+        if not is_sharded():
+            return cls.objects.all()
+        return cls.objects.using(get_shard(forum_id))
+
+    @classmethod
+    def on_every_shard(cls) -> list:
+        """One queryset per database holding participants, for reads that span forums."""
+        if not is_sharded():
+            return [cls.objects.all()]
+        return [cls.objects.using(using) for using in get_participant_databases()]
+
+    @classmethod
+    def assign_ids(cls, participants: list):
+        """
+        Give new participants ids from a sequence on the primary when sharded,
+        so an id stays unique when `rebalance_participants` moves its row.
+        """
+        if not is_sharded() or not participants:
+            return participants
+        ids = Sequence.allocate(cls._meta.label, len(participants), cls.get_max_id)
+        for participant, id in zip(participants, ids):
+            participant.id = id
+        return participants
+
+    @classmethod
+    def write_on_shard(cls, write, participants: list):
+        """
+        Run `write`, the insert of new `participants`, once the primary's
+        transaction commits when sharded. A shard commits on its own, so rows
+        written before the primary rolls back would outlive their forum, whose
+        id may be handed out again.
+
+        The rows are also queued as a job in the primary's transaction. The job
+        is dropped once `write` succeeds and retried by a worker when it fails,
+        so the committed counters and events never miss their rows.
+        """
+        if not participants or not is_sharded() or not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            write()
+            return
+
+        # not `Job.enqueue`: the job must commit together with the forum's writes
+        job = Job.objects.create(
+            name=WRITE_PARTICIPANTS_JOB,
+            payload={
+                "forum_id": participants[0].forum_id,
+                "participants": [
+                    {"id": participant.id, "user_id": participant.user_id, "status": participant.status, "initiator": participant.initiator}
+                    for participant in participants
+                ],
+            },
+            # leave the first attempt to the writer
+            run_after=timezone.now() + timedelta(seconds=settings.JOBS['LEASE_SECONDS']),
+        )
+
+        def attempt():
+            try:
+                write()
+            except DatabaseError:
+                logger.warning("could not write participants of forum %s, retrying in job %s", participants[0].forum_id, job.id, exc_info=True)
+                return
+            Job.objects.filter(pk=job.pk, locked_by__isnull=True).delete()
+
+        transaction.on_commit(attempt)
+
+    @classmethod
+    def get_max_id(cls) -> int:
+        # rows stay on the primary until the first rebalance
+        ids = [
+            cls.objects.using(using).aggregate(max_id=Max('id'))['max_id'] or 0
+            for using in {DEFAULT_DB_ALIAS, *get_participant_databases()}
+        ]
+        return max(ids)
+
     @classmethod
     def create_participant(cls, forum: Forum, user: User, initiator: bool):
         participant = cls(forum=forum, user=user, initiator=initiator)
         if initiator is True:
             participant.status = cls.ACCEPT
-        participant.save()
+        cls.assign_ids([participant])
+        cls.write_on_shard(partial(participant.save, force_insert=True), [participant])
+
+        if initiator is True:
+            forum.initiator = user
+            forum.update_counters({participant.status: 1}, initiator=user)
+        else:
+            forum.update_counters({participant.status: 1})
+        return participant
+
+    @classmethod
+    def create_participants(cls, forum: Forum, users: list, initiator: bool):
+        participants = [cls(forum=forum, user=user, initiator=initiator) for user in users]
+        if initiator is True:
+            for participant in participants:
+                participant.status = cls.ACCEPT
+        cls.assign_ids(participants)
+        cls.write_on_shard(partial(cls.on_shard(forum.id).bulk_create, participants), participants)
+
+        status = cls.ACCEPT if initiator is True else cls.WAITING
+        forum.update_counters({status: len(participants)})
+        return participants
+
+    @classmethod
+    async def acreate_participant(cls, forum: Forum, user: User, initiator: bool):
+        """
+        Async `create_participant`. The insert and the counter update are separate
+        autocommitted statements here; `rebuild_forum_counters` repairs the counters
+        if the second one never runs.
+        """
+        status = cls.ACCEPT if initiator is True else cls.WAITING
+        participant = cls(forum=forum, user=user, initiator=initiator, status=status)
+        if is_sharded():
+            await sync_to_async(cls.assign_ids)([participant])
+        await participant.asave(force_insert=True)
+
+        if initiator is True:
+            forum.initiator = user
+            await forum.aupdate_counters({status: 1}, initiator=user)
+        else:
+            await forum.aupdate_counters({status: 1})
         return participant
 
+    @classmethod
+    async def acreate_participants(cls, forum: Forum, users: list, initiator: bool):
+        status = cls.ACCEPT if initiator is True else cls.WAITING
+        participants = [cls(forum=forum, user=user, initiator=initiator, status=status) for user in users]
+        if is_sharded():
+            await sync_to_async(cls.assign_ids)(participants)
+        participants = await cls.on_shard(forum.id).abulk_create(participants)
+        await forum.aupdate_counters({status: len(participants)})
+        return participants
+
+    @classmethod
+    def transition_waiting(cls, forum: Forum, participant_ids: list, status: int):
+        """
+        Move WAITING participants of `forum` to `status` with one conditional
+        UPDATE ... RETURNING, so rows changed concurrently are skipped and the
+        ids come back without a second query. The id list is sent as a single
+        parameter (a JSON array on SQLite, an array on PostgreSQL), so one
+        statement covers any number of ids. Other databases, and SQLite before
+        3.35, select the rows first and update them in a second statement.
+        """
+        using = router.db_for_write(cls, instance=forum)
+        connection = connections[using]
+        now = timezone.now()
+
+        # the feature Django derives from the SQLite version that added RETURNING
+        returning = connection.features.can_return_rows_from_bulk_insert
+        if connection.vendor not in ('sqlite', 'postgresql') or not returning:
+            queryset = cls.objects.using(using).filter(forum=forum, status=cls.WAITING)
+            if participant_ids is not None:
+                queryset = queryset.filter(id__in=participant_ids)
+            ids = list(queryset.select_for_update().values_list('id', flat=True))
+            cls.objects.using(using).filter(id__in=ids, status=cls.WAITING).update(status=status, updated_at=now)
+            return ids
+
+        sql = f'UPDATE {cls._meta.db_table} SET status = %s, updated_at = %s WHERE forum_id = %s AND status = %s'
+        params = [status, connection.ops.adapt_datetimefield_value(now), forum.id, cls.WAITING]
+        if participant_ids is not None:
+            if connection.vendor == 'sqlite':
+                sql += ' AND id IN (SELECT value FROM json_each(%s))'
+                params.append(json.dumps([int(id) for id in participant_ids]))
+            else:
+                sql += ' AND id = ANY(%s)'
+                params.append([int(id) for id in participant_ids])
+        sql += ' RETURNING id'
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    @classmethod
+    def get_inbox(cls, user_id, status: int = None):
+        """
+        The participations of `user_id` with their forum and its initiator,
+        loaded by one join. Paginate by `(created_at, id)` to stay on the index.
+        """
+        participants = cls.objects.filter(user_id=user_id)
+        if status is not None:
+            participants = participants.filter(status=status)
+        return participants.select_related('forum__initiator').only(*cls.INBOX_FIELDS)
+
+    @classmethod
+    def get_sharded_inbox(cls, user_id, status: int, get_page) -> list:
+        """
+        `get_inbox` when participants are sharded and forums cannot be joined.
+        `get_page(queryset)` reads one keyset page from every shard, the pages
+        are merged in the same `(created_at, id)` order, and the forums with
+        their initiators come from the primary in one more query.
+        """
+        rows = []
+        for participants in cls.on_every_shard():
+            participants = participants.filter(user_id=user_id)
+            if status is not None:
+                participants = participants.filter(status=status)
+            rows += get_page(participants.only(*(field for field in cls.INBOX_FIELDS if '__' not in field)))
+        rows.sort(key=lambda participant: (participant.created_at, participant.id), reverse=True)
+
+        forum_fields = [field[len('forum__'):] for field in cls.INBOX_FIELDS if field.startswith('forum__')]
+        forums = Forum.objects.select_related('initiator').only(*forum_fields)
+        prefetch_related_objects(rows, Prefetch('forum', queryset=forums))
+        return rows
+
     @classmethod
     def get_initiator(cls, forum):
-        initiator = cls.objects.filter(forum=forum, initiator=True).first()
-        if initiator is None:
+        if forum.initiator_id is None:
             raise NotFound("initiator not found")
-        return initiator.user
+        return forum.initiator
+
+    def set_status(self, status: int):
+        self.forum.check_forum_is_closed()
+        previous = self.status
+        if status == previous:
+            return False
+
+        # only the request that actually moves the row off `previous` adjusts the counters
+        now = timezone.now()
+        updated = ForumParticipant.on_shard(self.forum_id).filter(pk=self.pk, status=previous).update(
+            status=status, updated_at=now,
+        )
+        if updated == 0:
+            raise ValidationError("participant status changed concurrently")
+
+        self.status = status
+        self.updated_at = now
+        self.forum.update_counters({previous: -1, status: 1})
+        ForumEvent.record(self.forum, ForumEvent.PARTICIPANTS_STATUS, participants=[self.id], status=status)
+        return True
+
+
+class ForumEvent(models.Model):
+    """
+    Append-only change log of forum writes, recorded in the writer's transaction.
+    `id` is the sequence consumers resume from, so tailing the feed only reads
+    the rows after the last one they saw.
+    """
+    FORUM_CREATED = 'forum.created'
+    FORUM_CLOSED = 'forum.closed'
+    PARTICIPANTS_ADDED = 'participants.added'
+    PARTICIPANTS_STATUS = 'participants.status'
+
+    id = models.BigAutoField(primary_key=True)
+    forum = models.ForeignKey(Forum, on_delete=models.PROTECT, related_name='events')
+    kind = models.CharField(max_length=32)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # PostgreSQL only: the next transaction id when `id` was taken, see `insert`
+    horizon = models.BigIntegerField(null=True, editable=False)
+
+    # every event is also published here, to wake long-polls of the whole feed
+    FEED_TOPIC = 'forum-events'
+
+    @classmethod
+    def record(cls, forum: Forum, kind: str, **data):
+        event = cls.insert(forum, kind, data)
+        transaction.on_commit(event.publish)
+        return event
+
+    @classmethod
+    async def arecord(cls, forum: Forum, kind: str, **data):
+        event = await sync_to_async(cls.insert)(forum, kind, data)
+        # autocommit: the row is already visible
+        event.publish()
+        return event
+
+    @classmethod
+    def insert(cls, forum: Forum, kind: str, data: dict):
+        """
+        Insert an event without serializing writers. PostgreSQL hands out ids to
+        concurrent transactions that may commit in any order, so the event
+        records `horizon`: every transaction that could hold a smaller id had
+        started before it. Readers only return an event once all of those have
+        ended (see `settled`). SQLite's single writer already commits in id order.
+        """
+        using = router.db_for_write(cls)
+        connection = connections[using]
+        with transaction.atomic(using=using, savepoint=False):
+            if connection.vendor != 'postgresql':
+                return cls.objects.using(using).create(forum=forum, kind=kind, data=data)
+            with connection.cursor() as cursor:
+                # take the transaction id before the event id, so a writer
+                # holding a smaller id is always older than the horizon
+                cursor.execute('SELECT txid_current()')
+            event = cls.objects.using(using).create(forum=forum, kind=kind, data=data)
+            # a later statement, so its snapshot is taken after the id was
+            cls.objects.using(using).filter(pk=event.pk).update(
+                horizon=RawSQL('txid_snapshot_xmax(txid_current_snapshot())', []),
+            )
+            return event
+
+    @staticmethod
+    def get_topic(forum_id) -> str:
+        return f'forum:{forum_id}'
+
+    def as_message(self) -> dict:
+        return {
+            "id": self.id,
+            "forum": self.forum_id,
+            "kind": self.kind,
+            "data": self.data,
+            "created_at": self.created_at,
+        }
+
+    def publish(self):
+        """
+        Push the event to the live streams of its forum. Best effort: the row is
+        committed either way, and streams catch up from it on reconnect.
+        """
+        try:
+            hub.publish(self.get_topic(self.forum_id), self.as_message())
+            hub.publish(self.FEED_TOPIC, {"id": self.id})
+        except Exception:
+            logger.warning("could not publish forum event %s", self.id, exc_info=True)
+
+    @staticmethod
+    def participants_added(participants: list):
+        return {
+            "participants": [participant.id for participant in participants],
+            "users": [participant.user_id for participant in participants],
+        }
+
+    @classmethod
+    def get_events(cls, after: int, limit: int):
+        return cls.settled(cls.objects.filter(id__gt=after)).order_by('id')[:limit]
+
+    @classmethod
+    def get_forum_events(cls, forum_id, after: int, limit: int):
+        return cls.settled(cls.objects.filter(forum_id=forum_id, id__gt=after)).order_by('id')[:limit]
+
+    @classmethod
+    def settled(cls, queryset):
+        """
+        On PostgreSQL, stop `queryset` before its first event whose horizon the
+        oldest running transaction has not passed: a transaction that started
+        before that event may still commit a smaller id. A long-running writing
+        transaction therefore holds the feed back until it ends.
+        """
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset
+        unsettled = queryset.filter(
+            id__lte=OuterRef('id'),
+            horizon__gt=RawSQL('txid_snapshot_xmin(txid_current_snapshot())', []),
+        )
+        return queryset.filter(~Exists(unsettled))
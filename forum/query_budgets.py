@@ -0,0 +1,191 @@
+from user.query_budgets import cold_users, make_users
+from util.testing import QueryBudget
+from .models import Forum, ForumEvent, ForumParticipant
+
+
+def make_forum(n: int):
+    """A forum with an initiator and `n` waiting participants, reloaded so no relation is cached."""
+    initiator, *users = make_users(n + 1)
+    forum = Forum.create_forum_with_users("budget", "budget forum", initiator, users)
+    return Forum.objects.get(pk=forum.pk), initiator
+
+
+def forum_with_users(n: int):
+    forum, _ = make_forum(0)
+    return forum, make_users(n)
+
+
+def forum_with_waiting(n: int):
+    forum, initiator = make_forum(n)
+    ids = list(forum.get_participants().filter(status=ForumParticipant.WAITING).values_list('id', flat=True))
+    return forum, initiator, ids
+
+
+def waiting_participant(n: int):
+    forum, _ = make_forum(n)
+    participant = forum.get_participants().filter(status=ForumParticipant.WAITING).first()
+    return (ForumParticipant.objects.get(pk=participant.pk),)
+
+
+def events_after(n: int):
+    """`n + 1` events of one forum and the id to read them after."""
+    forum, _ = make_forum(0)
+    for user in make_users(n):
+        forum.add_participant(user)
+    return (forum.events.earliest('id').id - 1, 1000)
+
+
+def inbox_user(n: int):
+    """A user waiting in `n` forums."""
+    user, = make_users(1)
+    for _ in range(n):
+        initiator, = make_users(1)
+        Forum.create_forum_with_users("budget", "budget forum", initiator, [user])
+    return (user.id, ForumParticipant.WAITING)
+
+
+def forums_matching(n: int):
+    for _ in range(n):
+        forum = Forum(description="budget search")
+        forum.set_topic("budget search")
+        forum.save()
+    return ("budget search", n)
+
+
+# n is the number of participants involved in the call (or already in the forum)
+BUDGETS = [
+    QueryBudget(
+        "Forum.create_forum",
+        lambda n: ("budget", "", *cold_users(1), [user.id for user in cold_users(n)]),
+        Forum.create_forum,
+        constant=8,
+    ),
+    QueryBudget(
+        "Forum.acreate_forum",
+        lambda n: ("budget", "", *cold_users(1), [user.id for user in cold_users(n)]),
+        Forum.acreate_forum,
+        # the writes run in their own atomic block: SAVEPOINT and RELEASE on top
+        constant=10,
+    ),
+    QueryBudget(
+        "Forum.create_forum_with_users",
+        lambda n: ("budget", "", *make_users(1), make_users(n)),
+        Forum.create_forum_with_users,
+        constant=7,
+    ),
+    QueryBudget("Forum.get_forum", lambda n: (make_forum(n)[0].id,), Forum.get_forum, constant=1),
+    QueryBudget("Forum.aget_forum", lambda n: (make_forum(n)[0].id,), Forum.aget_forum, constant=1),
+    QueryBudget("Forum.search", forums_matching, Forum.search, constant=2),
+    QueryBudget(
+        "Forum.save",
+        lambda n: (make_forum(n)[0],),
+        lambda forum: (forum.set_topic("budget renamed"), forum.save()),
+        constant=2,
+    ),
+    QueryBudget(
+        "Forum.add_participant",
+        lambda n: (make_forum(n)[0], *make_users(1)),
+        Forum.add_participant,
+        constant=3,
+    ),
+    QueryBudget("Forum.add_participants", forum_with_users, Forum.add_participants, constant=3),
+    # async code runs in autocommit, so the invite job is inserted right away
+    QueryBudget("Forum.aadd_participants", forum_with_users, Forum.aadd_participants, constant=4),
+    QueryBudget(
+        "Forum.get_participants",
+        lambda n: (make_forum(n)[0],),
+        lambda forum: list(forum.get_participants()),
+        constant=1,
+    ),
+    QueryBudget(
+        "Forum.get_participant_users",
+        lambda n: (make_forum(n)[0],),
+        Forum.get_participant_users,
+        constant=1,
+    ),
+    QueryBudget(
+        "Forum.update_counters",
+        lambda n: (make_forum(n)[0], {ForumParticipant.WAITING: -n, ForumParticipant.ACCEPT: n}),
+        Forum.update_counters,
+        constant=1,
+    ),
+    QueryBudget("Forum.close_by", make_forum, Forum.close_by, constant=2),
+    QueryBudget(
+        "Forum.transition_participants_by",
+        forum_with_waiting,
+        lambda forum, initiator, ids: forum.transition_participants_by(initiator, ids, ForumParticipant.ACCEPT),
+        constant=3,
+    ),
+    QueryBudget(
+        "Forum.get_validators",
+        lambda n: (make_forum(n)[0],),
+        lambda forum: forum.get_validators("forum"),
+        constant=0,
+    ),
+    QueryBudget(
+        "ForumParticipant.create_participant",
+        lambda n: (make_forum(n)[0], *make_users(1), False),
+        ForumParticipant.create_participant,
+        constant=2,
+    ),
+    QueryBudget(
+        "ForumParticipant.create_participants",
+        lambda n: (*forum_with_users(n), False),
+        ForumParticipant.create_participants,
+        constant=2,
+    ),
+    QueryBudget(
+        "ForumParticipant.acreate_participant",
+        lambda n: (make_forum(n)[0], *make_users(1), False),
+        ForumParticipant.acreate_participant,
+        constant=2,
+    ),
+    QueryBudget(
+        "ForumParticipant.acreate_participants",
+        lambda n: (*forum_with_users(n), False),
+        ForumParticipant.acreate_participants,
+        constant=2,
+    ),
+    QueryBudget(
+        "ForumParticipant.transition_waiting",
+        lambda n: (forum_with_waiting(n)[0], None, ForumParticipant.DENY),
+        ForumParticipant.transition_waiting,
+        constant=1,
+    ),
+    QueryBudget(
+        "ForumParticipant.get_inbox",
+        inbox_user,
+        lambda user_id, status: list(ForumParticipant.get_inbox(user_id, status)),
+        constant=1,
+    ),
+    QueryBudget(
+        "ForumParticipant.get_initiator",
+        lambda n: (make_forum(n)[0],),
+        ForumParticipant.get_initiator,
+        constant=1,
+    ),
+    QueryBudget(
+        "ForumParticipant.set_status",
+        waiting_participant,
+        lambda participant: participant.set_status(ForumParticipant.ACCEPT),
+        constant=4,
+    ),
+    QueryBudget(
+        "ForumEvent.record",
+        lambda n: (make_forum(n)[0], ForumEvent.FORUM_CLOSED),
+        ForumEvent.record,
+        constant=1,
+    ),
+    QueryBudget(
+        "ForumEvent.arecord",
+        lambda n: (make_forum(n)[0], ForumEvent.FORUM_CLOSED),
+        ForumEvent.arecord,
+        constant=1,
+    ),
+    QueryBudget(
+        "ForumEvent.get_events",
+        events_after,
+        lambda after, limit: list(ForumEvent.get_events(after, limit)),
+        constant=1,
+    ),
+]
@@ -0,0 +1,126 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+TABLE = 'forum_forum_search'
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchBackend:
+    """
+    Inverted index over forum topics and descriptions.
+
+    `Forum.save` calls `index` whenever the topic or description changed. Rows
+    written with `bulk_create` or queryset `update()` bypass it and need a
+    `rebuild`.
+    """
+
+    def index(self, forum):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int, offset: int) -> list:
+        """Return `(forum id, rank)` pairs, best match first."""
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table whose rowid is the forum id, ranked by bm25."""
+
+    def index(self, forum):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {TABLE} (rowid, topic, description) VALUES (%s, %s, %s)',
+                [forum.id, forum.topic, forum.description or ''],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, topic, description) "
+                f"SELECT id, topic, COALESCE(description, '') FROM forum_forum"
+            )
+
+    def search(self, query, limit, offset):
+        words = WORD.findall(query)
+        if not words:
+            return []
+        # every word must match, the last one as a prefix so partial input still finds results
+        match = ' '.join(f'"{word}"' for word in words) + '*'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({TABLE}, 10.0, 1.0) AS rank FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return [(forum_id, -rank) for forum_id, rank in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Side table holding a weighted tsvector per forum behind a GIN index."""
+
+    DOCUMENT = (
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'B')"
+    )
+
+    def index(self, forum):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {TABLE} (forum_id, document) VALUES (%s, {self.DOCUMENT}) '
+                f'ON CONFLICT (forum_id) DO UPDATE SET document = EXCLUDED.document',
+                [forum.id, forum.topic, forum.description or ''],
+            )
+
+    def rebuild(self):
+        document = self.DOCUMENT % ('topic', "COALESCE(description, '')")
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {TABLE}')
+            cursor.execute(f'INSERT INTO {TABLE} (forum_id, document) SELECT id, {document} FROM forum_forum')
+
+    def search(self, query, limit, offset):
+        if not WORD.search(query):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT forum_id, ts_rank_cd(document, query) AS rank "
+                f"FROM {TABLE}, websearch_to_tsquery('simple', %s) query "
+                f"WHERE document @@ query ORDER BY rank DESC, forum_id DESC LIMIT %s OFFSET %s",
+                [query, limit, offset],
+            )
+            return cursor.fetchall()
+
+
+class ScanSearchBackend(SearchBackend):
+    """Fallback for databases without a full-text index: substring scan, newest first."""
+
+    def index(self, forum):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit, offset):
+        from .models import Forum
+
+        query = query.strip()
+        if not query:
+            return []
+        forums = Forum.objects.filter(
+            Q(topic_lowercase__contains=query.lower()) | Q(description__icontains=query)
+        ).order_by('-created_at', '-id')
+        return [(forum_id, 0.0) for forum_id in forums.values_list('id', flat=True)[offset:offset + limit]]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend() -> SearchBackend:
+    return BACKENDS.get(connection.vendor, ScanSearchBackend)()
@@ -0,0 +1,125 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from .export import FORMATS
+from .models import Forum, ForumEvent, ForumParticipant
+
+
+class CreateForumSerializer(serializers.Serializer):
+    topic = serializers.CharField(max_length=100)
+    description = serializers.CharField(allow_null=True, required=False)
+    participants = serializers.ListField(child=serializers.IntegerField())
+
+class AddParticipantsSerializer(serializers.Serializer):
+    participants = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+class TransitionParticipantsSerializer(serializers.Serializer):
+    participants = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, required=False)
+    status = serializers.ChoiceField(choices=(ForumParticipant.ACCEPT, ForumParticipant.DENY))
+
+class ForumSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Forum
+        fields = (
+            "id",
+            "topic",
+            "description",
+            "status",
+            "closed_at",
+            "initiator",
+            "accepted_count",
+            "denied_count",
+            "waiting_count",
+            "created_at",
+        )
+
+class ForumSearchSerializer(ForumSerializer):
+    rank = serializers.FloatField()
+
+    class Meta(ForumSerializer.Meta):
+        fields = ForumSerializer.Meta.fields + ("rank",)
+
+class SearchForumSerializer(serializers.Serializer):
+    q = serializers.CharField()
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+class ExportSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=FORMATS, default="ndjson")
+
+class ParticipantSerializer(serializers.ModelSerializer):
+    name = serializers.SerializerMethodField()
+    username = serializers.SerializerMethodField()
+
+    def get_name(self, obj):
+        return obj.user.name
+    
+    def get_username(self, obj):
+        return obj.user.username
+
+    class Meta:
+        model = ForumParticipant
+        fields = (
+            "id",
+            "user",
+            "name",
+            "username",
+            "initiator",
+            "status",
+            "created_at",
+        )
+
+class InboxQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=ForumParticipant.STATUS_CHOICES, required=False)
+
+class InboxForumSerializer(serializers.ModelSerializer):
+    initiator = serializers.SerializerMethodField()
+
+    def get_initiator(self, obj):
+        if obj.initiator is None:
+            return None
+        return {"id": obj.initiator.id, "username": obj.initiator.username, "name": obj.initiator.name}
+
+    class Meta:
+        model = Forum
+        fields = (
+            "id",
+            "topic",
+            "status",
+            "closed_at",
+            "initiator",
+            "created_at",
+        )
+
+class InboxSerializer(serializers.ModelSerializer):
+    forum = InboxForumSerializer()
+
+    class Meta:
+        model = ForumParticipant
+        fields = (
+            "id",
+            "status",
+            "created_at",
+            "forum",
+        )
+
+class ForumEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ForumEvent
+        fields = (
+            "id",
+            "forum",
+            "kind",
+            "data",
+            "created_at",
+        )
+
+class ForumEventQuerySerializer(serializers.Serializer):
+    after = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+class ForumStreamSerializer(serializers.Serializer):
+    after = serializers.IntegerField(min_value=0, required=False)
+
+class ForumEventPollSerializer(ForumEventQuerySerializer):
+    wait = serializers.FloatField(min_value=0, max_value=settings.FORUM_EVENTS_MAX_WAIT, default=0)
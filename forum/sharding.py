@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PARTICIPANT_MODEL = 'forum.ForumParticipant'
+
+
+def is_sharded() -> bool:
+    return bool(settings.PARTICIPANT_SHARDS['ALIASES'])
+
+
+def get_shard(forum_id: int) -> str:
+    """Database holding the participants of `forum_id`: `forum_id` modulo the number of shards."""
+    aliases = settings.PARTICIPANT_SHARDS['ALIASES']
+    if not aliases:
+        return DEFAULT_DB_ALIAS
+    return aliases[forum_id % len(aliases)]
+
+
+def get_participant_databases() -> list:
+    return list(settings.PARTICIPANT_SHARDS['ALIASES']) or [DEFAULT_DB_ALIAS]
+
+
+class ParticipantRouter:
+    """
+    Place forum participants in the PARTICIPANT_SHARDS databases by forum id.
+    Only queries that say which forum they are about can be routed: writes
+    and reads through an instance (`participant.save()`, `forum.participants`)
+    go to its shard, and the ForumParticipant methods pick the shard with
+    `ForumParticipant.on_shard`. Everything else falls through to the next router.
+
+    Shards get the full schema, so migrations apply to them as is, but data
+    migrations only run on the primary. The participant foreign keys are the
+    exception: they are constrained on the primary only, as forums and users
+    are never copied to the shards (see migration 0011).
+    """
+
+    def db_for_read(self, model, **hints):
+        return self.get_participant_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.get_participant_shard(model, hints)
+
+    def get_participant_shard(self, model, hints):
+        if model._meta.label != PARTICIPANT_MODEL or not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._meta.label == PARTICIPANT_MODEL:
+            return get_shard(instance.forum_id)
+        if instance._meta.label == 'forum.Forum' and instance.pk is not None:
+            return get_shard(instance.pk)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # participants reference forums and users that live on the primary
+        shards = settings.PARTICIPANT_SHARDS['ALIASES']
+        if obj1._state.db in shards or obj2._state.db in shards:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.PARTICIPANT_SHARDS['ALIASES']:
+            return model_name is not None
+        return None
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by the forum.invite_participants job, outside the request, once per
+# batch of invited participants: `forum` and `participants` (users loaded).
+# Notification fan-out connects here.
+participants_invited = Signal()
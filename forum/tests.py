@@ -1,8 +1,34 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import tracemalloc
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, models, transaction
+from django.db.models.query import QuerySet
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework.exceptions import ValidationError, NotFound
 
-from .models import Forum, ForumParticipant
+from job.models import Job
+from user.cache import active_users
+from job.worker import Worker
+from util.pubsub import hub
+from util.testing import QueryBudgetMixin
+from . import export
+from .async_views import stream
+from .query_budgets import BUDGETS
+from .sharding import ParticipantRouter, get_shard
+from .signals import participants_invited
+from .models import WRITE_PARTICIPANTS_JOB, Forum, ForumEvent, ForumParticipant
+from .views import ForumView
 
 User = get_user_model()
 
@@ -51,6 +77,30 @@ class ForumModelTest(TestCase):
             self.assertIsInstance(error, NotFound)
             self.assertIn(f"user with id of 100 not found", str(error))
 
+    def test_create_forum_method_with_multiple_invalid_participants(self):
+        try:
+            Forum.create_forum(
+                topic="testing",
+                description="description",
+                initiator=self.user,
+                participants=[self.participants[0].id, 100, 101]
+            )
+
+            self.assertTrue(False)
+        except Exception as error:
+            self.assertIsInstance(error, NotFound)
+            self.assertIn("users with id of 100, 101 not found", str(error))
+            self.assertEqual(Forum.objects.count(), 0)
+
+    def test_create_forum_method_query_count(self):
+        with self.assertNumQueries(8):
+            Forum.create_forum(
+                topic="testing",
+                description="description",
+                initiator=self.user,
+                participants=[participant.id for participant in self.participants]
+            )
+
     def test_create_forum_method(self):
         forum = Forum.create_forum(
             topic="testing",
@@ -61,6 +111,63 @@ class ForumModelTest(TestCase):
 
         self.assertIsInstance(forum.id, int)
     
+    def test_create_forum_method_counters(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[participant.id for participant in self.participants]
+        )
+        forum.refresh_from_db()
+
+        self.assertEqual(forum.initiator, self.user)
+        self.assertEqual(forum.accepted_count, 1)
+        self.assertEqual(forum.waiting_count, 3)
+        self.assertEqual(forum.denied_count, 0)
+
+    def test_close_by_method_without_initiator_query(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[self.participants[0].id]
+        )
+
+        with self.assertNumQueries(2):
+            forum.close_by(self.user)
+
+    def test_rebuild_forum_counters_command(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[participant.id for participant in self.participants]
+        )
+        Forum.objects.filter(pk=forum.pk).update(waiting_count=0, initiator=None)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_forum_counters", "--check", stdout=StringIO())
+        call_command("rebuild_forum_counters", stdout=StringIO())
+        forum.refresh_from_db()
+
+        self.assertEqual(forum.waiting_count, 3)
+        self.assertEqual(forum.initiator, self.user)
+
+    def test_rebuild_forum_counters_command_in_chunks(self):
+        forums = [
+            Forum.create_forum(f"forum {number}", "description", self.user, [self.participants[number].id])
+            for number in range(3)
+        ]
+        Forum.objects.update(accepted_count=0, waiting_count=0)
+
+        stdout = StringIO()
+        call_command("rebuild_forum_counters", "--batch-size", "2", stdout=stdout)
+
+        self.assertEqual(stdout.getvalue().strip(), "repaired 3 forum(s)")
+        for forum in forums:
+            forum.refresh_from_db()
+            self.assertEqual((forum.accepted_count, forum.waiting_count), (1, 1))
+
     def test_get_participants_method(self):
         forum = Forum.create_forum(
             topic="testing",
@@ -125,6 +232,23 @@ class ForumModelTest(TestCase):
 
         self.assertEqual(forum.status, Forum.CLOSED)
     
+    def test_close_by_method_keeps_concurrent_counter_changes(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[self.participants[0].id]
+        )
+        other = Forum.objects.get(pk=forum.pk)
+        other.update_counters({ForumParticipant.WAITING: -1, ForumParticipant.ACCEPT: 1})
+
+        forum.close_by(self.user)
+
+        forum.refresh_from_db()
+        self.assertEqual(forum.status, Forum.CLOSED)
+        self.assertEqual(forum.accepted_count, other.accepted_count)
+        self.assertEqual(forum.waiting_count, other.waiting_count)
+
     def test_close_by_not_initiator_method(self):
         try:
             forum = Forum.create_forum(
@@ -156,6 +280,83 @@ class ForumModelTest(TestCase):
             self.assertIsInstance(error, ValidationError)
             self.assertIn("forum already closed", str(error))
     
+    def test_transition_participants_by_method(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[participant.id for participant in self.participants]
+        )
+        waiting = list(forum.get_participants().filter(initiator=False).order_by('id'))
+
+        with self.assertNumQueries(3):
+            ids = forum.transition_participants_by(self.user, [waiting[0].id, waiting[1].id], ForumParticipant.ACCEPT)
+        waiting[0].refresh_from_db()
+        forum.refresh_from_db()
+
+        self.assertEqual(sorted(ids), [waiting[0].id, waiting[1].id])
+        self.assertEqual(waiting[0].status, ForumParticipant.ACCEPT)
+        self.assertIsNotNone(waiting[0].updated_at)
+        self.assertEqual(forum.accepted_count, 3)
+        self.assertEqual(forum.waiting_count, 1)
+
+    def test_transition_participants_by_method_skips_non_waiting(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[participant.id for participant in self.participants]
+        )
+        forum.transition_participants_by(self.user, None, ForumParticipant.DENY)
+
+        ids = forum.transition_participants_by(self.user, None, ForumParticipant.ACCEPT)
+        forum.refresh_from_db()
+
+        self.assertEqual(ids, [])
+        self.assertEqual(forum.denied_count, 3)
+        self.assertEqual(forum.accepted_count, 1)
+
+    def test_transition_participants_by_method_without_returning(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[participant.id for participant in self.participants]
+        )
+        waiting = list(forum.get_participants().filter(initiator=False).order_by('id'))
+
+        # SQLite before 3.35
+        with patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            ids = forum.transition_participants_by(self.user, [waiting[0].id, waiting[1].id], ForumParticipant.ACCEPT)
+        forum.refresh_from_db()
+
+        self.assertEqual(sorted(ids), [waiting[0].id, waiting[1].id])
+        self.assertEqual(forum.accepted_count, 3)
+        self.assertEqual(forum.waiting_count, 1)
+
+    def test_transition_participants_by_not_initiator_method(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[self.participants[0].id]
+        )
+
+        with self.assertRaises(ValidationError):
+            forum.transition_participants_by(self.participants[0], None, ForumParticipant.ACCEPT)
+
+    def test_transition_participants_by_method_with_forum_status_closed(self):
+        forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[self.participants[0].id]
+        )
+        forum.close_by(self.user)
+
+        with self.assertRaises(ValidationError):
+            forum.transition_participants_by(self.user, None, ForumParticipant.ACCEPT)
+
     def test_check_forum_closed_method(self):
         forum = Forum.create_forum(
             topic="testing",
@@ -183,6 +384,143 @@ class ForumModelTest(TestCase):
             self.assertIsInstance(error, ValidationError)
             self.assertIn("forum already closed", str(error))        
 
+
+class ForumQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def tearDown(self):
+        # the cached users are rolled back with the test
+        active_users.clear()
+        active_users.backend.clear()
+
+    def test_model_methods_stay_within_query_budgets(self):
+        self.assertQueryBudgets(BUDGETS)
+
+
+class AsyncForumViewTest(TestCase):
+    def setUp(self):
+        self.url = '/async/forums/'
+        self.user = User.register("Test User", "test", "password")
+        self.participants = [
+            User.register(f"user {number}", f"user{number}", "password")
+            for number in range(3)
+        ]
+        self.forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[self.participants[0].id]
+        )
+        self.headers = {"Authorization": f'Bearer {self.user.generate_token()["access"]}'}
+
+    async def test_create_forum_api(self):
+        data = {"topic": "async topic", "participants": [participant.id for participant in self.participants]}
+
+        response = await self.async_client.post(self.url, data=data, content_type='application/json', headers=self.headers)
+        response_data = response.json()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response_data["waiting_count"], 3)
+        self.assertEqual(await ForumParticipant.objects.filter(forum_id=response_data["id"]).acount(), 4)
+
+    async def test_create_forum_api_with_invalid_participant(self):
+        data = {"topic": "async topic", "participants": [100]}
+
+        response = await self.async_client.post(self.url, data=data, content_type='application/json', headers=self.headers)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(await Forum.objects.acount(), 1)
+
+    async def test_unauthenticated_forum_api(self):
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_retrieve_forum_api(self):
+        response = await self.async_client.get(f'{self.url}{self.forum.id}/', headers=self.headers)
+
+        self.assertEqual(response.json()["id"], self.forum.id)
+
+    async def test_participant_list_api(self):
+        response = await self.async_client.get(f'{self.url}{self.forum.id}/participants/?page_size=1', headers=self.headers)
+        response_data = response.json()
+
+        self.assertEqual(len(response_data["results"]), 1)
+        self.assertIsNotNone(response_data["next"])
+
+    async def test_participant_list_api_not_modified(self):
+        url = f'{self.url}{self.forum.id}/participants/'
+        response = await self.async_client.get(url, headers=self.headers)
+
+        response = await self.async_client.get(url, headers={**self.headers, "If-None-Match": response["ETag"]})
+
+        self.assertEqual(response.status_code, 304)
+
+    async def test_add_participants_api(self):
+        data = {"participants": [self.participants[1].id, self.participants[2].id]}
+
+        response = await self.async_client.post(
+            f'{self.url}{self.forum.id}/participants/', data=data, content_type='application/json', headers=self.headers
+        )
+        await self.forum.arefresh_from_db()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()["participants"]), 2)
+        self.assertEqual(self.forum.waiting_count, 3)
+
+
+class ForumSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
+        self.participant = User.register("user 0", "user0", "password")
+
+    def create_forum(self, topic, description):
+        return Forum.create_forum(
+            topic=topic,
+            description=description,
+            initiator=self.user,
+            participants=[self.participant.id]
+        )
+
+    def test_search_method_ranks_topic_matches_first(self):
+        in_description = self.create_forum("Weekly sync", "notes about python packaging")
+        in_topic = self.create_forum("Python packaging", "weekly notes")
+
+        forums = Forum.search("python", limit=10)
+
+        self.assertEqual(forums, [in_topic, in_description])
+
+    def test_search_method_matches_prefix_of_last_word(self):
+        forum = self.create_forum("Database migrations", "description")
+
+        self.assertEqual(Forum.search("database migr", limit=10), [forum])
+
+    def test_search_method_follows_topic_changes(self):
+        forum = self.create_forum("Old topic", "description")
+        forum.set_topic("Renamed")
+        forum.save()
+
+        self.assertEqual(Forum.search("old", limit=10), [])
+        self.assertEqual(Forum.search("renamed", limit=10), [forum])
+
+    def test_search_method_ignores_query_syntax(self):
+        self.create_forum("Testing", "description")
+
+        self.assertEqual(Forum.search('" OR * NEAR(', limit=10), [])
+
+    def test_search_api_paginates(self):
+        for number in range(3):
+            self.create_forum(f"Topic {number}", "shared words")
+        factory = APIRequestFactory()
+        request = factory.get('/forums/search/?q=shared&page_size=2')
+        force_authenticate(request, user=self.user)
+
+        response = ForumView.as_view({'get': 'search'})(request)
+        response.render()
+        response_data = json.loads(response.content.decode())
+
+        self.assertEqual(len(response_data["results"]), 2)
+        self.assertIn("page=2", response_data["next"])
+
+
 class ForumParticipantModelTest(TestCase):
     def setUp(self):
         self.setUpForum()
@@ -209,6 +547,12 @@ class ForumParticipantModelTest(TestCase):
         self.assertTrue(participant.initiator)
         self.assertEqual(participant.status, ForumParticipant.ACCEPT)
     
+    def test_create_participants_method(self):
+        participants = ForumParticipant.create_participants(self.forum, self.participants, False)
+
+        self.assertEqual(len(participants), len(self.participants))
+        self.assertEqual(ForumParticipant.objects.filter(forum=self.forum, status=ForumParticipant.WAITING).count(), 3)
+
     def test_create_participant_method_with_initiator_false(self):
         participant = ForumParticipant.create_participant(self.forum, self.user, False)
 
@@ -221,6 +565,53 @@ class ForumParticipantModelTest(TestCase):
 
         self.assertEqual(initiator, self.user)
     
+    def test_set_status_method(self):
+        participant = ForumParticipant.create_participant(self.forum, self.user, False)
+        participant.set_status(ForumParticipant.ACCEPT)
+        self.forum.refresh_from_db()
+
+        self.assertEqual(participant.status, ForumParticipant.ACCEPT)
+        self.assertEqual(self.forum.accepted_count, 1)
+        self.assertEqual(self.forum.waiting_count, 0)
+
+    def test_set_status_method_with_stale_status(self):
+        participant = ForumParticipant.create_participant(self.forum, self.user, False)
+        ForumParticipant.objects.filter(pk=participant.pk).update(status=ForumParticipant.DENY)
+
+        with self.assertRaises(ValidationError):
+            participant.set_status(ForumParticipant.ACCEPT)
+
+    def test_updated_at_is_stamped_by_bulk_writes(self):
+        participants = ForumParticipant.create_participants(self.forum, self.participants, False)
+        created = ForumParticipant.objects.get(pk=participants[0].pk).updated_at
+        self.assertIsNotNone(created)
+
+        participants[0].initiator = True
+        ForumParticipant.objects.bulk_update(participants[:1], ['initiator'])
+        bulk_updated = ForumParticipant.objects.get(pk=participants[0].pk).updated_at
+        self.assertGreater(bulk_updated, created)
+
+        ForumParticipant.objects.filter(pk=participants[0].pk).update(status=ForumParticipant.DENY)
+        self.assertGreater(ForumParticipant.objects.get(pk=participants[0].pk).updated_at, bulk_updated)
+
+    def test_save_with_update_fields_stamps_updated_at(self):
+        before = self.forum.updated_at
+        self.forum.description = "changed"
+        self.forum.save(update_fields=['description'])
+        self.forum.refresh_from_db()
+
+        self.assertGreater(self.forum.updated_at, before)
+
+    def test_changed_since_method(self):
+        participants = ForumParticipant.create_participants(self.forum, self.participants, False)
+        since = ForumParticipant.objects.get(pk=participants[0].pk).updated_at
+        participants[1].set_status(ForumParticipant.ACCEPT)
+
+        changed = list(ForumParticipant.objects.changed_since(since))
+        self.assertEqual(changed, [participants[1]])
+        self.assertEqual(changed[0].updated_at, participants[1].updated_at)
+        self.assertEqual(list(Forum.objects.changed_since(since)), [self.forum])
+
     def test_not_found_get_initiator_method(self):
         try:
             ForumParticipant.get_initiator(self.forum)
@@ -228,3 +619,790 @@ class ForumParticipantModelTest(TestCase):
         except Exception as error:
             self.assertIsInstance(error, NotFound)
             self.assertIn("initiator not found", str(error))
+
+
+class ForumStreamTest(TestCase):
+    def setUp(self):
+        self.user = User.register("Test User", "test", "password")
+        self.participants = [
+            User.register(f"user {number}", f"user{number}", "password")
+            for number in range(3)
+        ]
+        self.forum = Forum.create_forum("testing", None, self.user, [self.participants[0].id])
+        self.url = f'/async/forums/{self.forum.id}/stream/'
+        self.headers = {"Authorization": f'Bearer {self.user.generate_token()["access"]}'}
+
+    def tearDown(self):
+        hub.clear()
+
+    async def read_event(self, response, timeout: float = 5):
+        chunk = await asyncio.wait_for(response.streaming_content.__anext__(), timeout)
+        fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+        return int(fields["id"]), fields["event"], json.loads(fields["data"])
+
+    def close_forum(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Forum.objects.get(pk=self.forum.pk).close_by(self.user)
+
+    async def wait_for_subscriptions(self, count: int):
+        while hub.stats()["subscriptions"] < count:
+            await asyncio.sleep(0.01)
+
+    async def test_stream_pushes_participant_and_close_events(self):
+        response = await self.async_client.get(self.url, headers=self.headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        # the stream subscribes once it is read
+        self.assertEqual(hub.stats()["subscriptions"], 0)
+
+        read = asyncio.ensure_future(self.read_event(response))
+        await self.wait_for_subscriptions(1)
+        await self.forum.aadd_participants([self.participants[1]])
+        _, kind, data = await read
+        self.assertEqual(kind, ForumEvent.PARTICIPANTS_ADDED)
+        self.assertEqual(data["data"]["users"], [self.participants[1].id])
+
+        # published from another thread once the transaction commits
+        await sync_to_async(self.close_forum)()
+        _, kind, data = await self.read_event(response)
+        self.assertEqual(kind, ForumEvent.FORUM_CLOSED)
+        self.assertEqual(data["data"], {"closed_by": self.user.id})
+
+        with self.assertRaises(StopAsyncIteration):
+            await response.streaming_content.__anext__()
+        self.assertEqual(hub.stats()["subscriptions"], 0)
+
+    async def test_stream_resumes_from_last_event_id(self):
+        created = await ForumEvent.objects.aget(forum=self.forum)
+        await self.forum.aadd_participants([self.participants[1]])
+        await self.forum.aadd_participants([self.participants[2]])
+
+        response = await self.async_client.get(self.url, headers={**self.headers, "Last-Event-ID": str(created.id)})
+        first = await self.read_event(response)
+        second = await self.read_event(response)
+
+        self.assertEqual([first[1], second[1]], [ForumEvent.PARTICIPANTS_ADDED] * 2)
+        self.assertEqual(first[2]["data"]["users"], [self.participants[1].id])
+        self.assertGreater(second[0], first[0])
+
+    async def test_stream_delivers_live_events_arriving_out_of_order(self):
+        created = await ForumEvent.objects.aget(forum=self.forum)
+        response = await self.async_client.get(self.url, headers={**self.headers, "Last-Event-ID": str(created.id)})
+        read = asyncio.ensure_future(self.read_event(response))
+        await self.wait_for_subscriptions(1)
+
+        # as delivered from two processes through Redis
+        topic = ForumEvent.get_topic(self.forum.id)
+        for id in (created.id + 2, created.id + 1):
+            hub.publish(topic, {"id": id, "forum": self.forum.id, "kind": ForumEvent.PARTICIPANTS_ADDED, "data": {}})
+
+        self.assertEqual((await read)[0], created.id + 2)
+        self.assertEqual((await self.read_event(response))[0], created.id + 1)
+
+    async def test_stream_sends_keep_alive(self):
+        with override_settings(FORUM_STREAM_HEARTBEAT=0.01):
+            response = await self.async_client.get(self.url, headers=self.headers)
+            chunk = await asyncio.wait_for(response.streaming_content.__anext__(), 5)
+
+        self.assertEqual(chunk, b": keep-alive\n\n")
+
+    async def test_closed_forum_stream_is_no_content(self):
+        await sync_to_async(self.close_forum)()
+
+        response = await self.async_client.get(self.url, headers=self.headers)
+
+        self.assertEqual(response.status_code, 204)
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(FORUM_STREAM_HEARTBEAT=300)
+    async def test_holds_10k_idle_streams(self):
+        # the view is called directly: the test client's per-request middleware would dominate
+        factory = AsyncRequestFactory()
+
+        async def listen():
+            response = await stream(factory.get(self.url, headers=self.headers), pk=self.forum.id)
+            # the stream ends after the forum is closed
+            return [chunk async for chunk in response.streaming_content]
+
+        listeners = []
+        for _ in range(20):
+            listeners += [asyncio.ensure_future(listen()) for _ in range(500)]
+            await asyncio.sleep(0.01)
+        while hub.stats()["subscriptions"] < 10000 and not any(listener.done() for listener in listeners):
+            await asyncio.sleep(0.01)
+        self.assertEqual(hub.stats()["subscriptions"], 10000)
+
+        await self.forum.aadd_participants([self.participants[1]])
+        await sync_to_async(self.close_forum)()
+        streams = await asyncio.wait_for(asyncio.gather(*listeners), 60)
+
+        self.assertEqual(
+            {tuple(chunk.split(b"\n")[1] for chunk in chunks) for chunks in streams},
+            {(b"event: " + ForumEvent.PARTICIPANTS_ADDED.encode(), b"event: " + ForumEvent.FORUM_CLOSED.encode())},
+        )
+        self.assertEqual(hub.stats()["subscriptions"], 0)
+
+
+class ForumInviteJobTest(TestCase):
+    def setUp(self):
+        self.user = User.register("Test User", "test", "password")
+        self.participants = [
+            User.register(f"user {number}", f"user{number}", "password")
+            for number in range(3)
+        ]
+        self.invited = []
+        participants_invited.connect(self.receive)
+
+    def tearDown(self):
+        participants_invited.disconnect(self.receive)
+
+    def receive(self, sender, forum, participants, **kwargs):
+        self.invited.append((forum.id, [participant.user.username for participant in participants]))
+
+    def test_create_forum_fans_out_from_a_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            forum = Forum.create_forum("testing", None, self.user, [user.id for user in self.participants[:2]])
+
+        self.assertEqual(self.invited, [])
+        self.assertEqual(Job.objects.get().payload, {"forum_id": forum.id})
+
+        Worker().run(once=True)
+
+        self.assertEqual(self.invited, [(forum.id, ["user0", "user1"])])
+        self.assertFalse(Job.objects.exists())
+
+    def test_add_participant_fans_out_only_the_new_participant(self):
+        forum = Forum.create_forum("testing", None, self.user, [self.participants[0].id])
+        with self.captureOnCommitCallbacks(execute=True):
+            forum.add_participant(self.participants[2])
+
+        Worker().run(once=True)
+
+        self.assertEqual(self.invited, [(forum.id, ["user2"])])
+
+    def test_rolled_back_forum_enqueues_nothing(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(NotFound):
+                with transaction.atomic():
+                    Forum.create_forum("testing", None, self.user, [self.participants[0].id])
+                    raise NotFound()
+
+        self.assertEqual(callbacks, [])
+
+
+class ForumEventTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.register("Test User", "test", "password")
+        self.participants = [
+            User.register(f"user {number}", f"user{number}", "password")
+            for number in range(3)
+        ]
+        self.forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[self.participants[0].id]
+        )
+        self.headers = {"Authorization": f'Bearer {self.user.generate_token()["access"]}'}
+
+    def get_kinds(self, after=0):
+        return [event.kind for event in ForumEvent.get_events(after, 100)]
+
+    def test_create_forum_records_one_event(self):
+        event = ForumEvent.objects.get()
+
+        self.assertEqual(event.kind, ForumEvent.FORUM_CREATED)
+        self.assertEqual(event.forum_id, self.forum.id)
+        self.assertEqual(event.data, {"topic": "testing", "initiator": self.user.id, "participants": [self.participants[0].id]})
+
+    def test_writes_append_events_in_order(self):
+        self.forum.add_participants(self.participants[1:])
+        self.forum.transition_participants_by(self.user, None, ForumParticipant.ACCEPT)
+        self.forum.close_by(self.user)
+
+        self.assertEqual(self.get_kinds(), [
+            ForumEvent.FORUM_CREATED,
+            ForumEvent.PARTICIPANTS_ADDED,
+            ForumEvent.PARTICIPANTS_STATUS,
+            ForumEvent.FORUM_CLOSED,
+        ])
+        added = ForumEvent.objects.get(kind=ForumEvent.PARTICIPANTS_ADDED)
+        self.assertEqual(added.data["users"], [self.participants[1].id, self.participants[2].id])
+
+    def test_set_status_records_event(self):
+        participant = self.forum.get_participants().get(initiator=False)
+        participant.set_status(ForumParticipant.DENY)
+        event = ForumEvent.objects.latest('id')
+
+        self.assertEqual(event.kind, ForumEvent.PARTICIPANTS_STATUS)
+        self.assertEqual(event.data, {"participants": [participant.id], "status": ForumParticipant.DENY})
+
+    def test_transition_without_changes_records_nothing(self):
+        self.forum.transition_participants_by(self.user, None, ForumParticipant.ACCEPT)
+        after = ForumEvent.objects.latest('id').id
+        self.forum.transition_participants_by(self.user, None, ForumParticipant.ACCEPT)
+
+        self.assertEqual(self.get_kinds(after), [])
+
+    def test_events_api_resumes_after_sequence(self):
+        self.forum.add_participants(self.participants[1:])
+        self.forum.close_by(self.user)
+
+        view = ForumView.as_view({'get': 'events'})
+        request = self.factory.get('/forums/events/?limit=2')
+        force_authenticate(request, user=self.user)
+        response_data = view(request).data
+        self.assertEqual([event["kind"] for event in response_data["results"]], [ForumEvent.FORUM_CREATED, ForumEvent.PARTICIPANTS_ADDED])
+
+        request = self.factory.get(f'/forums/events/?after={response_data["after"]}')
+        force_authenticate(request, user=self.user)
+        response_data = view(request).data
+        self.assertEqual([event["kind"] for event in response_data["results"]], [ForumEvent.FORUM_CLOSED])
+
+        request = self.factory.get(f'/forums/events/?after={response_data["after"]}')
+        force_authenticate(request, user=self.user)
+        self.assertEqual(view(request).data["results"], [])
+
+    async def test_long_poll_api_returns_pending_events(self):
+        response = await self.async_client.get('/async/forums/events/?wait=5', headers=self.headers)
+        response_data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event["kind"] for event in response_data["results"]], [ForumEvent.FORUM_CREATED])
+
+    @override_settings(FORUM_EVENTS_POLL_INTERVAL=0.01)
+    async def test_long_poll_api_times_out_empty(self):
+        after = (await ForumEvent.objects.alatest('id')).id
+
+        response = await self.async_client.get(f'/async/forums/events/?after={after}&wait=0.05', headers=self.headers)
+
+        self.assertEqual(response.json(), {"after": after, "results": []})
+
+    @override_settings(FORUM_EVENTS_POLL_INTERVAL=60)
+    async def test_long_poll_api_wakes_on_published_event(self):
+        after = (await ForumEvent.objects.alatest('id')).id
+        poll = asyncio.ensure_future(
+            self.async_client.get(f'/async/forums/events/?after={after}&wait=30', headers=self.headers)
+        )
+        while hub.stats()["subscriptions"] == 0:
+            await asyncio.sleep(0.01)
+
+        await self.forum.aadd_participants([self.participants[1]])
+        response = await asyncio.wait_for(poll, 5)
+
+        self.assertEqual([event["kind"] for event in response.json()["results"]], [ForumEvent.PARTICIPANTS_ADDED])
+        self.assertEqual(hub.stats()["subscriptions"], 0)
+
+
+class ForumExportTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.register("Test User", "test", "password")
+        self.participants = [
+            User.register(f"user {number}", f"user{number}", "password")
+            for number in range(3)
+        ]
+        self.forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[participant.id for participant in self.participants]
+        )
+
+    def get_content(self, url, view_method: dict, **kwargs):
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user)
+        response = ForumView.as_view(view_method)(request, **kwargs)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_participant_ndjson_export_api(self):
+        response, content = self.get_content(
+            f'/forums/{self.forum.id}/participants/export/', {'get': 'export_participants'}, pk=self.forum.id
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([row["user"] for row in rows], [participant.user_id for participant in self.forum.get_participants()])
+        self.assertEqual(rows[-1]["name"], "Test User")
+        self.assertEqual(rows[-1]["username"], "test")
+
+    def test_forum_csv_export_api(self):
+        response, content = self.get_content('/forums/export/?output=csv', {'get': 'export_forums'})
+        rows = list(csv.reader(StringIO(content)))
+
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="forums.csv"')
+        self.assertEqual(rows[0], list(export.FORUM_COLUMNS))
+        self.assertEqual(rows[1][:2], [str(self.forum.id), "testing"])
+
+    def test_invalid_output_export_api(self):
+        request = self.factory.get('/forums/export/?output=xml')
+        force_authenticate(request, user=self.user)
+        response = ForumView.as_view({'get': 'export_forums'})(request)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_forums_command(self):
+        out, err = StringIO(), StringIO()
+        call_command("export_forums", forum=self.forum.id, output="csv", stdout=out, stderr=err)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+        self.assertIn("exported 4 row(s)", err.getvalue())
+
+    def test_export_forums_command_unknown_forum(self):
+        with self.assertRaises(CommandError):
+            call_command("export_forums", forum=100, stdout=StringIO(), stderr=StringIO())
+
+    def insert_participants(self, count: int):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < %s)
+                INSERT INTO {ForumParticipant._meta.db_table} (forum_id, user_id, initiator, status, created_at, updated_at)
+                SELECT %s, %s, %s, %s, %s, %s FROM numbers
+                """,
+                [count, self.forum.id, self.participants[0].id, False, ForumParticipant.WAITING, timezone.now(), timezone.now()],
+            )
+
+    def measure_export(self, chunk_size: int):
+        tracemalloc.start()
+        try:
+            rows = export.participant_rows(self.forum, chunk_size=chunk_size)
+            lines = sum(1 for _ in export.render("csv", export.PARTICIPANT_COLUMNS, rows))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return lines, peak
+
+    def test_participant_export_memory_is_bounded_by_chunk(self):
+        chunk_size = 500
+        self.insert_participants(4 * chunk_size)
+        lines, small_peak = self.measure_export(chunk_size)
+        self.assertEqual(lines, 4 * chunk_size + 5)
+
+        self.insert_participants(36 * chunk_size)
+        lines, large_peak = self.measure_export(chunk_size)
+        self.assertEqual(lines, 40 * chunk_size + 5)
+
+        # ten times the rows, about the same peak: memory follows the chunk, not the export
+        self.assertLess(large_peak, small_peak * 1.5)
+
+
+class ForumViewTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = ForumView
+        self.url = '/forums/'
+
+        self.user = User.register("Test User", "test", "password")
+        self.participants = [
+            User.register(f"user {number}", f"user{number}", "password")
+            for number in range(5)
+        ]
+        self.forum = Forum.create_forum(
+            topic="testing",
+            description="description",
+            initiator=self.user,
+            participants=[participant.id for participant in self.participants]
+        )
+
+    def get_response(self, request, view_method: dict, **kwargs):
+        force_authenticate(request, user=self.user)
+        view = self.view.as_view(view_method)
+        response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_status_code_create_forum_api(self):
+        data = {"topic": "new topic", "description": "new", "participants": [self.participants[0].id]}
+
+        request = self.factory.post(self.url, data=data, format='json')
+        response = self.get_response(request, {'post': 'create'})
+        response_data = json.loads(response.content.decode())
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response_data["topic"], "new topic")
+
+    def test_unauthenticated_forum_list_api(self):
+        request = self.factory.get(self.url)
+        response = self.view.as_view({'get': 'list'})(request)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_retrieve_forum_api(self):
+        request = self.factory.get(f'{self.url}{self.forum.id}/')
+        response = self.get_response(request, {'get': 'retrieve'}, pk=self.forum.id)
+        response_data = json.loads(response.content.decode())
+
+        self.assertEqual(response_data["id"], self.forum.id)
+
+    def test_not_found_retrieve_forum_api(self):
+        request = self.factory.get(f'{self.url}100/')
+        response = self.get_response(request, {'get': 'retrieve'}, pk=100)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_forum_list_api(self):
+        request = self.factory.get(self.url)
+        response = self.get_response(request, {'get': 'list'})
+        response_data = json.loads(response.content.decode())
+
+        self.assertEqual([forum["id"] for forum in response_data["results"]], [self.forum.id])
+        self.assertIsNone(response_data["next"])
+
+    def test_participant_list_api_walks_every_page_once(self):
+        url = f'{self.url}{self.forum.id}/participants/?page_size=2'
+        seen = []
+        while url:
+            request = self.factory.get(url)
+            response = self.get_response(request, {'get': 'participants'}, pk=self.forum.id)
+            response_data = json.loads(response.content.decode())
+            seen += [participant["user"] for participant in response_data["results"]]
+            url = response_data["next"]
+
+        expected = [participant.user_id for participant in self.forum.get_participants()]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 6)
+
+    def test_participant_list_api_query_budget(self):
+        request = self.factory.get(f'{self.url}{self.forum.id}/participants/')
+
+        with self.assertQueryBudget(2, "participant list api"):
+            self.get_response(request, {'get': 'participants'}, pk=self.forum.id)
+
+    def test_inbox_api(self):
+        other = Forum.create_forum("other", None, self.participants[0], [self.user.id])
+        other.close_by(self.participants[0])
+
+        request = self.factory.get(f'{self.url}inbox/')
+        with self.assertQueryBudget(1, "inbox api"):
+            response = self.get_response(request, {'get': 'inbox'})
+        response_data = json.loads(response.content.decode())
+
+        self.assertEqual([item["forum"]["id"] for item in response_data["results"]], [other.id, self.forum.id])
+        self.assertEqual(response_data["results"][0]["status"], ForumParticipant.WAITING)
+        self.assertEqual(response_data["results"][0]["forum"]["status"], Forum.CLOSED)
+        self.assertIsNotNone(response_data["results"][0]["forum"]["closed_at"])
+        self.assertEqual(
+            response_data["results"][0]["forum"]["initiator"],
+            {"id": self.participants[0].id, "username": "user0", "name": "user 0"},
+        )
+
+    def test_inbox_api_filtered_by_status_walks_every_page_once(self):
+        forums = [
+            Forum.create_forum(f"other {number}", None, self.participants[0], [self.user.id])
+            for number in range(3)
+        ]
+
+        url = f'{self.url}inbox/?status={ForumParticipant.WAITING}&page_size=2'
+        seen = []
+        while url:
+            response = self.get_response(self.factory.get(url), {'get': 'inbox'})
+            response_data = json.loads(response.content.decode())
+            seen += [item["forum"]["id"] for item in response_data["results"]]
+            url = response_data["next"]
+
+        self.assertEqual(seen, [forum.id for forum in reversed(forums)])
+
+    def test_inbox_api_invalid_status(self):
+        response = self.get_response(self.factory.get(f'{self.url}inbox/?status=9'), {'get': 'inbox'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_inbox_query_covers_participants_with_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("checks the SQLite query plan")
+        participants = ForumParticipant.get_inbox(self.user.id, ForumParticipant.ACCEPT).order_by('-created_at', '-id')
+
+        with connection.cursor() as cursor:
+            sql, params = participants.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+
+        self.assertIn("forum_forumparticipant USING COVERING INDEX", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_retrieve_forum_api_not_modified(self):
+        url = f'{self.url}{self.forum.id}/'
+        response = self.get_response(self.factory.get(url), {'get': 'retrieve'}, pk=self.forum.id)
+        etag = response["ETag"]
+
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=etag)
+        response = self.get_response(request, {'get': 'retrieve'}, pk=self.forum.id)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_participant_list_api_not_modified_skips_participant_query(self):
+        url = f'{self.url}{self.forum.id}/participants/'
+        response = self.get_response(self.factory.get(url), {'get': 'participants'}, pk=self.forum.id)
+
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        with self.assertQueryBudget(1, "fresh participant list api"):
+            response = self.get_response(request, {'get': 'participants'}, pk=self.forum.id)
+        self.assertEqual(response.status_code, 304)
+
+        request = self.factory.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        response = self.get_response(request, {'get': 'participants'}, pk=self.forum.id)
+        self.assertEqual(response.status_code, 304)
+
+    def test_participant_list_api_etag_changes_after_transition(self):
+        url = f'{self.url}{self.forum.id}/participants/'
+        etag = self.get_response(self.factory.get(url), {'get': 'participants'}, pk=self.forum.id)["ETag"]
+        self.forum.transition_participants_by(self.user, None, ForumParticipant.ACCEPT)
+
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=etag)
+        response = self.get_response(request, {'get': 'participants'}, pk=self.forum.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(json.loads(response.content.decode())["results"]), 6)
+
+    def test_participant_list_api_etag_changes_after_user_rename(self):
+        url = f'{self.url}{self.forum.id}/participants/'
+        etag = self.get_response(self.factory.get(url), {'get': 'participants'}, pk=self.forum.id)["ETag"]
+        user = User.objects.get(pk=self.participants[0].pk)
+        user.set_name("Renamed User")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        Worker().run(once=True)
+
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=etag)
+        response = self.get_response(request, {'get': 'participants'}, pk=self.forum.id)
+
+        self.assertEqual(response.status_code, 200)
+        names = [item["name"] for item in json.loads(response.content.decode())["results"]]
+        self.assertIn("Renamed User", names)
+
+    def test_transition_participants_api(self):
+        participant = self.forum.get_participants().filter(initiator=False).first()
+        data = {"participants": [participant.id], "status": ForumParticipant.ACCEPT}
+
+        request = self.factory.post(f'{self.url}{self.forum.id}/participants/transition/', data=data, format='json')
+        response = self.get_response(request, {'post': 'transition_participants'}, pk=self.forum.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode()), {"participants": [participant.id]})
+
+    def test_invalid_cursor_participant_list_api(self):
+        request = self.factory.get(f'{self.url}{self.forum.id}/participants/?cursor=invalid')
+        response = self.get_response(request, {'get': 'participants'}, pk=self.forum.id)
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PARTICIPANT_SHARDS={'ALIASES': ['shard1', 'shard2']})
+class ParticipantRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ParticipantRouter()
+
+    def test_shard_is_picked_by_forum_id(self):
+        self.assertEqual([get_shard(forum_id) for forum_id in (1, 2, 3, 4)], ['shard2', 'shard1', 'shard2', 'shard1'])
+        with override_settings(PARTICIPANT_SHARDS={'ALIASES': []}):
+            self.assertEqual(get_shard(1), DEFAULT_DB_ALIAS)
+
+    def test_routes_participants_through_instances(self):
+        forum = Forum(id=3)
+        participant = ForumParticipant(forum_id=4)
+
+        self.assertEqual(self.router.db_for_read(ForumParticipant, instance=forum), 'shard2')
+        self.assertEqual(self.router.db_for_write(ForumParticipant, instance=participant), 'shard1')
+        self.assertIsNone(self.router.db_for_read(ForumParticipant))
+        self.assertIsNone(self.router.db_for_read(Forum, instance=participant))
+
+    def test_shards_only_run_schema_migrations(self):
+        self.assertTrue(self.router.allow_migrate('shard1', 'forum', model_name='forumparticipant'))
+        self.assertFalse(self.router.allow_migrate('shard1', 'forum'))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'forum'))
+
+
+@skipUnless(len(settings.PARTICIPANT_SHARDS['ALIASES']) >= 2, "needs DB_SHARDS with two SQLite files")
+class ForumShardTest(TransactionTestCase):
+    """
+    Participants sharded over local SQLite files:
+    DB_SHARDS=shard1.sqlite3,shard2.sqlite3 python manage.py test forum.tests.ForumShardTest
+    """
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.register("Test User", "test", "password")
+        self.participants = [
+            User.register(f"user {number}", f"user{number}", "password")
+            for number in range(3)
+        ]
+        # consecutive ids land on different shards
+        self.forums = [
+            Forum.create_forum(f"forum {number}", None, self.user, [user.id for user in self.participants])
+            for number in range(2)
+        ]
+        self.headers = {"HTTP_AUTHORIZATION": f'Bearer {self.participants[0].generate_token()["access"]}'}
+
+    def tearDown(self):
+        active_users.clear()
+        active_users.backend.clear()
+
+    def count_by_database(self, forum) -> dict:
+        databases = [DEFAULT_DB_ALIAS, *settings.PARTICIPANT_SHARDS['ALIASES']]
+        return {using: ForumParticipant.objects.using(using).filter(forum=forum).count() for using in databases}
+
+    def foreign_keys(self, using: str) -> set:
+        with connections[using].cursor() as cursor:
+            constraints = connections[using].introspection.get_constraints(cursor, ForumParticipant._meta.db_table)
+        return {constraint["columns"][0] for constraint in constraints.values() if constraint["foreign_key"]}
+
+    def test_foreign_keys_are_only_constrained_on_primary(self):
+        self.assertEqual(self.foreign_keys(DEFAULT_DB_ALIAS), {"forum_id", "user_id"})
+        for using in settings.PARTICIPANT_SHARDS['ALIASES']:
+            self.assertEqual(self.foreign_keys(using), set())
+
+    def test_participants_are_stored_on_forum_shard(self):
+        shards = {get_shard(forum.id) for forum in self.forums}
+        self.assertEqual(len(shards), 2)
+
+        for forum in self.forums:
+            counts = self.count_by_database(forum)
+            self.assertEqual(counts.pop(get_shard(forum.id)), 4)
+            self.assertEqual(set(counts.values()), {0})
+            self.assertEqual(
+                {user.username for user in forum.get_participant_users()},
+                {"test", "user0", "user1", "user2"},
+            )
+            self.assertEqual(ForumParticipant.get_initiator(forum), self.user)
+
+        ids = [participant.id for forum in self.forums for participant in forum.get_participants()]
+        self.assertEqual(len(set(ids)), 8)
+
+    def test_writes_go_to_forum_shard(self):
+        forum = Forum.objects.get(pk=self.forums[1].pk)
+        extra = User.register("user 3", "user3", "password")
+        forum.add_participant(extra)
+        ids = forum.transition_participants_by(self.user, None, ForumParticipant.ACCEPT)
+
+        participant = forum.get_participants().get(user=extra)
+        self.assertIn(participant.id, ids)
+        self.assertTrue(participant.set_status(ForumParticipant.DENY))
+
+        forum.refresh_from_db()
+        self.assertEqual((forum.accepted_count, forum.denied_count, forum.waiting_count), (4, 1, 0))
+        self.assertEqual(self.count_by_database(forum)[get_shard(forum.id)], 5)
+
+    def test_rolled_back_forum_leaves_nothing_on_shards(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                forum = Forum.create_forum("rolled back", None, self.user, [self.participants[0].id])
+                raise RuntimeError
+        self.assertEqual(set(self.count_by_database(forum).values()), {0})
+
+        # SQLite hands the rolled back forum id out again
+        forum = Forum.create_forum("after rollback", None, self.user, [self.participants[1].id])
+        self.assertEqual({user.username for user in forum.get_participant_users()}, {"test", "user1"})
+        ids = [participant.id for forum in Forum.objects.all() for participant in forum.get_participants()]
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_failed_shard_write_is_retried_by_job(self):
+        self.assertFalse(Job.objects.filter(name=WRITE_PARTICIPANTS_JOB).exists())
+
+        # as in an ATOMIC_REQUESTS view; only the initiator is saved one by one
+        with patch.object(QuerySet, 'bulk_create', autospec=True, side_effect=OperationalError("shard is down")):
+            with self.assertLogs('forum.models', 'WARNING'), transaction.atomic():
+                forum = Forum.create_forum("shard down", None, self.user, [self.participants[0].id])
+        self.assertEqual(self.count_by_database(forum)[get_shard(forum.id)], 1)
+
+        Job.objects.update(run_after=timezone.now())
+        Worker().run(once=True)
+
+        self.assertEqual(self.count_by_database(forum)[get_shard(forum.id)], 2)
+        self.assertEqual({user.username for user in forum.get_participant_users()}, {"test", "user0"})
+        self.assertFalse(Job.objects.exists())
+
+    async def test_async_writes_go_to_forum_shard(self):
+        forum = await Forum.objects.aget(pk=self.forums[0].pk)
+        extra = await sync_to_async(User.register)("user 3", "user3", "password")
+        participants = await forum.aadd_participants([extra])
+
+        counts = await sync_to_async(self.count_by_database)(forum)
+        self.assertEqual(counts[get_shard(forum.id)], 5)
+        self.assertEqual(await forum.get_participants().filter(user=extra).aget(), participants[0])
+
+    def test_inbox_api_merges_shards(self):
+        seen = []
+        url = '/forums/inbox/?page_size=1'
+        while url:
+            response = self.client.get(url, **self.headers).json()
+            seen += [(item["forum"]["id"], item["forum"]["initiator"]["username"]) for item in response["results"]]
+            url = response["next"]
+
+        self.assertEqual(seen, [(forum.id, "test") for forum in reversed(self.forums)])
+
+    def test_participant_list_and_export_api(self):
+        forum = self.forums[0]
+        response = self.client.get(f'/forums/{forum.id}/participants/', **self.headers).json()
+        self.assertEqual({item["username"] for item in response["results"]}, {"test", "user0", "user1", "user2"})
+
+        rows = list(export.participant_rows(forum, chunk_size=2))
+        self.assertEqual({row[3] for row in rows}, {"test", "user0", "user1", "user2"})
+
+    def test_export_skips_participants_without_user(self):
+        forum = self.forums[0]
+        # PROTECT only sees participants on the primary, not on the shards
+        User.objects.filter(pk=self.participants[2].pk).delete()
+
+        rows = list(export.participant_rows(forum, chunk_size=2))
+        self.assertEqual({row[3] for row in rows}, {"test", "user0", "user1"})
+
+    def test_rebuild_counters_reads_every_shard(self):
+        Forum.objects.update(accepted_count=0, waiting_count=0)
+
+        call_command('rebuild_forum_counters', stdout=StringIO())
+
+        counters = set(Forum.objects.values_list('accepted_count', 'waiting_count'))
+        self.assertEqual(counters, {(1, 3)})
+
+    def test_rebalance_moves_participants_to_their_shard(self):
+        forum = self.forums[0]
+        shard = get_shard(forum.id)
+        other = next(alias for alias in settings.PARTICIPANT_SHARDS['ALIASES'] if alias != shard)
+        participants = list(ForumParticipant.objects.using(shard).filter(forum=forum).order_by('id'))
+        ForumParticipant.objects.using(shard).filter(forum=forum).delete()
+        # as left by an unsharded deployment and by a changed shard count
+        models.QuerySet.bulk_create(ForumParticipant.objects.using(DEFAULT_DB_ALIAS), participants[:2])
+        models.QuerySet.bulk_create(ForumParticipant.objects.using(other), participants[2:])
+
+        out = StringIO()
+        call_command('rebalance_participants', '--dry-run', stdout=out)
+        self.assertIn(f"{other}: 2 participant(s) to move", out.getvalue())
+
+        call_command('rebalance_participants', '--batch-size=1', stdout=StringIO())
+        self.assertEqual(self.count_by_database(forum), {DEFAULT_DB_ALIAS: 0, shard: 4, other: 0})
+        moved = list(ForumParticipant.objects.using(shard).filter(forum=forum).order_by('id'))
+        self.assertEqual(
+            [(participant.id, participant.updated_at) for participant in moved],
+            [(participant.id, participant.updated_at) for participant in participants],
+        )
+
+        out = StringIO()
+        call_command('rebalance_participants', stdout=out)
+        self.assertEqual(out.getvalue().count("moved 0 participant(s)"), 3)
+
+    def test_rebalance_keeps_participants_whose_id_is_taken(self):
+        forum = self.forums[0]
+        shard = get_shard(forum.id)
+        other = next(alias for alias in settings.PARTICIPANT_SHARDS['ALIASES'] if alias != shard)
+        taken = ForumParticipant.objects.using(shard).filter(forum=forum).first()
+        extra = User.register("user 3", "user3", "password")
+        ForumParticipant.objects.using(other).create(id=taken.id, forum=forum, user=extra)
+
+        out, err = StringIO(), StringIO()
+        call_command('rebalance_participants', stdout=out, stderr=err)
+
+        self.assertIn(f"{other}: moved 0 participant(s)", out.getvalue())
+        self.assertIn(f"{other}: kept 1 participant(s) whose id is taken on their shard", err.getvalue())
+        self.assertEqual(ForumParticipant.objects.using(other).get(id=taken.id).user, extra)
+        self.assertEqual(ForumParticipant.objects.using(shard).get(id=taken.id).user_id, taken.user_id)
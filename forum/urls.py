@@ -0,0 +1,12 @@
+from rest_framework.routers import SimpleRouter
+
+from . import views
+
+
+app_name = 'forum'
+
+router = SimpleRouter()
+router.register('', views.ForumView, basename='forum')
+
+urlpatterns = []
+urlpatterns += router.urls
@@ -1,3 +1,151 @@
-from django.shortcuts import render
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
 
-# Create your views here.
+from util.pagination import KeysetPagination
+from util.views import NonAtomicReadMixin, conditional_response, set_validators
+from . import export
+from .models import Forum, ForumEvent, ForumParticipant
+from .serializers import (
+    CreateForumSerializer,
+    ExportSerializer,
+    ForumEventQuerySerializer,
+    ForumEventSerializer,
+    ForumSearchSerializer,
+    ForumSerializer,
+    InboxQuerySerializer,
+    InboxSerializer,
+    ParticipantSerializer,
+    SearchForumSerializer,
+    TransitionParticipantsSerializer,
+)
+from .sharding import is_sharded
+
+User = get_user_model()
+
+
+class ForumView(NonAtomicReadMixin, GenericViewSet):
+    permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def list(self, request):
+        forums = self.paginate_queryset(Forum.objects.all())
+        serializer = ForumSerializer(forums, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def create(self, request):
+        serializer = CreateForumSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
+
+        forum = Forum.create_forum(
+            topic=validated_data["topic"],
+            description=validated_data.get("description"),
+            initiator=User.get_active_user(request.user.id),
+            participants=validated_data["participants"],
+        )
+
+        return Response(ForumSerializer(forum).data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['get'], detail=False)
+    def search(self, request):
+        serializer = SearchForumSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
+        page, page_size = validated_data["page"], validated_data["page_size"]
+
+        forums = Forum.search(validated_data["q"], limit=page_size + 1, offset=(page - 1) * page_size)
+        next_url = None
+        if len(forums) > page_size:
+            next_url = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+
+        response_serializer = ForumSearchSerializer(forums[:page_size], many=True)
+        return Response({"next": next_url, "results": response_serializer.data})
+
+    @action(methods=['get'], detail=False)
+    def events(self, request):
+        serializer = ForumEventQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        after = serializer.validated_data["after"]
+
+        events = list(ForumEvent.get_events(after, serializer.validated_data["limit"]))
+        return Response({
+            "after": events[-1].id if events else after,
+            "results": ForumEventSerializer(events, many=True).data,
+        })
+
+    @action(methods=['get'], detail=False)
+    def inbox(self, request):
+        serializer = InboxQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        participant_status = serializer.validated_data.get("status")
+        if is_sharded():
+            paginator = self.paginator
+            paginator.request = request
+            rows = ForumParticipant.get_sharded_inbox(
+                request.user.id, participant_status, lambda queryset: paginator.get_page_queryset(queryset, request.query_params),
+            )
+            page = paginator.set_page(rows)
+        else:
+            page = self.paginate_queryset(ForumParticipant.get_inbox(request.user.id, participant_status))
+        return self.get_paginated_response(InboxSerializer(page, many=True).data)
+
+    def retrieve(self, request, pk=None):
+        forum = Forum.get_forum(pk)
+        validators = forum.get_validators('detail')
+        response = conditional_response(request, *validators)
+        if response is not None:
+            return response
+        return set_validators(Response(ForumSerializer(forum).data), *validators)
+
+    @action(methods=['get'], detail=True)
+    def participants(self, request, pk=None):
+        forum = Forum.get_forum(pk)
+        validators = forum.get_validators('participants')
+        response = conditional_response(request, *validators)
+        if response is not None:
+            return response
+
+        participants = self.paginate_queryset(forum.get_participants().with_users())
+        serializer = ParticipantSerializer(participants, many=True)
+        return set_validators(self.get_paginated_response(serializer.data), *validators)
+
+    @action(methods=['get'], detail=False, url_path='export')
+    def export_forums(self, request):
+        return self.stream_export(request, "forums", export.FORUM_COLUMNS, export.forum_rows())
+
+    @action(methods=['get'], detail=True, url_path='participants/export')
+    def export_participants(self, request, pk=None):
+        forum = Forum.get_forum(pk)
+        rows = export.participant_rows(forum)
+        return self.stream_export(request, f"forum-{forum.id}-participants", export.PARTICIPANT_COLUMNS, rows)
+
+    def stream_export(self, request, name: str, columns, rows):
+        serializer = ExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        output = serializer.validated_data["output"]
+
+        response = StreamingHttpResponse(export.render(output, columns, rows), content_type=export.CONTENT_TYPES[output])
+        response["Content-Disposition"] = f'attachment; filename="{name}.{output}"'
+        return response
+
+    @action(methods=['post'], detail=True, url_path='participants/transition')
+    def transition_participants(self, request, pk=None):
+        serializer = TransitionParticipantsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
+
+        forum = Forum.get_forum(pk)
+        ids = forum.transition_participants_by(
+            request.user,
+            validated_data.get("participants"),
+            validated_data["status"],
+        )
+
+        return Response({"participants": ids})
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'forum_api.settings')
+# sync ORM calls run in fresh executor threads under ASGI, so persistent
+# connections pile up instead of being reused (Django ticket #33497)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,10 +44,18 @@ INSTALLED_APPS = [
 
     'user',
     'util',
+    'job',
     'forum',
 ]
 
+# BENCHMARK_APP=1 installs the benchmark app for its `benchmark_api` command;
+# it only seeds throwaway databases, so deployments leave it out
+if os.environ.get('BENCHMARK_APP') == '1':
+    INSTALLED_APPS.append('benchmark')
+
 MIDDLEWARE = [
+    'util.middleware.QueryMetricsMiddleware',
+    'util.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,14 +89,128 @@ WSGI_APPLICATION = 'forum_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DB_ENGINE selects sqlite3 (default) or postgresql. Connections are kept open
+# for DB_CONN_MAX_AGE seconds and health checked before reuse. forum_api.asgi
+# defaults it to 0; pool connections with DB_POOL=pgbouncer there instead.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': f'django.db.backends.{DB_ENGINE}',
+        'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
         'ATOMIC_REQUESTS': True,
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+if DB_ENGINE == 'postgresql':
+    DATABASES['default'].update({
+        'NAME': os.environ.get('DB_NAME', 'forum_api'),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+    })
+
+    # DB_POOL=pgbouncer: connections go through PgBouncer in transaction pooling
+    # mode, which cannot keep server-side cursors open across transactions.
+    if os.environ.get('DB_POOL') == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# PRAGMAs applied to every new SQLite connection (see util.db). WAL lets readers
+# run alongside the writer and synchronous=NORMAL is durable under WAL except
+# for power loss; cache_size is in KiB when negative, mmap_size in bytes.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+}
+
+if os.environ.get('SQLITE_TUNING', '1') == '0':
+    SQLITE_PRAGMAS = {}
+
+# DB_REPLICAS: comma-separated read replicas of `default` (PostgreSQL hosts, or
+# SQLite files as a stand-in), added as replica1, replica2, ... and routed by
+# util.routers.ReplicaRouter. Nothing replicates SQLite files, so their test
+# databases are separate from the primary's instead of mirroring it.
+# A user who wrote reads from the primary for REPLICA_STICKY_SECONDS.
+
+REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': float(os.environ.get('REPLICA_STICKY_SECONDS', 5)),
+    'CACHE_ALIAS': 'default',
+}
+
+for number, location in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    replica = {**DATABASES['default'], 'ATOMIC_REQUESTS': False}
+    if DB_ENGINE == 'postgresql':
+        replica.update({'HOST': location, 'TEST': {'MIRROR': 'default'}})
+    else:
+        replica['NAME'] = location
+    DATABASES[alias] = replica
+    REPLICAS['ALIASES'].append(alias)
+
+# DB_SHARDS: comma-separated databases (PostgreSQL hosts, or SQLite files) that
+# hold forum participants instead of `default`, added as shard1, shard2, ... and
+# picked by forum id (forum.sharding). Migrate each one with
+# `migrate --database=shardN` and run `rebalance_participants` after changing the list.
+
+PARTICIPANT_SHARDS = {
+    'ALIASES': [],
+}
+
+for number, location in enumerate(filter(None, os.environ.get('DB_SHARDS', '').split(',')), 1):
+    alias = f'shard{number}'
+    shard = {**DATABASES['default'], 'ATOMIC_REQUESTS': False}
+    if DB_ENGINE == 'postgresql':
+        shard['HOST'] = location
+    else:
+        shard['NAME'] = location
+    DATABASES[alias] = shard
+    PARTICIPANT_SHARDS['ALIASES'].append(alias)
+
+DATABASE_ROUTERS = ['forum.sharding.ParticipantRouter', 'util.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# live forum streams (util.pubsub): LocalBackend only reaches subscribers in
+# the publishing process, so multi-process deployments need RedisBackend
+PUBSUB = {
+    'BACKEND': 'util.pubsub.LocalBackend',
+    'BUFFER_SIZE': int(os.environ.get('PUBSUB_BUFFER_SIZE', 64)),
+}
+
+if os.environ.get('REDIS_URL'):
+    PUBSUB['BACKEND'] = 'util.pubsub.RedisBackend'
+    PUBSUB['OPTIONS'] = {'location': os.environ['REDIS_URL']}
+
+ACTIVE_USER_CACHE = {
+    'ALIAS': 'default',
+    'LOCAL_MAX_SIZE': int(os.environ.get('ACTIVE_USER_CACHE_LOCAL_MAX_SIZE', 1024)),
+    'LOCAL_TTL': float(os.environ.get('ACTIVE_USER_CACHE_LOCAL_TTL', 5)),
+    'TIMEOUT': int(os.environ.get('ACTIVE_USER_CACHE_TIMEOUT', 300)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -109,6 +232,94 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'user.User'
 
+# Password hashing
+# PASSWORD_HASHER_POLICY picks the hasher used for new passwords. Stored hashes
+# made with another policy or older work factors are rehashed on next login.
+
+PASSWORD_HASHER_POLICY = os.environ.get('PASSWORD_HASHER_POLICY', 'pbkdf2')
+
+PASSWORD_HASHER_WORK_FACTORS = {
+    'pbkdf2': {
+        'iterations': int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000)),
+    },
+    'scrypt': {
+        'work_factor': int(os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 14)),
+        'block_size': int(os.environ.get('PASSWORD_SCRYPT_BLOCK_SIZE', 8)),
+        'maxmem': int(os.environ.get('PASSWORD_SCRYPT_MAXMEM', 64 * 1024 * 1024)),
+    },
+    'argon2': {
+        'time_cost': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)),
+        'memory_cost': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 102400)),
+        'parallelism': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 8)),
+    },
+}
+
+# the policy's hasher comes first so new passwords use it; the others stay
+# listed so existing hashes still verify and get upgraded on the next login
+PASSWORD_HASHER_POLICIES = {
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'user.hashers.ScryptPasswordHasher',
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_POLICIES[PASSWORD_HASHER_POLICY]] + [
+    path for policy, path in PASSWORD_HASHER_POLICIES.items() if policy != PASSWORD_HASHER_POLICY
+]
+
+PASSWORD_HASHER_THREADS = int(os.environ.get('PASSWORD_HASHER_THREADS', os.cpu_count() or 1))
+
+LAST_LOGIN_BATCH_SIZE = int(os.environ.get('LAST_LOGIN_BATCH_SIZE', 100))
+
+LAST_LOGIN_FLUSH_INTERVAL = int(os.environ.get('LAST_LOGIN_FLUSH_INTERVAL', 5))
+
+# long-polls wake on published events; this re-read only catches events published
+# where the hub does not reach, e.g. by another process on the local backend
+FORUM_EVENTS_POLL_INTERVAL = float(os.environ.get('FORUM_EVENTS_POLL_INTERVAL', 5))
+
+FORUM_EVENTS_MAX_WAIT = int(os.environ.get('FORUM_EVENTS_MAX_WAIT', 30))
+
+# seconds between keep-alive comments on an idle forum stream, and before the
+# server ends a stream so the client reconnects (resuming from Last-Event-ID)
+FORUM_STREAM_HEARTBEAT = float(os.environ.get('FORUM_STREAM_HEARTBEAT', 15))
+
+FORUM_STREAM_MAX_AGE = float(os.environ.get('FORUM_STREAM_MAX_AGE', 300))
+
+# background jobs (job.worker): claimed in batches under a lease, retried with
+# exponential backoff from BACKOFF_SECONDS up to BACKOFF_MAX_SECONDS
+JOBS = {
+    'BATCH_SIZE': int(os.environ.get('JOBS_BATCH_SIZE', 20)),
+    'LEASE_SECONDS': float(os.environ.get('JOBS_LEASE_SECONDS', 60)),
+    'MAX_ATTEMPTS': int(os.environ.get('JOBS_MAX_ATTEMPTS', 5)),
+    'BACKOFF_SECONDS': float(os.environ.get('JOBS_BACKOFF_SECONDS', 2)),
+    'BACKOFF_MAX_SECONDS': float(os.environ.get('JOBS_BACKOFF_MAX_SECONDS', 600)),
+    'POLL_INTERVAL': float(os.environ.get('JOBS_POLL_INTERVAL', 1)),
+}
+
+# ceiling for booting one API worker (forum_api.settings_api), enforced by util.tests
+STARTUP_BUDGET = {
+    'SECONDS': float(os.environ.get('STARTUP_BUDGET_SECONDS', 2)),
+    'RSS_MB': int(os.environ.get('STARTUP_BUDGET_RSS_MB', 96)),
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'user.authentication.StatelessJWTAuthentication',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_THROTTLE_IP_RATE', '30/min'),
+        'login_username': os.environ.get('LOGIN_THROTTLE_USERNAME_RATE', '10/min'),
+    },
+    # proxies in front of the app; X-Forwarded-For is client input, so it is only
+    # read (at this depth) when NUM_PROXIES is set, and REMOTE_ADDR is used otherwise
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE', 'default')
+
+SIMPLE_JWT = {
+    'TOKEN_USER_CLASS': 'user.authentication.ClaimUser',
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -0,0 +1,39 @@
+"""
+API-only settings profile for the gunicorn/uvicorn workers that serve the JSON
+API. It extends forum_api.settings and drops everything only the admin site and
+the browsable API need (admin, sessions, messages, staticfiles, templates), so
+each worker imports and keeps less.
+
+Use it with DJANGO_SETTINGS_MODULE=forum_api.settings_api. Migrations and the
+admin site still run under forum_api.settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+NON_API_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'benchmark',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in NON_API_APPS]
+
+# token authenticated JSON only: no session, CSRF, messages or frame options
+MIDDLEWARE = [
+    'util.middleware.QueryMetricsMiddleware',
+    'util.middleware.ReplicaMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+TEMPLATES = []
+
+USE_I18N = False
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ('rest_framework.renderers.JSONRenderer',),
+    'DEFAULT_PARSER_CLASSES': ('rest_framework.parsers.JSONParser',),
+}
@@ -14,10 +14,19 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('users/', include('user.urls', namespace='user')),
+    path('forums/', include('forum.urls', namespace='forum')),
+    path('metrics/', include('util.urls', namespace='util')),
+    path('async/users/', include('user.async_urls', namespace='user-async')),
+    path('async/forums/', include('forum.async_urls', namespace='forum-async')),
 ]
+
+# the API-only settings profile (forum_api.settings_api) does not install the admin
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
@@ -0,0 +1,25 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from job.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a background job worker. Start one process per core or host; workers share "
+        "the queue through leases, and SIGTERM or SIGINT let the current batch finish"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="jobs claimed at once (default: JOBS['BATCH_SIZE'])")
+        parser.add_argument("--lease", type=float, help="seconds a claimed job stays reserved (default: JOBS['LEASE_SECONDS'])")
+        parser.add_argument("--poll-interval", type=float, help="seconds to sleep when no job is due")
+        parser.add_argument("--once", action="store_true", help="exit once no job is due")
+
+    def handle(self, *args, **options):
+        worker = Worker(options["batch_size"], options["lease"])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        processed = worker.run(once=options["once"], poll_interval=options["poll_interval"])
+        self.stdout.write(f"processed {processed} job(s)")
@@ -0,0 +1,118 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work for `run_jobs` workers. A worker claims due jobs
+    by writing its lease (`locked_by`, `locked_until`); a job whose lease ran
+    out, because its worker died, is due again. Completed jobs are deleted, so
+    the table only holds pending and failed work.
+    """
+    QUEUED = 1
+    FAILED = 2
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (FAILED, 'Failed'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, null=True)
+    locked_until = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['locked_by']),
+        ]
+
+    @classmethod
+    def enqueue(cls, name: str, **payload):
+        """
+        Queue `name` once the current transaction commits, so workers never see
+        work for rows that may still roll back and the insert adds nothing to the
+        writer's transaction. Outside a transaction the job is inserted at once.
+        """
+        using = router.db_for_write(cls)
+        transaction.on_commit(lambda: cls.objects.using(using).create(name=name, payload=payload), using=using)
+
+    @classmethod
+    async def aenqueue(cls, name: str, **payload):
+        # async code runs in autocommit, so the writes before this call are already committed
+        return await cls.objects.acreate(name=name, payload=payload)
+
+    @classmethod
+    def get_due(cls, now):
+        return cls.objects.filter(status=cls.QUEUED, run_after__lte=now).filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+        )
+
+    @classmethod
+    def claim(cls, limit: int, lease: float = None):
+        """
+        Lease up to `limit` due jobs, oldest first, to a new worker token and
+        return them. Where the database supports it, rows another worker is
+        claiming are skipped with SELECT ... FOR UPDATE SKIP LOCKED; elsewhere
+        (SQLite) a single conditional UPDATE claims them, which the database's
+        one-writer lock keeps exclusive.
+        """
+        options = settings.JOBS
+        using = router.db_for_write(cls)
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        lease = timedelta(seconds=options['LEASE_SECONDS'] if lease is None else lease)
+        due = cls.get_due(now).using(using).order_by('run_after', 'id')
+
+        if connections[using].features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=using):
+                ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+                cls.objects.using(using).filter(id__in=ids).update(locked_by=token, locked_until=now + lease)
+        else:
+            # the outer conditions are checked again on the rows being written
+            cls.get_due(now).using(using).filter(id__in=due.values('id')[:limit]).update(
+                locked_by=token, locked_until=now + lease,
+            )
+        return list(cls.objects.using(using).filter(locked_by=token).order_by('run_after', 'id'))
+
+    def complete(self):
+        # a worker whose lease ran out no longer owns the job
+        Job.objects.filter(pk=self.pk, locked_by=self.locked_by).delete()
+
+    def fail(self, error: str):
+        """Release the job for a retry after an exponential backoff, or mark it FAILED."""
+        options = settings.JOBS
+        self.attempts += 1
+        self.last_error = error
+        if self.attempts >= options['MAX_ATTEMPTS']:
+            self.status = self.FAILED
+        else:
+            self.run_after = timezone.now() + timedelta(seconds=self.get_backoff(self.attempts))
+        Job.objects.filter(pk=self.pk, locked_by=self.locked_by).update(
+            attempts=self.attempts,
+            last_error=self.last_error,
+            status=self.status,
+            run_after=self.run_after,
+            locked_by=None,
+            locked_until=None,
+        )
+
+    @staticmethod
+    def get_backoff(attempts: int) -> float:
+        """Seconds before retry `attempts`: doubling from BACKOFF_SECONDS, capped, with jitter."""
+        options = settings.JOBS
+        delay = min(options['BACKOFF_MAX_SECONDS'], options['BACKOFF_SECONDS'] * 2 ** (attempts - 1))
+        # jitter spreads the retries of jobs that failed together
+        return delay / 2 + random.uniform(0, delay / 2)
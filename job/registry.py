@@ -0,0 +1,18 @@
+handlers = {}
+
+
+def register(name: str):
+    """Register the decorated function as the handler of jobs called `name`."""
+    def decorator(function):
+        if name in handlers:
+            raise ValueError(f"job {name} is already registered")
+        handlers[name] = function
+        return function
+    return decorator
+
+
+def get_handler(name: str):
+    try:
+        return handlers[name]
+    except KeyError:
+        raise LookupError(f"no handler registered for job {name}")
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from util.metrics import metrics
+from .models import Job
+from .registry import register
+from .worker import Worker
+
+calls = []
+
+
+@register("test.record")
+def record(value):
+    calls.append(value)
+
+
+@register("test.fail")
+def fail():
+    raise RuntimeError("handler failed")
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        metrics.clear()
+
+    def enqueue(self, name: str, **payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            Job.enqueue(name, **payload)
+        return Job.objects.latest('id')
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Job.enqueue("test.record", value=1)
+
+            self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_worker_runs_and_deletes_jobs(self):
+        for value in range(3):
+            self.enqueue("test.record", value=value)
+
+        processed = Worker(batch_size=2).run(once=True)
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(metrics.snapshot()["counters"]["job_completed"]["test.record"], 3)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = self.enqueue("test.fail")
+
+        with self.assertLogs('job.worker', 'WARNING'):
+            Worker().run(once=True)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("handler failed", job.last_error)
+        self.assertIsNone(job.locked_by)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(Job.claim(10), [])
+
+    @override_settings(JOBS={**settings.JOBS, 'MAX_ATTEMPTS': 2})
+    def test_job_fails_after_max_attempts(self):
+        job = self.enqueue("test.fail")
+
+        with self.assertLogs('job.worker', 'WARNING'):
+            for _ in range(2):
+                Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+                Worker().run(once=True)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(metrics.snapshot()["counters"]["job_failed"]["test.fail"], 1)
+
+    def test_unknown_job_fails(self):
+        job = self.enqueue("test.unknown")
+
+        with self.assertLogs('job.worker', 'WARNING'):
+            Worker().run(once=True)
+        job.refresh_from_db()
+
+        self.assertIn("no handler registered", job.last_error)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        with override_settings(JOBS={**settings.JOBS, 'BACKOFF_SECONDS': 2, 'BACKOFF_MAX_SECONDS': 10}):
+            delays = [Job.get_backoff(attempts) for attempts in (1, 2, 3, 4)]
+
+        self.assertTrue(1 <= delays[0] <= 2)
+        self.assertTrue(2 <= delays[1] <= 4)
+        self.assertTrue(4 <= delays[2] <= 8)
+        self.assertTrue(5 <= delays[3] <= 10)
+
+    def test_claimed_jobs_are_leased(self):
+        for value in range(3):
+            self.enqueue("test.record", value=value)
+
+        first = Job.claim(2)
+        second = Job.claim(2)
+
+        self.assertEqual([job.payload["value"] for job in first], [0, 1])
+        self.assertEqual([job.payload["value"] for job in second], [2])
+        self.assertNotEqual(first[0].locked_by, second[0].locked_by)
+        self.assertEqual(Job.claim(2), [])
+
+    def test_expired_lease_is_claimed_again(self):
+        self.enqueue("test.record", value=1)
+        stale, = Job.claim(1)
+        Job.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        job, = Job.claim(1)
+        # the worker that lost its lease can no longer complete the job
+        stale.complete()
+
+        self.assertNotEqual(job.locked_by, stale.locked_by)
+        self.assertTrue(Job.objects.filter(pk=job.pk).exists())
@@ -0,0 +1,68 @@
+import logging
+import time
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from util.metrics import metrics
+from .models import Job
+from .registry import get_handler
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Claims batches of due jobs and runs each handler in its own transaction:
+    a job is deleted when its handler succeeds and released for a retry with
+    backoff when it raises. Any number of workers can share the queue.
+    """
+
+    def __init__(self, batch_size: int = None, lease: float = None):
+        options = settings.JOBS
+        self.batch_size = batch_size or options['BATCH_SIZE']
+        self.lease = lease
+        self.stopping = False
+
+    def run(self, once: bool = False, poll_interval: float = None):
+        """Process batches until `stop()`; with `once`, until no job is due."""
+        poll_interval = settings.JOBS['POLL_INTERVAL'] if poll_interval is None else poll_interval
+        processed = 0
+        while not self.stopping:
+            if not connection.in_atomic_block:
+                # like the request cycle: replace broken connections or ones past CONN_MAX_AGE
+                close_old_connections()
+            count = self.run_batch()
+            processed += count
+            if count == 0:
+                if once:
+                    break
+                time.sleep(poll_interval)
+        return processed
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run_batch(self) -> int:
+        jobs = Job.claim(self.batch_size, self.lease)
+        for job in jobs:
+            self.run_job(job)
+        return len(jobs)
+
+    def run_job(self, job: Job):
+        start = time.perf_counter()
+        try:
+            handler = get_handler(job.name)
+            with transaction.atomic():
+                handler(**job.payload)
+        except Exception:
+            logger.warning("job %s (%s) failed on attempt %d", job.id, job.name, job.attempts + 1, exc_info=True)
+            job.fail(traceback.format_exc())
+            metrics.increment("job_failed" if job.status == Job.FAILED else "job_retried", job.name)
+            return False
+
+        job.complete()
+        metrics.increment("job_completed", job.name)
+        metrics.observe("job_ms", job.name, (time.perf_counter() - start) * 1000)
+        return True
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from util.metrics import metrics
+        from .cache import active_users
+
+        metrics.register_collector("active_user_cache", active_users.stats)
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import async_views
+
+
+app_name = 'user-async'
+
+urlpatterns = [
+    path('auth/register/', async_views.register, name='auth-register'),
+    path('auth/login/', async_views.login, name='auth-login'),
+]
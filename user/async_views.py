@@ -0,0 +1,41 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.exceptions import MethodNotAllowed
+
+from util.views import async_api_view, get_json_body
+from .models import User
+from .throttling import athrottle_login
+from .serializers import (
+    AuthUserSerializer,
+    LoginUserSerializer,
+    RegisterUserSerializer,
+)
+
+
+@async_api_view
+async def register(request):
+    if request.method != 'POST':
+        raise MethodNotAllowed(request.method)
+    serializer = RegisterUserSerializer(data=get_json_body(request))
+    # the unique username validator queries the database
+    await sync_to_async(serializer.is_valid)(raise_exception=True)
+    validated_data = serializer.data
+
+    await User.aregister(validated_data["name"], validated_data["username"], validated_data["password"])
+
+    return JsonResponse({"message": "success"}, status=201)
+
+
+@async_api_view
+async def login(request):
+    if request.method != 'POST':
+        raise MethodNotAllowed(request.method)
+    data = get_json_body(request)
+    await athrottle_login(request, data.get("username"))
+    serializer = LoginUserSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    validated_data = serializer.data
+
+    user = await User.alogin(validated_data["username"], validated_data["password"])
+
+    return JsonResponse(AuthUserSerializer(user).data)
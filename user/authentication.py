@@ -0,0 +1,77 @@
+from functools import wraps
+
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+from util.routers import set_user
+from .models import User
+from .revocation import revoked_users
+
+
+class ClaimUser(TokenUser):
+    """
+    Request user built from the signed claims written by `User.generate_token`.
+
+    Claim attributes (id, username, name, is_active, is_staff) never touch the database.
+    Any other attribute loads the full `User` row once and reads it from there.
+    """
+
+    @cached_property
+    def name(self) -> str:
+        return self.token.get("name", "")
+
+    @cached_property
+    def is_active(self) -> bool:
+        return self.token.get("is_active", True)
+
+    @cached_property
+    def instance(self) -> User:
+        try:
+            return User.objects.get(pk=self.id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.instance, attr)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, User):
+            return self.id == other.pk
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if revoked_users.is_revoked(user.id, validated_token.get("iat")):
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        set_user(user.id)
+        return user
+
+
+def token_required(view):
+    """Authenticate an async view with `StatelessJWTAuthentication`, without touching the database."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        result = StatelessJWTAuthentication().authenticate(request)
+        if result is None:
+            raise NotAuthenticated()
+        request.user, request.auth = result
+        return await view(request, *args, **kwargs)
+
+    return wrapper
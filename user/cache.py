@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class LRUCache:
+    """Small thread-safe LRU with a per-entry time to live."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ActiveUserCache:
+    """
+    Read-through cache for `User.get_active_user`.
+
+    Lookups go to a per-process LRU first and then to the shared Django cache
+    configured by ACTIVE_USER_CACHE["ALIAS"] (local memory by default, Redis
+    when configured). Every user has a version stored in the shared backend.
+    Invalidation bumps it, and entries tagged with an older version are never
+    served. A reader that loaded a row before a concurrent write therefore
+    cannot publish it afterwards.
+
+    Local entries are tagged with their version too, and every lookup reads
+    the versions from the shared backend. A write in another process therefore
+    takes effect at once: the local tier only saves fetching and decoding the
+    entry. Queryset `update()` calls bypass `User.save` and must call
+    `invalidate` themselves.
+
+    Only FIELDS are cached, never the password hash. Served users have the
+    other fields deferred, so reading one costs a query and `save()` only
+    writes the cached fields.
+    """
+
+    PREFIX = "user:active:v2"
+    FIELDS = ("id", "username", "first_name", "last_name", "is_active")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._local = None
+
+    @property
+    def options(self) -> dict:
+        return settings.ACTIVE_USER_CACHE
+
+    @property
+    def backend(self):
+        return caches[self.options["ALIAS"]]
+
+    @property
+    def local(self) -> LRUCache:
+        if self._local is None:
+            self._local = LRUCache(self.options["LOCAL_MAX_SIZE"], self.options["LOCAL_TTL"])
+        return self._local
+
+    def entry_key(self, user_id) -> str:
+        return f"{self.PREFIX}:user:{user_id}"
+
+    def version_key(self, user_id) -> str:
+        return f"{self.PREFIX}:version:{user_id}"
+
+    def get_many(self, user_ids: list):
+        """
+        Return `(found, versions)`: cached users by id, and the current version of
+        every id that missed, to be passed back to `set_many` after the database read.
+        """
+        local = self._get_local(user_ids)
+        values = self.backend.get_many(self._remote_keys(user_ids, local)) if user_ids else {}
+        return self._resolve(user_ids, local, values)
+
+    async def aget_many(self, user_ids: list):
+        local = self._get_local(user_ids)
+        values = await self.backend.aget_many(self._remote_keys(user_ids, local)) if user_ids else {}
+        return self._resolve(user_ids, local, values)
+
+    def set_many(self, users: list, versions: dict):
+        users = list(users)
+        if not users:
+            return
+        current = self.backend.get_many([self.version_key(user.pk) for user in users])
+        entries = self._entries(users, versions, current)
+        if entries:
+            self.backend.set_many(entries, self.options["TIMEOUT"])
+
+    async def aset_many(self, users: list, versions: dict):
+        users = list(users)
+        if not users:
+            return
+        current = await self.backend.aget_many([self.version_key(user.pk) for user in users])
+        entries = self._entries(users, versions, current)
+        if entries:
+            await self.backend.aset_many(entries, self.options["TIMEOUT"])
+
+    def _get_local(self, user_ids: list) -> dict:
+        local = {}
+        for user_id in user_ids:
+            entry = self.local.get(user_id)
+            if entry is not None:
+                local[user_id] = entry
+        return local
+
+    def _remote_keys(self, user_ids: list, local: dict) -> list:
+        # versions of every id, entries of the ids the local tier does not have
+        entry_keys = [self.entry_key(user_id) for user_id in user_ids if user_id not in local]
+        return entry_keys + [self.version_key(user_id) for user_id in user_ids]
+
+    def _resolve(self, user_ids: list, local: dict, values: dict):
+        found = {}
+        versions = {}
+        for user_id in user_ids:
+            version = values.get(self.version_key(user_id), 0)
+            entry = local.get(user_id) or values.get(self.entry_key(user_id))
+            if entry is not None and entry[0] == version:
+                found[user_id] = self._load(entry[1])
+                self.local.set(user_id, entry)
+            else:
+                versions[user_id] = version
+
+        self.hits += len(found)
+        self.misses += len(versions)
+        return found, versions
+
+    def _entries(self, users: list, versions: dict, current: dict) -> dict:
+        entries = {}
+        for user in users:
+            version = versions.get(user.pk, 0)
+            if current.get(self.version_key(user.pk), 0) != version:
+                # invalidated since `get_many`: the row may predate the write
+                continue
+            entry = (version, tuple(getattr(user, field) for field in self.FIELDS))
+            entries[self.entry_key(user.pk)] = entry
+            self.local.set(user.pk, entry)
+        return entries
+
+    def _load(self, values: tuple):
+        return get_user_model().from_db(DEFAULT_DB_ALIAS, self.FIELDS, values)
+
+    def invalidate(self, user_id):
+        self._invalidate(user_id)
+        # readers that loaded the row inside the writing transaction must not survive its commit
+        transaction.on_commit(lambda: self._invalidate(user_id))
+
+    def _invalidate(self, user_id):
+        self.invalidations += 1
+        self.local.delete(user_id)
+        self.backend.delete(self.entry_key(user_id))
+        try:
+            self.backend.incr(self.version_key(user_id))
+        except ValueError:
+            self.backend.set(self.version_key(user_id), 1, None)
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._local = None
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+            "invalidations": self.invalidations,
+            "local_size": len(self.local),
+        }
+
+
+active_users = ActiveUserCache()
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def work_factors(policy: str) -> dict:
+    return settings.PASSWORD_HASHER_WORK_FACTORS.get(policy, {})
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return work_factors("pbkdf2").get("iterations", hashers.PBKDF2PasswordHasher.iterations)
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return work_factors("scrypt").get("work_factor", hashers.ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return work_factors("scrypt").get("block_size", hashers.ScryptPasswordHasher.block_size)
+
+    @property
+    def maxmem(self):
+        return work_factors("scrypt").get("maxmem", hashers.ScryptPasswordHasher.maxmem)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return work_factors("argon2").get("time_cost", hashers.Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return work_factors("argon2").get("memory_cost", hashers.Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return work_factors("argon2").get("parallelism", hashers.Argon2PasswordHasher.parallelism)
+
+
+def policy_hashers(policy: str) -> list:
+    """PASSWORD_HASHERS for the given policy, built like the setting itself."""
+    policies = settings.PASSWORD_HASHER_POLICIES
+    return [policies[policy]] + [path for name, path in policies.items() if name != policy]
+
+
+_executor = None
+
+
+def hasher_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASHER_THREADS,
+            thread_name_prefix="password-hasher",
+        )
+    return _executor
+
+
+async def run_hasher(func, *args, **kwargs):
+    """
+    Run CPU-bound password hashing on a bounded thread pool, off the event loop.
+    hashlib releases the GIL while hashing, so the pool threads run in parallel.
+    Functions run here must not touch the database.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hasher_executor(), functools.partial(func, *args, **kwargs))
@@ -0,0 +1,99 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    Collects `last_login` timestamps and writes them in one batched UPDATE,
+    instead of saving every column of the user row on each login.
+
+    Pending timestamps are flushed after the surrounding transaction commits
+    once LAST_LOGIN_BATCH_SIZE logins are buffered or LAST_LOGIN_FLUSH_INTERVAL
+    seconds have passed since the previous flush. A timer flushes what a quiet
+    period leaves behind, and the process flushes once more on exit.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        self._timer = None
+        atexit.register(self.flush_in_background)
+
+    def record(self, user_id, logged_in_at):
+        with self._lock:
+            self._pending[user_id] = logged_in_at
+            due = (
+                len(self._pending) >= settings.LAST_LOGIN_BATCH_SIZE
+                or time.monotonic() - self._flushed_at >= settings.LAST_LOGIN_FLUSH_INTERVAL
+            )
+            if not due and self._timer is None:
+                self._timer = threading.Timer(settings.LAST_LOGIN_FLUSH_INTERVAL, self.flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            transaction.on_commit(self.flush)
+
+    def flush(self):
+        pending = self._take()
+        if not pending:
+            return 0
+        self._write(pending)
+        return len(pending)
+
+    def flush_in_background(self):
+        """
+        Flush from the timer thread or at exit, outside any request: a failed
+        write is logged and its timestamps kept for the next flush.
+        """
+        pending = self._take()
+        if not pending:
+            return 0
+        try:
+            self._write(pending)
+        except Exception:
+            logger.warning("could not write %d buffered last_login timestamps", len(pending), exc_info=True)
+            with self._lock:
+                for user_id, logged_in_at in pending.items():
+                    self._pending.setdefault(user_id, logged_in_at)
+            return 0
+        finally:
+            # the timer thread's connection would otherwise stay open until the process exits
+            connection.close()
+        return len(pending)
+
+    def clear(self):
+        with self._lock:
+            self._pending = {}
+            self._cancel_timer()
+
+    def _take(self) -> dict:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+            self._cancel_timer()
+        return pending
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _write(self, pending: dict):
+        User = get_user_model()
+        users = [User(pk=user_id, last_login=logged_in_at) for user_id, logged_in_at in pending.items()]
+        User.objects.bulk_update(users, ["last_login"])
+
+    def __len__(self):
+        return len(self._pending)
+
+
+last_logins = LastLoginBuffer()
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from user.hashers import policy_hashers
+from user.models import User
+from util.benchmark import isolated_database
+
+
+class Command(BaseCommand):
+    help = "Measure User.login throughput on a single core for each password hasher policy"
+
+    def add_arguments(self, parser):
+        policies = list(settings.PASSWORD_HASHER_POLICIES)
+        parser.add_argument("--policies", nargs="+", choices=policies, default=policies)
+        parser.add_argument("--logins", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.stdout.write(f"{'policy':>8} {'logins/sec/core':>16} {'ms/login':>10}")
+            for policy in options["policies"]:
+                with override_settings(PASSWORD_HASHERS=policy_hashers(policy)):
+                    try:
+                        user = User.register("Benchmark User", f"benchmark-{policy}", "password")
+                    except ValueError as error:
+                        self.stdout.write(f"{policy:>8} skipped: {error}")
+                        continue
+
+                    start = time.perf_counter()
+                    for _ in range(options["logins"]):
+                        User.login(user.username, "password")
+                    elapsed = time.perf_counter() - start
+
+                rate = options["logins"] / elapsed
+                self.stdout.write(f"{policy:>8} {rate:>16.1f} {elapsed / options['logins'] * 1000:>10.2f}")
+            self.stdout.write(f"work factors: {settings.PASSWORD_HASHER_WORK_FACTORS}")
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from user.models import User
+
+FIELDS = ("name", "username", "password")
+
+
+def read_csv(path: str):
+    with open(path, newline="") as file:
+        for line, row in enumerate(csv.DictReader(file), start=1):
+            yield line, row
+
+
+def read_ndjson(path: str):
+    with open(path) as file:
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                row = None
+            yield line, row
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users from a CSV or NDJSON file with name, username and password columns, "
+        "hash the passwords on a process pool and insert them in bulk_create batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--checkpoint",
+            help="file recording the last imported line, read on start to resume (default: <path>.checkpoint)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        resume_after = self.read_checkpoint(checkpoint)
+        if resume_after:
+            self.stdout.write(f"resuming after line {resume_after}")
+
+        rows = read_ndjson(path) if file_format == "ndjson" else read_csv(path)
+        rows = ((line, row) for line, row in rows if line > resume_after)
+
+        self.imported = 0
+        self.failed = 0
+        started = time.perf_counter()
+        # initializer makes the workers usable under the spawn start method as well
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup) as pool:
+            while True:
+                batch = list(islice(rows, options["batch_size"]))
+                if not batch:
+                    break
+                self.import_batch(batch, pool, options["workers"])
+                self.write_checkpoint(checkpoint, batch[-1][0])
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"imported {self.imported} user(s), {self.imported / elapsed:.0f} rows/sec")
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"done: {self.imported} imported, {self.failed} failed in {elapsed:.2f}s "
+            f"({self.imported / elapsed if elapsed else 0:.0f} rows/sec)"
+        )
+
+    def import_batch(self, batch: list, pool: ProcessPoolExecutor, workers: int):
+        users = []
+        passwords = []
+        lines = []
+        for line, row in batch:
+            try:
+                user, password = self.build_user(row)
+            except ValidationError as error:
+                self.report(line, "; ".join(error.messages))
+                continue
+            users.append(user)
+            passwords.append(password)
+            lines.append(line)
+
+        taken = set(User.objects.filter(username__in=[user.username for user in users]).values_list("username", flat=True))
+        seen = set()
+        accepted = []
+        for user, password, line in zip(users, passwords, lines):
+            if user.username in taken or user.username in seen:
+                self.report(line, f"username {user.username} already exists")
+                continue
+            seen.add(user.username)
+            accepted.append((user, password))
+
+        chunksize = max(1, len(accepted) // (workers * 4))
+        hashed = pool.map(make_password, [password for _, password in accepted], chunksize=chunksize)
+        for (user, _), password in zip(accepted, hashed):
+            user.password = password
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for user, _ in accepted])
+        except IntegrityError as error:
+            raise CommandError(f"batch ending at line {batch[-1][0]} failed, rerun to resume: {error}")
+        self.imported += len(accepted)
+
+    def build_user(self, row):
+        if not isinstance(row, dict):
+            raise ValidationError("row is not an object")
+        missing = [field for field in FIELDS if not row.get(field)]
+        if missing:
+            raise ValidationError(f"missing {', '.join(missing)}")
+        # NDJSON values can be numbers, lists or objects
+        not_text = [field for field in FIELDS if not isinstance(row[field], str)]
+        if not_text:
+            raise ValidationError(f"{', '.join(not_text)} must be text")
+
+        user = User(username=row["username"])
+        user.set_name(row["name"])
+        user.clean_fields(exclude=["password"])
+        return user, row["password"]
+
+    def report(self, line: int, message: str):
+        self.failed += 1
+        self.stderr.write(f"line {line}: {message}")
+
+    def read_checkpoint(self, path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+        with open(path) as file:
+            return json.load(file)["line"]
+
+    def write_checkpoint(self, path: str, line: int):
+        with open(path, "w") as file:
+            json.dump({"line": line}, file)
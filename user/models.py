@@ -1,16 +1,33 @@
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from rest_framework.exceptions import NotFound
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from util.routers import use_primary
+
+from .cache import active_users
+from .hashers import run_hasher
+from .last_login import last_logins
+from .revocation import revoked_users
+
 
 class User(AbstractUser):
     @property
     def name(self):
-        if self.last_name:
-            return f'{self.first_name} {self.last_name}'
-        return self.first_name
+        return self.format_name(self.first_name, self.last_name)
+
+    @staticmethod
+    def format_name(first_name: str, last_name: str):
+        if last_name:
+            return f'{first_name} {last_name}'
+        return first_name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        active_users.invalidate(self.pk)
 
     @classmethod
     def register(cls, name: str, username: str, password: str):
@@ -28,23 +45,116 @@ class User(AbstractUser):
         
         token = user.generate_token()
         user.last_login = timezone.now()
-        user.save()
+        last_logins.record(user.id, user.last_login)
 
         user.token = token
 
         return user
     
+    @classmethod
+    async def aregister(cls, name: str, username: str, password: str):
+        user = cls(username=username)
+        user.set_name(name)
+        await run_hasher(user.set_password, password)
+        await user.asave()
+        return user
+
+    @classmethod
+    async def alogin(cls, username: str, password: str):
+        user = await cls.objects.filter(username=username, is_active=True).afirst()
+        if user is None:
+            raise NotFound()
+
+        outdated = []
+        if not await run_hasher(check_password, password, user.password, outdated.append):
+            raise NotFound()
+        if outdated:
+            await run_hasher(user.set_password, password)
+            await user.asave(update_fields=["password"])
+
+        token = user.generate_token()
+        user.last_login = timezone.now()
+        await sync_to_async(last_logins.record)(user.id, user.last_login)
+
+        user.token = token
+
+        return user
+
     @classmethod
     def get_active_user(cls, id):
-        user = cls.objects.filter(id=id, is_active=True).first()
+        id, = cls.clean_ids([id])
+        cached, versions = active_users.get_many([id])
+        if id in cached:
+            return cached[id]
+
+        # cache fills read the primary: a lagging replica would store the row `invalidate()` replaced
+        with use_primary():
+            user = cls.objects.filter(id=id, is_active=True).first()
+        if user is None:
+            raise NotFound(f'user with id of {id} not found')
+        active_users.set_many([user], versions)
+        return user
+
+    @classmethod
+    def get_active_users(cls, ids: list):
+        ids = list(dict.fromkeys(cls.clean_ids(ids)))
+        users, versions = active_users.get_many(ids)
+        if versions:
+            with use_primary():
+                loaded = cls.objects.filter(is_active=True).in_bulk(list(versions))
+            active_users.set_many(loaded.values(), versions)
+            users.update(loaded)
+        return cls.pick_users(ids, users)
+
+    @staticmethod
+    def clean_ids(ids: list) -> list:
+        """Coerce ids to int, so `"5"` finds user 5; an id that is not a number cannot exist."""
+        cleaned = []
+        for id in ids:
+            try:
+                cleaned.append(int(str(id)))
+            except (TypeError, ValueError):
+                raise NotFound(f'user with id of {id} not found')
+        return cleaned
+
+    @staticmethod
+    def pick_users(ids: list, users: dict):
+        missing = [id for id in ids if id not in users]
+        if len(missing) == 1:
+            raise NotFound(f'user with id of {missing[0]} not found')
+        if missing:
+            raise NotFound(f'users with id of {", ".join(str(id) for id in missing)} not found')
+        return [users[id] for id in ids]
+
+    @classmethod
+    async def aget_active_user(cls, id):
+        id, = cls.clean_ids([id])
+        cached, versions = await active_users.aget_many([id])
+        if id in cached:
+            return cached[id]
+
+        with use_primary():
+            user = await cls.objects.filter(id=id, is_active=True).afirst()
         if user is None:
             raise NotFound(f'user with id of {id} not found')
+        await active_users.aset_many([user], versions)
         return user
+
+    @classmethod
+    async def aget_active_users(cls, ids: list):
+        ids = list(dict.fromkeys(cls.clean_ids(ids)))
+        users, versions = await active_users.aget_many(ids)
+        if versions:
+            with use_primary():
+                loaded = await cls.objects.filter(is_active=True).ain_bulk(list(versions))
+            await active_users.aset_many(loaded.values(), versions)
+            users.update(loaded)
+        return cls.pick_users(ids, users)
     
     def set_name(self, name: str):
         names = name.split(' ')
         first_name = names[0]
-        last_name = None
+        last_name = ''
         if len(names) > 1:
             last_name = ' '.join(word for word in names[1:])
         self.first_name = first_name
@@ -52,8 +162,13 @@ class User(AbstractUser):
 
     def generate_token(self):
         token = RefreshToken.for_user(self)
+        token["username"] = self.username
+        token["name"] = self.name
+        token["is_active"] = self.is_active
+        token["is_staff"] = self.is_staff
         return {"access": str(token.access_token), "refresh": str(token)}
 
     def inactivate(self):
         self.is_active = False
         self.save()
+        revoked_users.revoke(self.id)
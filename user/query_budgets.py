@@ -0,0 +1,65 @@
+from itertools import count
+
+from util.testing import QueryBudget
+from .cache import active_users
+from .models import User
+
+# n is the number of users involved in the call; methods on a single user are
+# measured against n other users to show they do not scale with the table
+names = count()
+
+
+def make_users(n: int) -> list:
+    users = [User(username=f"budget-{next(names)}", first_name="budget") for _ in range(n)]
+    return User.objects.bulk_create(users)
+
+
+def cold_users(n: int) -> list:
+    users = make_users(n)
+    active_users.clear()
+    active_users.backend.clear()
+    return users
+
+
+def warm_users(n: int) -> list:
+    users = cold_users(n)
+    User.get_active_users([user.id for user in users])
+    return users
+
+
+def registered(n: int):
+    make_users(n)
+    user = User.register("Budget User", f"budget-{next(names)}", "password")
+    return (user.username, "password")
+
+
+BUDGETS = [
+    QueryBudget("User.register", lambda n: ("Budget User", f"budget-{next(names)}", "password"), User.register, constant=1),
+    QueryBudget("User.aregister", lambda n: ("Budget User", f"budget-{next(names)}", "password"), User.aregister, constant=1),
+    # plus the batched last_login UPDATE when the buffer is due
+    QueryBudget("User.login", registered, User.login, constant=2),
+    QueryBudget("User.alogin", registered, User.alogin, constant=2),
+    QueryBudget("User.get_active_user", lambda n: (cold_users(n)[0].id,), User.get_active_user, constant=1),
+    QueryBudget("User.get_active_user (cached)", lambda n: (warm_users(n)[0].id,), User.get_active_user, constant=0),
+    QueryBudget("User.aget_active_user", lambda n: (cold_users(n)[0].id,), User.aget_active_user, constant=1),
+    QueryBudget(
+        "User.get_active_users",
+        lambda n: ([user.id for user in cold_users(n)],),
+        User.get_active_users,
+        constant=1,
+    ),
+    QueryBudget(
+        "User.get_active_users (cached)",
+        lambda n: ([user.id for user in warm_users(n)],),
+        User.get_active_users,
+        constant=0,
+    ),
+    QueryBudget(
+        "User.aget_active_users",
+        lambda n: ([user.id for user in cold_users(n)],),
+        User.aget_active_users,
+        constant=1,
+    ),
+    QueryBudget("User.save", lambda n: (make_users(n)[0],), User.save, constant=1),
+    QueryBudget("User.inactivate", lambda n: (make_users(n)[0],), User.inactivate, constant=1),
+]
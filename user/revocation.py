@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.settings import api_settings
+
+
+class RevokedUsers:
+    """
+    Denylist of user ids whose tokens must no longer be accepted.
+
+    A token is rejected when it was issued at or before its user's revocation
+    time. Revocation times live in the shared cache used by ACTIVE_USER_CACHE,
+    so every process sees them, and expire with ACCESS_TOKEN_LIFETIME, the
+    longest an already issued access token can still be presented.
+    """
+
+    PREFIX = "user:revoked"
+
+    @property
+    def backend(self):
+        return caches[settings.ACTIVE_USER_CACHE["ALIAS"]]
+
+    def key(self, user_id) -> str:
+        return f"{self.PREFIX}:{user_id}"
+
+    def revoke(self, user_id, revoked_at: float = None):
+        if revoked_at is None:
+            revoked_at = time.time()
+        timeout = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        self.backend.set(self.key(user_id), revoked_at, timeout)
+
+    def is_revoked(self, user_id, issued_at) -> bool:
+        revoked_at = self.backend.get(self.key(user_id))
+        if revoked_at is None:
+            return False
+        return issued_at is None or issued_at <= revoked_at
+
+
+revoked_users = RevokedUsers()
@@ -1,13 +1,39 @@
 import json
-from django.test import TestCase
+import os
+import tempfile
+import time
+from io import StringIO
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
 from rest_framework.test import APIRequestFactory
 from rest_framework.exceptions import NotFound
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
 
+from .authentication import ClaimUser, StatelessJWTAuthentication
+from .cache import LRUCache, active_users
+from .hashers import policy_hashers
+from .last_login import last_logins
 from .models import User
+from .query_budgets import BUDGETS
+from .revocation import RevokedUsers, revoked_users
+from .throttling import fallback_cache
 from .views import AuthUserView
+from util.metrics import metrics
+from util.testing import QueryBudgetMixin
+
+
+def clear_throttles():
+    caches[settings.THROTTLE_CACHE].clear()
+    fallback_cache.clear()
 
 
 class UserModelTest(TestCase):
+    def tearDown(self):
+        last_logins.clear()
+
     def setUp(self):
         pass
 
@@ -19,6 +45,12 @@ class UserModelTest(TestCase):
         self.assertEqual(user.first_name, "Muhamad")
         self.assertEqual(user.last_name, "Abdul Muis")
 
+    def test_set_name_method_with_single_name(self):
+        user = User.register("Muis", "muis", "password")
+
+        self.assertEqual(user.last_name, "")
+        self.assertEqual(user.name, "Muis")
+
     def test_register_method(self):
         user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
         
@@ -31,6 +63,38 @@ class UserModelTest(TestCase):
         self.assertEqual(user_from_login, user)
         self.assertTrue(hasattr(user_from_login, "token"))
     
+    @override_settings(LAST_LOGIN_BATCH_SIZE=1)
+    def test_login_method_updates_only_last_login(self):
+        user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                User.login(user.username, "password")
+        user.refresh_from_db()
+
+        self.assertIsNotNone(user.last_login)
+        self.assertEqual(len(last_logins), 0)
+
+    def test_login_method_rehashes_password_when_policy_changes(self):
+        with override_settings(PASSWORD_HASHERS=policy_hashers("pbkdf2")):
+            user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
+
+        with override_settings(PASSWORD_HASHERS=policy_hashers("scrypt")):
+            User.login(user.username, "password")
+        user.refresh_from_db()
+
+        self.assertTrue(user.password.startswith("scrypt$"))
+
+    @override_settings(PASSWORD_HASHER_WORK_FACTORS={"pbkdf2": {"iterations": 1000}})
+    def test_login_method_rehashes_password_when_work_factor_changes(self):
+        user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
+
+        with override_settings(PASSWORD_HASHER_WORK_FACTORS={"pbkdf2": {"iterations": 2000}}):
+            User.login(user.username, "password")
+        user.refresh_from_db()
+
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$2000$"))
+
     def test_inactivate_method(self):
         user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
         user.inactivate()
@@ -43,6 +107,34 @@ class UserModelTest(TestCase):
 
         self.assertEqual(user_from_get_active_method, user)
     
+    def test_get_active_users_method(self):
+        first = User.register("First User", "first", "password")
+        second = User.register("Second User", "second", "password")
+
+        with self.assertNumQueries(1):
+            users = User.get_active_users([second.id, first.id])
+
+        self.assertEqual(users, [second, first])
+
+    def test_get_active_users_method_accepts_string_ids(self):
+        first = User.register("First User", "first", "password")
+        second = User.register("Second User", "second", "password")
+
+        self.assertEqual(User.get_active_users([str(second.id), first.id, second.id]), [second, first])
+        self.assertEqual(User.get_active_user(str(first.id)), first)
+        with self.assertRaises(NotFound):
+            User.get_active_users(["abc"])
+
+    def test_not_found_get_active_users_method(self):
+        user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
+        try:
+            User.get_active_users([user.id, 100, 101])
+
+            self.assertTrue(False)
+        except Exception as error:
+            self.assertIsInstance(error, NotFound)
+            self.assertIn("users with id of 100, 101 not found", str(error))
+
     def test_id_not_found_get_active_user_method(self):
         try:
             User.get_active_user(100)
@@ -63,13 +155,213 @@ class UserModelTest(TestCase):
             self.assertIsInstance(error, NotFound)
 
 
+class LastLoginBufferTest(TransactionTestCase):
+    def tearDown(self):
+        last_logins.clear()
+
+    @override_settings(
+        LAST_LOGIN_BATCH_SIZE=100,
+        LAST_LOGIN_FLUSH_INTERVAL=0.5,
+        PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    )
+    def test_timer_flushes_after_quiet_period(self):
+        user = User.register("Test User", "test", "password")
+        last_logins.flush()
+
+        User.login("test", "password")
+        self.assertEqual(len(last_logins), 1)
+        for _ in range(100):
+            user.refresh_from_db()
+            if user.last_login is not None:
+                break
+            time.sleep(0.05)
+
+        self.assertIsNotNone(user.last_login)
+        self.assertEqual(len(last_logins), 0)
+
+
+class UserQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def tearDown(self):
+        # the cached users are rolled back with the test
+        active_users.clear()
+        active_users.backend.clear()
+        revoked_users.backend.clear()
+
+    def test_model_methods_stay_within_query_budgets(self):
+        self.assertQueryBudgets(BUDGETS)
+
+
+class ImportUsersCommandTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        User.register("Existing User", "existing", "password")
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def import_users(self, path: str, **options):
+        out, err = StringIO(), StringIO()
+        call_command("import_users", path, workers=2, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        path = self.write("users.csv", "\n".join([
+            "name,username,password",
+            "Muhamad Abdul Muis,abdulmuis,secret1",
+            "Muis,muis,secret2",
+            "Duplicate,existing,secret3",
+            "No Password,nopassword,",
+            "Repeated,muis,secret4",
+        ]))
+
+        out, err = self.import_users(path, batch_size=2)
+        user = User.objects.get(username="abdulmuis")
+
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(user.name, "Muhamad Abdul Muis")
+        self.assertTrue(user.check_password("secret1"))
+        self.assertIn("line 3: username existing already exists", err)
+        self.assertIn("line 4: missing password", err)
+        self.assertIn("line 5: username muis already exists", err)
+        self.assertIn("done: 2 imported, 3 failed", out)
+        self.assertIn("rows/sec", out)
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_import_ndjson_resumes_from_checkpoint(self):
+        path = self.write("users.ndjson", "\n".join([
+            json.dumps({"name": "First User", "username": "first", "password": "secret"}),
+            "not json",
+            json.dumps({"name": "Third User", "username": "third", "password": "secret"}),
+        ]))
+        self.write("users.ndjson.checkpoint", json.dumps({"line": 1}))
+
+        out, err = self.import_users(path)
+
+        self.assertIn("resuming after line 1", out)
+        self.assertIn("line 2: row is not an object", err)
+        self.assertFalse(User.objects.filter(username="first").exists())
+        self.assertTrue(User.objects.filter(username="third").exists())
+
+    def test_import_ndjson_reports_values_that_are_not_text(self):
+        path = self.write("users.ndjson", "\n".join([
+            json.dumps({"name": 123, "username": "number", "password": "secret"}),
+            json.dumps({"name": "List Password", "username": "list", "password": ["secret"]}),
+            json.dumps({"name": "Text User", "username": "text", "password": "secret"}),
+        ]))
+
+        out, err = self.import_users(path)
+
+        self.assertIn("line 1: name must be text", err)
+        self.assertIn("line 2: password must be text", err)
+        self.assertIn("done: 1 imported, 2 failed", out)
+        self.assertTrue(User.objects.filter(username="text").exists())
+
+
+class ActiveUserCacheTest(TestCase):
+    def setUp(self):
+        active_users.clear()
+        active_users.backend.clear()
+        self.user = User.register("Muhamad Abdul Muis", "abdulmuis", "password")
+
+    def test_get_active_user_method_is_served_from_cache(self):
+        User.get_active_user(self.user.id)
+
+        with self.assertNumQueries(0):
+            user = User.get_active_user(self.user.id)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(active_users.stats()["hits"], 1)
+        self.assertEqual(active_users.stats()["misses"], 1)
+
+    def test_get_active_users_method_only_loads_missing_users(self):
+        other = User.register("Other User", "other", "password")
+        User.get_active_user(self.user.id)
+
+        with self.assertNumQueries(1):
+            users = User.get_active_users([self.user.id, other.id])
+
+        self.assertEqual(users, [self.user, other])
+
+    def test_inactivated_user_is_never_served_stale(self):
+        User.get_active_user(self.user.id)
+        self.user.inactivate()
+
+        with self.assertRaises(NotFound):
+            User.get_active_user(self.user.id)
+
+    def test_entry_loaded_before_invalidation_is_not_served(self):
+        _, versions = active_users.get_many([self.user.id])
+        stale = User.objects.get(pk=self.user.pk)
+        self.user.inactivate()
+        active_users.set_many([stale], versions)
+        active_users.local.clear()
+
+        with self.assertRaises(NotFound):
+            User.get_active_user(self.user.id)
+
+    def test_entry_loaded_before_invalidation_stays_out_of_local_cache(self):
+        _, versions = active_users.get_many([self.user.id])
+        stale = User.objects.get(pk=self.user.pk)
+        self.user.inactivate()
+        active_users.set_many([stale], versions)
+
+        self.assertEqual(len(active_users.local), 0)
+        with self.assertRaises(NotFound):
+            User.get_active_user(self.user.id)
+
+    def test_local_entry_is_not_served_after_invalidation_elsewhere(self):
+        User.get_active_user(self.user.id)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # another process: the shared version moves, this process's LRU is untouched
+        active_users.backend.incr(active_users.version_key(self.user.id))
+
+        self.assertEqual(len(active_users.local), 1)
+        with self.assertRaises(NotFound):
+            User.get_active_user(self.user.id)
+
+    def test_cached_user_has_no_password_hash(self):
+        User.get_active_user(self.user.id)
+        entry = active_users.backend.get(active_users.entry_key(self.user.id))
+        active_users.local.clear()
+
+        self.assertNotIn(self.user.password, entry[1])
+        user = User.get_active_user(self.user.id)
+        self.assertEqual((user.username, user.name), ("abdulmuis", "Muhamad Abdul Muis"))
+        self.assertIn("password", user.get_deferred_fields())
+
+    def test_lru_cache_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set(1, "one")
+        cache.set(2, "two")
+        cache.get(1)
+        cache.set(3, "three")
+
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), "one")
+        self.assertEqual(cache.evictions, 1)
+
+    def test_lru_cache_expires_entries(self):
+        cache = LRUCache(max_size=2, ttl=-1)
+        cache.set(1, "one")
+
+        self.assertIsNone(cache.get(1))
+
+
 class AuthViewTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
         self.view = AuthUserView
         self.url = '/users/auth/'
+        clear_throttles()
 
         self.user = User.register("Test User", "test", "password")
+
+    def tearDown(self):
+        last_logins.clear()
     
     def get_view(self, method):
         return self.view.as_view(method)
@@ -131,3 +423,186 @@ class AuthViewTest(TestCase):
         response = self.get_response(request, {'post': 'login'})
 
         self.assertEqual(response.status_code, 404)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'login_ip': '3/min', 'login_username': '2/min'},
+})
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = AuthUserView.as_view({'post': 'login'})
+        clear_throttles()
+        metrics.clear()
+        self.user = User.register("Test User", "test", "password")
+
+    def tearDown(self):
+        last_logins.clear()
+
+    # a failed login marks the test transaction for rollback (DRF's set_rollback),
+    # so every attempt before the rejected one has to succeed
+    def login(self, username: str = "test", **headers):
+        request = self.factory.post('/users/auth/login/', data={"username": username, "password": "password"}, **headers)
+        response = self.view(request)
+        response.render()
+        return response
+
+    def test_username_throttle_rejects_before_database(self):
+        self.assertEqual(self.login("test").status_code, 200)
+        self.assertEqual(self.login("test").status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.login("TEST")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters["throttle_rejected"], {"login_username": 1})
+        self.assertEqual(counters["throttle_allowed"]["login_username"], 2)
+
+    def test_ip_throttle_rejects_other_usernames(self):
+        User.register("Other User", "other", "password")
+        for username in ("test", "other", "test"):
+            self.assertEqual(self.login(username).status_code, 200)
+
+        self.assertEqual(self.login("other").status_code, 429)
+        self.assertEqual(metrics.snapshot()["counters"]["throttle_rejected"], {"login_ip": 1})
+
+    def test_ip_throttle_ignores_spoofed_forwarded_for(self):
+        User.register("Other User", "other", "password")
+        for number, username in enumerate(("test", "other", "test")):
+            self.assertEqual(self.login(username, HTTP_X_FORWARDED_FOR=f"10.0.0.{number}").status_code, 200)
+
+        self.assertEqual(self.login("other", HTTP_X_FORWARDED_FOR="10.0.0.3").status_code, 429)
+
+    async def test_async_ip_throttle_ignores_spoofed_forwarded_for(self):
+        for number in range(4):
+            response = await self.async_client.post(
+                '/async/users/auth/login/',
+                data={"username": f"unknown{number}", "password": "wrong"},
+                content_type='application/json',
+                headers={"X-Forwarded-For": f"10.0.0.{number}"},
+            )
+
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(THROTTLE_CACHE='missing')
+    def test_falls_back_to_local_cache(self):
+        with self.assertLogs('user.throttling', 'WARNING'):
+            self.login()
+            self.login()
+            response = self.login()
+
+        self.assertEqual(response.status_code, 429)
+
+    async def test_async_login_is_throttled(self):
+        data = {"username": "test", "password": "wrong"}
+        for _ in range(2):
+            await self.async_client.post('/async/users/auth/login/', data=data, content_type='application/json')
+
+        response = await self.async_client.post('/async/users/auth/login/', data=data, content_type='application/json')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+
+class StatelessJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.authentication = StatelessJWTAuthentication()
+        self.user = User.register("Test User", "test", "password")
+        revoked_users.backend.clear()
+
+    def authenticate(self, user):
+        token = user.generate_token()["access"]
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.authentication.authenticate(request)
+
+    def test_authenticate_without_query(self):
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate(self.user)
+
+        self.assertIsInstance(user, ClaimUser)
+        self.assertEqual(user.id, self.user.id)
+        self.assertEqual(user.username, "test")
+        self.assertEqual(user.name, "Test User")
+        self.assertEqual(user, self.user)
+
+    def test_non_claim_attribute_loads_user_once(self):
+        user, _ = self.authenticate(self.user)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.user.date_joined)
+            self.assertEqual(user.first_name, "Test")
+
+    def test_inactivated_user_is_rejected(self):
+        token = self.user.generate_token()["access"]
+        self.user.inactivate()
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate(request)
+
+    def test_revocation_is_shared_between_processes(self):
+        token = AccessToken(self.user.generate_token()["access"])
+        self.user.inactivate()
+
+        # a fresh denylist stands in for another worker reading the shared cache
+        self.assertTrue(RevokedUsers().is_revoked(self.user.id, token["iat"]))
+
+    def test_deleted_user_fails_authentication(self):
+        user, _ = self.authenticate(self.user)
+        self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            user.date_joined
+
+
+class AsyncAuthViewTest(TestCase):
+    def setUp(self):
+        self.url = '/async/users/auth/'
+        clear_throttles()
+        self.user = User.register("Test User", "test", "password")
+
+    def tearDown(self):
+        last_logins.clear()
+
+    async def test_register_api(self):
+        data = {"name": "Abdul Muis", "username": "abdulmuis", "password": "password"}
+
+        response = await self.async_client.post(f'{self.url}register/', data=data, content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"message": "success"})
+        self.assertTrue(await User.objects.filter(username="abdulmuis").aexists())
+
+    async def test_register_api_with_taken_username(self):
+        data = {"name": "Test User", "username": "test", "password": "password"}
+
+        response = await self.async_client.post(f'{self.url}register/', data=data, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("username", response.json())
+
+    async def test_login_api(self):
+        data = {"username": "test", "password": "password"}
+
+        response = await self.async_client.post(f'{self.url}login/', data=data, content_type='application/json')
+        response_data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_data["id"], self.user.id)
+        self.assertIsNotNone(response_data.get("token"))
+
+    async def test_not_found_user_login_api(self):
+        data = {"username": "test", "password": "password1"}
+
+        response = await self.async_client.post(f'{self.url}login/', data=data, content_type='application/json')
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_method_not_allowed_login_api(self):
+        response = await self.async_client.get(f'{self.url}login/')
+
+        self.assertEqual(response.status_code, 405)
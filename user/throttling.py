@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from util.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# used while the shared cache is unreachable, so limits keep holding per process
+fallback_cache = LocMemCache("throttle-fallback", {"MAX_ENTRIES": 100000})
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Sliding-window rate limit approximated from two fixed-window counters: the
+    current window's count plus the previous window's count weighted by how much
+    of it still overlaps the sliding window. Each request costs an `add`, an
+    atomic `incr` and a `get` on the THROTTLE_CACHE alias whatever the rate,
+    and falls back to a process-local cache if that alias fails. Rejected requests
+    are counted too, so a client that keeps retrying stays throttled.
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def get_rate(self):
+        # read through api_settings so override_settings(REST_FRAMEWORK=...) applies
+        return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def get_ident_for(self, request, username):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        data = request.data if isinstance(request.data, dict) else {}
+        return self.get_key(request, data.get("username"))
+
+    def get_key(self, request, username):
+        ident = self.get_ident_for(request, username)
+        if ident is None:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        return self.allow(key)
+
+    def allow(self, key: str) -> bool:
+        current_key, previous_key, elapsed = self.get_window(key)
+        try:
+            current, previous = self.hit(self.cache, current_key, previous_key)
+        except Exception:
+            logger.warning("throttle cache unavailable, using the local fallback", exc_info=True)
+            current, previous = self.hit(fallback_cache, current_key, previous_key)
+        return self.decide(current, previous, elapsed)
+
+    async def aallow(self, key: str) -> bool:
+        current_key, previous_key, elapsed = self.get_window(key)
+        try:
+            current, previous = await self.ahit(self.cache, current_key, previous_key)
+        except Exception:
+            logger.warning("throttle cache unavailable, using the local fallback", exc_info=True)
+            current, previous = await self.ahit(fallback_cache, current_key, previous_key)
+        return self.decide(current, previous, elapsed)
+
+    def get_window(self, key: str):
+        now = time.time()
+        window = int(now // self.duration)
+        elapsed = (now - window * self.duration) / self.duration
+        return f"{key}:{window}", f"{key}:{window - 1}", elapsed
+
+    def hit(self, cache, current_key: str, previous_key: str):
+        cache.add(current_key, 0, self.duration * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # the counter expired between add() and incr()
+            cache.set(current_key, 1, self.duration * 2)
+            current = 1
+        return current, cache.get(previous_key, 0)
+
+    async def ahit(self, cache, current_key: str, previous_key: str):
+        await cache.aadd(current_key, 0, self.duration * 2)
+        try:
+            current = await cache.aincr(current_key)
+        except ValueError:
+            await cache.aset(current_key, 1, self.duration * 2)
+            current = 1
+        return current, await cache.aget(previous_key, 0)
+
+    def decide(self, current: int, previous: int, elapsed: float) -> bool:
+        count = previous * (1 - elapsed) + current
+        if count <= self.num_requests:
+            metrics.increment("throttle_allowed", self.scope)
+            self._wait = None
+            return True
+
+        metrics.increment("throttle_rejected", self.scope)
+        # until the weighted previous window has decayed enough, or this one ends
+        if previous and current <= self.num_requests:
+            remaining = (1 - (self.num_requests - current) / previous) - elapsed
+        else:
+            remaining = 1 - elapsed
+        self._wait = max(1, math.ceil(remaining * self.duration))
+        return False
+
+    def wait(self):
+        return getattr(self, "_wait", None)
+
+
+class LoginIPThrottle(SlidingWindowThrottle):
+    scope = "login_ip"
+
+    def get_ident_for(self, request, username):
+        return self.get_ident(request)
+
+
+class LoginUsernameThrottle(SlidingWindowThrottle):
+    scope = "login_username"
+
+    def get_ident_for(self, request, username):
+        if not isinstance(username, str) or not username:
+            return None
+        # the username is unvalidated client input, keep it out of the cache key
+        return hashlib.sha256(username.lower().encode()).hexdigest()
+
+
+LOGIN_THROTTLES = (LoginIPThrottle, LoginUsernameThrottle)
+
+
+async def athrottle_login(request, username):
+    """Apply LOGIN_THROTTLES to an async login view, raising Throttled like DRF does."""
+    waits = []
+    for throttle_class in LOGIN_THROTTLES:
+        throttle = throttle_class()
+        key = throttle.get_key(request, username)
+        if key is not None and not await throttle.aallow(key):
+            waits.append(throttle.wait())
+    if waits:
+        raise Throttled(max(waits))
+
@@ -5,6 +5,7 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework.decorators import action
 
 from .models import User
+from .throttling import LOGIN_THROTTLES
 from .serializers import (
     AuthUserSerializer,
     LoginUserSerializer,
@@ -13,6 +14,12 @@ from .serializers import (
 
 class AuthUserView(GenericViewSet):
     permission_classes = ()
+
+    def get_throttles(self):
+        # checked in initial(), before the handler reaches the database or the hasher
+        if self.action == 'login':
+            return [throttle() for throttle in LOGIN_THROTTLES]
+        return super().get_throttles()
     
     @action(methods=['post'], detail=False)
     def register(self, request):
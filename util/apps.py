@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class UtilConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'util'
+
+    def ready(self):
+        from .db import configure_sqlite
+        from .metrics import metrics
+        from .pubsub import hub
+        from .queries import install_query_recorder
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_recorder)
+        metrics.register_collector("pubsub", hub.stats)
@@ -0,0 +1,40 @@
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from .queries import record_queries
+
+
+@contextmanager
+def isolated_database(verbosity: int = 0, name: str = None):
+    """
+    Run benchmarks against a throwaway test database instead of the real one.
+    `name` overrides the test database name, e.g. to get an on-disk SQLite file
+    rather than the in-memory default.
+    """
+    if name is not None:
+        connection.settings_dict['TEST']['NAME'] = name
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
+
+
+@contextmanager
+def measure():
+    result = {}
+    with record_queries() as recorder:
+        start = time.perf_counter()
+        yield result
+        result["seconds"] = time.perf_counter() - start
+    result["queries"] = recorder.count
@@ -0,0 +1,76 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, transaction
+from django.test import Client, override_settings
+
+from forum.models import Forum
+from util.benchmark import isolated_database
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare p50/p99 request latency between the old database setup (new connection per request, "
+        "default SQLite PRAGMAs, every GET in a transaction) and the current settings, on an on-disk SQLite file"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--participants", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            with isolated_database(name=os.path.join(directory, "benchmark.sqlite3")):
+                self.run(options)
+
+    def run(self, options):
+        users = [User.register("Benchmark User", "benchmark", "password")]
+        users += User.objects.bulk_create(
+            User(username=f"benchmark{number}", first_name=f"user {number}")
+            for number in range(options["participants"])
+        )
+        forum = Forum.create_forum("benchmark", "benchmark", users[0], [user.id for user in users[1:]])
+        token = users[0].generate_token()["access"]
+
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+        endpoints = {
+            "GET forum": lambda: client.get(f"/forums/{forum.id}/"),
+            "GET participants": lambda: client.get(f"/forums/{forum.id}/participants/"),
+            "POST forum": lambda: client.post(
+                "/forums/",
+                {"topic": "benchmark", "participants": [user.id for user in users[1:11]]},
+                content_type="application/json",
+            ),
+        }
+        profiles = (
+            ("before", {"pragmas": {}, "conn_max_age": 0, "atomic_reads": True}),
+            ("after", {"pragmas": settings.SQLITE_PRAGMAS, "conn_max_age": connection.settings_dict["CONN_MAX_AGE"], "atomic_reads": False}),
+        )
+
+        self.stdout.write(f"{'profile':>8} {'endpoint':>18} {'p50 ms':>8} {'p99 ms':>8}")
+        # "before" has to run first: journal_mode=wal is persisted in the database file
+        for name, profile in profiles:
+            with override_settings(SQLITE_PRAGMAS=profile["pragmas"]):
+                connection.close()
+                connection.settings_dict["CONN_MAX_AGE"] = profile["conn_max_age"]
+                for endpoint, request in endpoints.items():
+                    latencies = []
+                    for _ in range(options["requests"]):
+                        start = time.perf_counter()
+                        if profile["atomic_reads"] and endpoint.startswith("GET"):
+                            with transaction.atomic():
+                                request()
+                        else:
+                            request()
+                        # the test client disconnects Django's per-request connection cleanup, run it by hand
+                        close_old_connections()
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    quantiles = statistics.quantiles(latencies, n=100)
+                    self.stdout.write(f"{name:>8} {endpoint:>18} {quantiles[49]:>8.2f} {quantiles[98]:>8.2f}")
@@ -0,0 +1,84 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent HTTP requests at one or more running servers and compare requests/sec, "
+        "e.g. the same endpoint served by a WSGI server and by an ASGI server on the same box"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target", action="append", required=True, metavar="NAME=URL",
+            help="e.g. wsgi=http://127.0.0.1:8000/users/auth/login/ asgi=http://127.0.0.1:8001/async/users/auth/login/",
+        )
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--body", help="JSON request body")
+        parser.add_argument("--header", action="append", default=[], metavar="NAME:VALUE")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--duration", type=float, default=10.0, help="seconds per target")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, separator, url = target.partition("=")
+            if not separator:
+                raise CommandError(f"--target must look like NAME=URL, got {target!r}")
+            targets.append((name, url))
+
+        headers = {"Content-Type": "application/json"}
+        for header in options["header"]:
+            name, _, value = header.partition(":")
+            headers[name.strip()] = value.strip()
+        body = json.dumps(json.loads(options["body"])).encode() if options["body"] else None
+
+        self.stdout.write(f"{'target':>10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, url in targets:
+            result = self.run_target(url, options["method"], headers, body, options["concurrency"], options["duration"])
+            self.stdout.write(
+                f"{name:>10} {result['requests']:>9} {result['errors']:>7} {result['rate']:>9.1f} "
+                f"{result['p50']:>8.2f} {result['p99']:>8.2f}"
+            )
+
+    def run_target(self, url, method, headers, body, concurrency, duration):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                request = urllib.request.Request(url, data=body, headers=headers, method=method)
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request) as response:
+                        response.read()
+                    failed = False
+                except (urllib.error.URLError, OSError):
+                    failed = True
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    (errors if failed else latencies).append(elapsed)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(concurrency):
+                executor.submit(worker)
+        elapsed = time.perf_counter() - start
+
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        return {
+            "requests": len(latencies),
+            "errors": len(errors),
+            "rate": len(latencies) / elapsed,
+            "p50": quantiles[49],
+            "p99": quantiles[98],
+        }
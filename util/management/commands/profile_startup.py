@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from util.startup import boot_worker, by_app
+
+
+class Command(BaseCommand):
+    help = "Report worker boot time, RSS, and import time and memory per app for each settings profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            default=["forum_api.settings", "forum_api.settings_api"],
+            help="settings modules to boot",
+        )
+        parser.add_argument("--top", type=int, default=15, help="apps listed per profile")
+
+    def handle(self, *args, **options):
+        for profile in options["profiles"]:
+            boot = boot_worker(profile)
+            imports = by_app(boot_worker(profile, importtime=True)["import_us"])
+            memory = dict(by_app(boot_worker(profile, tracemalloc=True)["memory"]))
+
+            self.stdout.write(
+                f"{profile}: boot {boot['seconds'] * 1000:.0f}ms, "
+                f"rss {boot['rss'] / 2 ** 20:.1f}MB, {len(boot['modules'])} modules"
+            )
+            self.stdout.write(f"  {'app':<36} {'import ms':>10} {'memory KB':>10}")
+            for app, import_us in imports[:options["top"]]:
+                self.stdout.write(f"  {app:<36} {import_us / 1000:>10.1f} {memory.get(app, 0) / 1024:>10.0f}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from util.benchmark import isolated_database
+from util.testing import SIZES, discover_budgets, format_report, measure_budgets
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the queries of every method declared in an app's query_budgets module at "
+        "several input sizes n and flag the methods whose query count grows with n"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+        parser.add_argument("--only", help="only methods whose name contains this text")
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            budgets = discover_budgets()
+            if options["only"]:
+                budgets = [budget for budget in budgets if options["only"] in budget.name]
+            results = measure_budgets(budgets, sorted(options["sizes"]))
+
+        self.stdout.write(format_report(results))
+        growing = [result["name"] for result in results if result["grows"]]
+        self.stdout.write(f"\n{len(growing)} of {len(results)} method(s) grow with n")
+        failed = [result["name"] for result in results if result["failed"]]
+        if failed:
+            raise CommandError(f"over budget: {', '.join(failed)}")
@@ -0,0 +1,74 @@
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, in the style of a Prometheus histogram."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.sum, 3), "buckets": buckets}
+
+
+class MetricsRegistry:
+    """
+    Process-local counters and histograms keyed by name and label (e.g. a view
+    name), plus collectors: callables returning a dict that is read at snapshot time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = {}
+
+    def increment(self, name: str, label: str = "", value: int = 1):
+        with self._lock:
+            key = (name, label)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, label: str, value: float, buckets=DEFAULT_BUCKETS):
+        with self._lock:
+            histogram = self._histograms.get((name, label))
+            if histogram is None:
+                histogram = self._histograms[(name, label)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def register_collector(self, name: str, collector):
+        self._collectors[name] = collector
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = {}
+            for (name, label), value in self._counters.items():
+                counters.setdefault(name, {})[label] = value
+            histograms = {}
+            for (name, label), histogram in self._histograms.items():
+                histograms.setdefault(name, {})[label] = histogram.snapshot()
+        collected = {name: collector() for name, collector in self._collectors.items()}
+        return {"counters": counters, "histograms": histograms, "collectors": collected}
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,95 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .metrics import metrics
+from .queries import record_queries
+from .routers import remember_write, request_state
+
+
+class QueryMetricsMiddleware:
+    """
+    Report query count, database time and total time of every request as a
+    Server-Timing header and aggregate them per view into `util.metrics`.
+    Works for both sync and async views without adapting either.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as recorder:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            total = time.perf_counter() - start
+        self.report(request, response, recorder, total)
+        return response
+
+    async def __acall__(self, request):
+        with record_queries() as recorder:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            total = time.perf_counter() - start
+        self.report(request, response, recorder, total)
+        return response
+
+    def report(self, request, response, recorder, total: float):
+        view = self.get_view_name(request)
+        db_ms = recorder.duration * 1000
+        total_ms = total * 1000
+
+        metrics.observe("request_queries", view, recorder.count, buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500))
+        metrics.observe("request_db_ms", view, db_ms)
+        metrics.observe("request_total_ms", view, total_ms)
+        if recorder.duplicates:
+            metrics.increment("duplicate_queries", view, recorder.duplicates)
+
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.2f};desc="{recorder.count} queries, {recorder.duplicates} duplicates", '
+            f'total;dur={total_ms:.2f}'
+        )
+
+    def get_view_name(self, request) -> str:
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return match.view_name or match._func_path
+
+
+class ReplicaMiddleware:
+    """
+    Give every request its own ReplicaState for `util.routers.ReplicaRouter`
+    and, when the request wrote, keep its user reading from the primary for
+    REPLICAS["STICKY_SECONDS"] so they see their own writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_state() as state:
+            response = self.get_response(request)
+        if state.sticky:
+            remember_write(state)
+        return response
+
+    async def __acall__(self, request):
+        with request_state() as state:
+            response = await self.get_response(request)
+        if state.sticky:
+            await sync_to_async(remember_write)(state)
+        return response
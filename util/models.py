@@ -1,8 +1,102 @@
-from django.db import models
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, models, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class BaseQuerySet(models.QuerySet):
+    """Stamps `updated_at` on every write path that bypasses `BaseModel.save`."""
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = list(fields)
+        if 'updated_at' not in fields:
+            fields.append('updated_at')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def changed_since(self, timestamp):
+        return self.filter(updated_at__gt=timestamp).order_by('updated_at', 'id')
+
+
+BaseManager = models.Manager.from_queryset(BaseQuerySet)
+
 
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = BaseManager()
 
     class Meta:
         abstract = True
+
+    def save(self, *args, **kwargs):
+        self.updated_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'updated_at' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['updated_at']
+        super().save(*args, **kwargs)
+
+
+# allocations made inside a transaction commit on these threads' own connections
+_allocator = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sequence')
+
+
+class Sequence(models.Model):
+    """
+    Named counter on the primary database that hands out ids unique across
+    databases, for rows that are spread over several of them.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, name: str, count: int, get_initial=lambda: 0) -> range:
+        """
+        Reserve the next `count` values of `name`. A new sequence starts
+        after `get_initial()`, e.g. the largest id already in use.
+
+        Like a PostgreSQL sequence, values are committed at once, so a caller
+        that rolls back leaves a gap instead of handing them out again: inside
+        a transaction they are allocated on another connection. SQLite has one
+        writer, which the caller's transaction holds, so there the values
+        commit or roll back with the caller.
+        """
+        using = router.db_for_write(cls)
+        connection = connections[using]
+        if connection.in_atomic_block and connection.vendor != 'sqlite':
+            return _allocator.submit(cls.allocate_on_own_connection, using, name, count, get_initial).result()
+        return cls.allocate_now(using, name, count, get_initial)
+
+    @classmethod
+    def allocate_on_own_connection(cls, using: str, name: str, count: int, get_initial) -> range:
+        try:
+            return cls.allocate_now(using, name, count, get_initial)
+        finally:
+            for connection in connections.all(initialized_only=True):
+                connection.close_if_unusable_or_obsolete()
+
+    @classmethod
+    def allocate_now(cls, using: str, name: str, count: int, get_initial) -> range:
+        with transaction.atomic(using=using):
+            # `defaults` values are only called when the row is created
+            sequence, _ = cls.objects.using(using).select_for_update().get_or_create(
+                name=name, defaults={'value': get_initial},
+            )
+            cls.objects.using(using).filter(name=name).update(value=F('value') + count)
+        return range(sequence.value + 1, sequence.value + count + 1)
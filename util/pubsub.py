@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SlowConsumer(Exception):
+    """The subscriber fell `max_size` messages behind and was dropped."""
+
+
+class Subscription:
+    """
+    One subscriber's bounded buffer, owned by the event loop it was created on.
+    Messages are only appended on that loop, so the buffer needs no lock.
+    """
+
+    def __init__(self, hub, topic: str, max_size: int):
+        self.hub = hub
+        self.topic = topic
+        self.max_size = max_size
+        self.loop = asyncio.get_running_loop()
+        self.buffer = deque()
+        self.dropped = False
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def deliver(self, message):
+        if self.closed:
+            return
+        if len(self.buffer) >= self.max_size:
+            # a consumer that cannot keep up is cut off instead of buffering without bound
+            self.dropped = True
+            self.buffer.clear()
+            self.close()
+            metrics.increment("pubsub_dropped")
+        else:
+            self.buffer.append(message)
+        self._ready.set()
+
+    async def get(self, timeout: float = None):
+        """Next message, or None after `timeout` seconds without one. Raises SlowConsumer once dropped."""
+        while not self.buffer:
+            if self.dropped:
+                raise SlowConsumer()
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.buffer.popleft()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self)
+
+
+class Hub:
+    """
+    In-process publish/subscribe by topic. `publish` goes through the configured
+    PUBSUB backend so other processes see the message too; the backend calls
+    `deliver` on every node, which hands the message to each local subscriber on
+    its own event loop. Publishing is safe from any thread.
+    """
+
+    def __init__(self):
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            options = settings.PUBSUB
+            self._backend = import_string(options['BACKEND'])(self, **options.get('OPTIONS', {}))
+        return self._backend
+
+    def subscribe(self, topic: str, max_size: int = None) -> Subscription:
+        """Subscribe the running event loop to `topic`; call `close()` on the result when done."""
+        subscription = Subscription(self, topic, max_size or settings.PUBSUB['BUFFER_SIZE'])
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        self.backend.subscribed(topic)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[subscription.topic]
+
+    def publish(self, topic: str, message):
+        self.backend.publish(topic, message)
+
+    def deliver(self, topic: str, message):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for subscription in subscribers:
+            if subscription.loop is current:
+                subscription.deliver(message)
+            elif not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "topics": len(self._topics),
+                "subscriptions": sum(len(subscribers) for subscribers in self._topics.values()),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._topics.clear()
+
+
+class LocalBackend:
+    """Deliver within this process only: enough for a single ASGI process."""
+
+    def __init__(self, hub: Hub):
+        self.hub = hub
+
+    def subscribed(self, topic: str):
+        pass
+
+    def publish(self, topic: str, message):
+        self.hub.deliver(topic, message)
+
+
+class RedisBackend:
+    """
+    Fan messages out to every process through Redis pub/sub (needs the `redis`
+    package). Each process runs one listener thread on a pattern subscription
+    and delivers what it receives to its local hub.
+    """
+
+    def __init__(self, hub: Hub, location: str, prefix: str = 'pubsub:'):
+        import redis
+
+        self.hub = hub
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(location)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def subscribed(self, topic: str):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self.listen, name='pubsub-listener', daemon=True)
+                self._listener.start()
+
+    def publish(self, topic: str, message):
+        self.client.publish(f'{self.prefix}{topic}', json.dumps(message, cls=DjangoJSONEncoder))
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f'{self.prefix}*')
+                for item in pubsub.listen():
+                    topic = item['channel'].decode()[len(self.prefix):]
+                    self.hub.deliver(topic, json.loads(item['data']))
+            except Exception:
+                # messages published while reconnecting are lost; streams resume from the change feed
+                logger.warning("pub/sub listener failed, reconnecting", exc_info=True)
+                time.sleep(1)
+
+
+hub = Hub()
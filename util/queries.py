@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_recorders = ContextVar('query_recorders', default=())
+
+
+class QueryRecorder:
+    """Query count, database time and repeated statements seen while the recorder is active."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = {}
+
+    @property
+    def duplicates(self) -> int:
+        """Queries that repeated an earlier statement, the signature of an N+1 loop."""
+        return sum(count - 1 for count in self.fingerprints.values())
+
+    def most_repeated(self):
+        if not self.fingerprints:
+            return None
+        sql, count = max(self.fingerprints.items(), key=lambda item: item[1])
+        return sql if count > 1 else None
+
+    def record(self, sql: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        # parameters are passed separately, so the SQL text already is the statement's fingerprint
+        self.fingerprints[sql] = self.fingerprints.get(sql, 0) + 1
+
+
+@contextmanager
+def record_queries():
+    """
+    Record every query issued in the current context. Recorders live in a
+    ContextVar, so they also follow queries that async views run through
+    sync_to_async on another thread, and nested recorders all see each query.
+    """
+    recorder = QueryRecorder()
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.record(sql, duration)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Add `record_query` to the execute wrappers of every new connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,100 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = ContextVar('replica_state', default=None)
+
+
+class ReplicaState:
+    """Routing state of one request: who is asking and whether reads must stay on the primary."""
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+        self.user_id = None
+
+    @property
+    def sticky(self) -> bool:
+        """Whether the request's user must keep reading from the primary after it."""
+        return self.wrote and self.user_id is not None and bool(settings.REPLICAS['ALIASES'])
+
+
+def get_sticky_key(user_id) -> str:
+    return f'replica-sticky:{user_id}'
+
+
+def set_user(user_id):
+    """
+    Identify the request's user. A user who wrote within the last
+    REPLICAS["STICKY_SECONDS"] reads from the primary for this request, so
+    they see their own writes however far the replicas lag.
+    """
+    state = _state.get()
+    if state is None or not settings.REPLICAS['ALIASES'] or state.user_id == user_id:
+        return
+    state.user_id = user_id
+    if not state.pinned:
+        state.pinned = caches[settings.REPLICAS['CACHE_ALIAS']].get(get_sticky_key(user_id)) is not None
+
+
+def remember_write(state: ReplicaState):
+    """Keep the user of a request that wrote on the primary for the next STICKY_SECONDS."""
+    options = settings.REPLICAS
+    caches[options['CACHE_ALIAS']].set(get_sticky_key(state.user_id), 1, timeout=options['STICKY_SECONDS'])
+
+
+@contextmanager
+def request_state():
+    """Route the queries of one request with their own ReplicaState."""
+    state = ReplicaState()
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside this block, e.g. right after writing outside a transaction."""
+    token = _state.set(ReplicaState(pinned=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send reads to a random replica in REPLICAS["ALIASES"] and writes to the
+    primary (`default`). Reads stay on the primary inside a transaction, so
+    ATOMIC_REQUESTS views and `transaction.atomic()` blocks see one consistent
+    database, and for the rest of a request once it has written.
+    """
+
+    def db_for_read(self, model, **hints):
+        aliases = settings.REPLICAS['ALIASES']
+        if not aliases or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is not None and state.pinned:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the primary's rows, so objects read from any of them may be related
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICAS['ALIASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Runs in a fresh interpreter: boots a WSGI worker the way gunicorn does, also
+# loads the URLconf (which a worker otherwise does on its first request) and
+# prints what it cost as JSON.
+BOOT_SCRIPT = """
+import json, os, resource, sys, time
+
+start = time.perf_counter()
+trace = sys.argv[2] == "1"
+if trace:
+    import tracemalloc
+    tracemalloc.start()
+
+os.environ["DJANGO_SETTINGS_MODULE"] = sys.argv[1]
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+seconds = time.perf_counter() - start
+
+try:
+    # current RSS: on Linux ru_maxrss carries over the parent's peak across exec
+    with open("/proc/self/statm") as statm:
+        rss = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        rss *= 1024
+result = {"seconds": seconds, "rss": rss, "modules": sorted(sys.modules)}
+
+if trace:
+    files = {getattr(module, "__file__", None): name for name, module in list(sys.modules.items())}
+    memory = {}
+    for stat in tracemalloc.take_snapshot().statistics("filename"):
+        name = files.get(stat.traceback[0].filename, "<other>")
+        memory[name] = memory.get(name, 0) + stat.size
+    result["memory"] = memory
+
+print(json.dumps(result))
+"""
+
+
+def boot_worker(settings_module: str, importtime: bool = False, tracemalloc: bool = False) -> dict:
+    """
+    Boot a worker for `settings_module` in a subprocess and return its boot
+    `seconds`, `rss` in bytes and loaded `modules`. `importtime` adds the
+    self import time per module in microseconds (`-X importtime`), `tracemalloc`
+    the bytes still allocated per module; both slow the boot they measure.
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", BOOT_SCRIPT, settings_module, "1" if tracemalloc else "0"]
+
+    env = {key: value for key, value in os.environ.items() if key != "DJANGO_SETTINGS_MODULE"}
+    process = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"booting {settings_module} failed:\n{process.stderr}")
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    if importtime:
+        result["import_us"] = parse_importtime(process.stderr)
+    return result
+
+
+def parse_importtime(output: str) -> dict:
+    # lines look like "import time:       123 |        456 |   django.urls.base"
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def app_of(module: str) -> str:
+    """Group a module under its app: `django.contrib.admin.sites` -> `django.contrib.admin`."""
+    parts = module.split(".")
+    if parts[:2] == ["django", "contrib"]:
+        return ".".join(parts[:3])
+    if parts[0] == "django":
+        return ".".join(parts[:2])
+    return parts[0]
+
+
+def by_app(values: dict) -> list:
+    """Sum per-module values per app, largest first."""
+    totals = {}
+    for module, value in values.items():
+        app = app_of(module)
+        totals[app] = totals.get(app, 0) + value
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,105 @@
+import asyncio
+from contextlib import contextmanager
+from importlib import import_module
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.db import transaction
+from django.utils.module_loading import module_has_submodule
+
+from .queries import record_queries
+
+SIZES = (1, 10, 50)
+
+
+class QueryBudget:
+    """
+    Query budget of one method as a function of its input size n. `setup(n)`
+    builds the call's arguments outside the measurement and returns them as a
+    tuple; `call(*arguments)` is measured and may issue at most
+    `constant + per_item * n` queries. Coroutine functions are run with
+    async_to_sync. A budget with `per_item=0` also fails if its count grows with n.
+    """
+
+    def __init__(self, name: str, setup, call, constant: int, per_item: int = 0):
+        self.name = name
+        self.setup = setup
+        self.call = call
+        self.constant = constant
+        self.per_item = per_item
+
+    def allowed(self, n: int) -> int:
+        return self.constant + self.per_item * n
+
+    def count(self, n: int) -> int:
+        call = async_to_sync(self.call) if asyncio.iscoroutinefunction(self.call) else self.call
+        # inside a transaction, as in a test or an ATOMIC_REQUESTS view, so no BEGIN is counted
+        with transaction.atomic():
+            arguments = self.setup(n)
+            with record_queries() as recorder:
+                call(*arguments)
+        return recorder.count
+
+    def measure(self, sizes=SIZES) -> dict:
+        counts = {n: self.count(n) for n in sizes}
+        grows = counts[sizes[-1]] > counts[sizes[0]]
+        over = any(counts[n] > self.allowed(n) for n in sizes)
+        return {
+            "name": self.name,
+            "counts": counts,
+            "allowed": {n: self.allowed(n) for n in sizes},
+            "grows": grows,
+            "failed": over or (grows and not self.per_item),
+        }
+
+
+def measure_budgets(budgets: list, sizes=SIZES) -> list:
+    return [budget.measure(sizes) for budget in budgets]
+
+
+def format_report(results: list) -> str:
+    """One line per method: queries at each n against the budget, flagging growth with n."""
+    sizes = list(results[0]["counts"]) if results else []
+    width = max([len("method")] + [len(result["name"]) for result in results])
+    header = f"{'method':<{width}} " + " ".join(f"{f'n={n}':>9}" for n in sizes)
+    lines = [header]
+    for result in results:
+        cells = " ".join(f"{'%d/%d' % (result['counts'][n], result['allowed'][n]):>9}" for n in sizes)
+        flags = []
+        if result["grows"]:
+            flags.append("GROWS WITH n")
+        if result["failed"]:
+            flags.append("FAILED")
+        lines.append(f"{result['name']:<{width}} {cells}  {', '.join(flags)}".rstrip())
+    return "\n".join(lines)
+
+
+def discover_budgets() -> list:
+    """Collect `BUDGETS` from the `query_budgets` module of every installed app."""
+    budgets = []
+    for app_config in apps.get_app_configs():
+        if module_has_submodule(app_config.module, "query_budgets"):
+            module = import_module(f"{app_config.name}.query_budgets")
+            budgets.extend(module.BUDGETS)
+    return budgets
+
+
+class QueryBudgetMixin:
+    """TestCase mixin that fails when a block issues more queries than it is allowed."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget: int, name: str = "block"):
+        with record_queries() as recorder:
+            yield recorder
+        if recorder.count > budget:
+            details = f"{recorder.count} queries, budget is {budget}"
+            repeated = recorder.most_repeated()
+            if repeated:
+                details += f"; most repeated statement ({recorder.fingerprints[repeated]}x): {repeated}"
+            self.fail(f"{name} exceeded its query budget: {details}")
+
+    def assertQueryBudgets(self, budgets: list, sizes=SIZES):
+        """Measure every QueryBudget at each size and fail with the full report if one is exceeded."""
+        results = measure_budgets(budgets, sizes)
+        if any(result["failed"] for result in results):
+            self.fail("query budgets exceeded (queries/allowed):\n" + format_report(results))
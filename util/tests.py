@@ -1,3 +1,323 @@
-from django.test import TestCase
+import asyncio
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.viewsets import ViewSet
+
+from forum.async_views import stream_events
+from forum.models import Forum, ForumEvent
+from user.cache import active_users
+from .metrics import Histogram, metrics
+from .pubsub import Hub, SlowConsumer
+from .queries import record_queries
+from .routers import ReplicaRouter, get_sticky_key, remember_write, request_state, set_user, use_primary
+from .startup import boot_worker, by_app, parse_importtime
+from .testing import QueryBudget, QueryBudgetMixin, format_report, measure_budgets
+from .views import NonAtomicReadMixin
+
+User = get_user_model()
+
+
+class AtomicProbeView(NonAtomicReadMixin, ViewSet):
+    permission_classes = ()
+    authentication_classes = ()
+
+    def list(self, request):
+        return Response({"atomic": connection.in_atomic_block})
+
+    def create(self, request):
+        return Response({"atomic": connection.in_atomic_block})
+
+
+class NonAtomicReadMixinTest(TransactionTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = AtomicProbeView.as_view({'get': 'list', 'post': 'create'})
+
+    def test_view_opts_out_of_atomic_requests(self):
+        self.assertEqual(self.view._non_atomic_requests, {'default'})
+
+    def test_read_runs_outside_transaction(self):
+        response = self.view(self.factory.get('/'))
+
+        self.assertFalse(response.data["atomic"])
+
+    def test_write_runs_inside_transaction(self):
+        response = self.view(self.factory.post('/'))
+
+        self.assertTrue(response.data["atomic"])
+
+
+class ConfigureSQLiteTest(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA cache_size')
+            cache_size = cursor.fetchone()[0]
+
+        self.assertEqual(synchronous, 1) # NORMAL
+        self.assertEqual(cache_size, -64000)
+
+
+class QueryMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.user = User.register("Test User", "test", "password")
+        self.headers = {"HTTP_AUTHORIZATION": f'Bearer {self.user.generate_token()["access"]}'}
+
+    def test_server_timing_header(self):
+        response = self.client.get('/forums/', **self.headers)
+
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn('total;dur=', response["Server-Timing"])
+
+    def test_request_metrics_are_aggregated_per_view(self):
+        self.client.get('/forums/', **self.headers)
+        self.client.get('/forums/', **self.headers)
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot["histograms"]["request_total_ms"]["forum:forum-list"]["count"], 2)
+
+    def test_metrics_api_requires_staff(self):
+        response = self.client.get('/metrics/', **self.headers)
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_metrics_api(self):
+        self.user.is_staff = True
+        self.user.save()
+        headers = {"HTTP_AUTHORIZATION": f'Bearer {self.user.generate_token()["access"]}'}
+
+        response = self.client.get('/metrics/', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("active_user_cache", response.json()["collectors"])
+
+
+class QueryRecorderTest(QueryBudgetMixin, TestCase):
+    def test_record_queries_counts_duplicates(self):
+        with record_queries() as recorder:
+            for _ in range(3):
+                list(User.objects.filter(username="test"))
+
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.duplicates, 2)
+
+    def test_query_budget_fails_when_exceeded(self):
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(1):
+                list(User.objects.all())
+                list(User.objects.all())
+
+    def test_query_budget_passes_within_budget(self):
+        with self.assertQueryBudget(1):
+            list(User.objects.all())
+
+    def test_query_budgets_flag_growth_with_n(self):
+        def load_one_by_one(ids):
+            return [User.objects.get(id=id) for id in ids]
+
+        names = iter(range(100))
+
+        def setup(n):
+            users = User.objects.bulk_create(User(username=f"budget{next(names)}") for _ in range(n))
+            return ([user.id for user in users],)
+
+        constant = QueryBudget("load_one_by_one", setup, load_one_by_one, constant=1)
+        linear = QueryBudget("load_one_by_one (linear)", setup, load_one_by_one, constant=0, per_item=1)
+        results = measure_budgets([constant, linear], sizes=(1, 3))
+        report = format_report(results)
+
+        self.assertEqual(results[0]["counts"], {1: 1, 3: 3})
+        self.assertTrue(results[0]["failed"])
+        self.assertTrue(results[1]["grows"])
+        self.assertFalse(results[1]["failed"])
+        self.assertEqual(report.splitlines()[1].split(), ["load_one_by_one", "1/1", "3/1", "GROWS", "WITH", "n,", "FAILED"])
+        with self.assertRaises(AssertionError):
+            self.assertQueryBudgets([constant], sizes=(1, 3))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram(buckets=(1, 10))
+        for value in (0.5, 5, 50):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.snapshot()["buckets"], {"1": 1, "10": 2, "+Inf": 3})
+
+
+class HubTest(SimpleTestCase):
+    def setUp(self):
+        self.hub = Hub()
+
+    async def test_publish_reaches_topic_subscribers(self):
+        subscription = self.hub.subscribe("forum:1")
+        other = self.hub.subscribe("forum:2")
+        self.hub.publish("forum:1", {"id": 1})
+
+        self.assertEqual(await subscription.get(timeout=1), {"id": 1})
+        self.assertIsNone(await other.get(timeout=0.01))
+        self.assertEqual(self.hub.stats(), {"topics": 2, "subscriptions": 2})
+
+        subscription.close()
+        other.close()
+        self.assertEqual(self.hub.stats(), {"topics": 0, "subscriptions": 0})
+
+    async def test_slow_consumer_is_dropped(self):
+        subscription = self.hub.subscribe("forum:1", max_size=2)
+        for number in range(3):
+            self.hub.publish("forum:1", {"id": number})
+
+        with self.assertRaises(SlowConsumer):
+            await subscription.get(timeout=1)
+        self.assertEqual(self.hub.stats()["subscriptions"], 0)
+
+
+@override_settings(REPLICAS={**settings.REPLICAS, 'ALIASES': ['replica']})
+class ReplicaRouterTest(TransactionTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def tearDown(self):
+        cache.delete(get_sticky_key(1))
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(User), 'replica')
+        self.assertEqual(self.router.db_for_write(User), DEFAULT_DB_ALIAS)
+
+    def test_reads_inside_transaction_go_to_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_request_reads_from_primary_after_writing(self):
+        with request_state():
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+            self.router.db_for_write(User)
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(User), 'replica')
+
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_user_who_wrote_sticks_to_primary(self):
+        with request_state() as state:
+            set_user(1)
+            self.router.db_for_write(User)
+        self.assertTrue(state.sticky)
+        remember_write(state)
+
+        with request_state():
+            set_user(1)
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+        with request_state():
+            set_user(2)
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+
+        cache.delete(get_sticky_key(1))
+        with request_state():
+            set_user(1)
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+
+    def test_reads_without_writes_are_not_sticky(self):
+        with request_state() as state:
+            set_user(1)
+            self.router.db_for_read(User)
+
+        self.assertFalse(state.sticky)
+
+
+def get_separate_replicas() -> list:
+    return [alias for alias in settings.REPLICAS['ALIASES'] if not connections[alias].settings_dict['TEST']['MIRROR']]
+
+
+@skipUnless(get_separate_replicas(), "needs DB_REPLICAS pointing at a separate SQLite file")
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    End to end over two SQLite files, a stand-in primary and replica:
+    DB_REPLICAS=replica.sqlite3 python manage.py test util.tests.ReplicaRoutingTest
+    Nothing copies rows to the replica, so a response shows which database answered.
+    """
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.register("Test User", "test", "password")
+        self.participant = User.register("user 0", "user0", "password")
+        self.headers = {"HTTP_AUTHORIZATION": f'Bearer {self.user.generate_token()["access"]}'}
+        self.participant_headers = {
+            "HTTP_AUTHORIZATION": f'Bearer {self.participant.generate_token()["access"]}'
+        }
+
+    def tearDown(self):
+        cache.clear()
+        active_users.clear()
+
+    def get_inbox(self, headers) -> list:
+        response = self.client.get('/forums/inbox/', **headers)
+        return [item["forum"]["topic"] for item in response.json()["results"]]
+
+    def test_reads_go_to_replica_until_user_writes(self):
+        self.assertEqual(self.get_inbox(self.headers), [])
+
+        response = self.client.post(
+            '/forums/',
+            {"topic": "testing", "participants": [self.participant.id]},
+            content_type='application/json',
+            **self.headers,
+        )
+        self.assertEqual(response.status_code, 201)
+
+        # the writer reads its own forum from the primary, everyone else still reads the replica
+        self.assertEqual(self.get_inbox(self.headers), ["testing"])
+        self.assertEqual(self.get_inbox(self.participant_headers), [])
+
+        cache.delete(get_sticky_key(self.user.id))
+        self.assertEqual(self.get_inbox(self.headers), [])
+
+    def test_active_user_cache_fills_from_primary(self):
+        self.assertEqual(User.get_active_user(self.participant.id), self.participant)
+        active_users.clear()
+        self.assertEqual(User.get_active_users([self.user.id, self.participant.id]), [self.user, self.participant])
+
+    async def test_stream_replays_from_primary(self):
+        forum = await sync_to_async(Forum.create_forum)("testing", None, self.user, [self.participant.id])
+
+        events = stream_events(forum.id, after=0)
+        chunk = await asyncio.wait_for(events.__anext__(), 5)
+        await events.aclose()
+
+        self.assertIn(f"event: {ForumEvent.FORUM_CREATED}", chunk)
+
+
+class StartupBudgetTest(SimpleTestCase):
+    def test_api_worker_boots_within_budget(self):
+        boot = boot_worker('forum_api.settings_api')
+
+        self.assertLess(boot["seconds"], settings.STARTUP_BUDGET["SECONDS"])
+        self.assertLess(boot["rss"] / 2 ** 20, settings.STARTUP_BUDGET["RSS_MB"])
+        # DRF's schema generator still imports django.contrib.admin itself, but
+        # the admin app, its autodiscovery and the browser middleware stay out
+        for module in ('user.admin', 'django.contrib.sessions', 'django.contrib.staticfiles', 'django.contrib.messages.middleware'):
+            self.assertNotIn(module, boot["modules"])
+        self.assertIn('forum.views', boot["modules"])
+
+    def test_import_times_are_grouped_per_app(self):
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |     django.contrib.admin.sites",
+            "import time:        50 |        150 |   django.contrib.admin",
+            "import time:        30 |         30 |   django.db.models.base",
+            "import time:        20 |         20 | forum.models",
+        ])
+
+        self.assertEqual(by_app(parse_importtime(output)), [
+            ("django.contrib.admin", 150),
+            ("django.db", 30),
+            ("forum", 20),
+        ])
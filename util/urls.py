@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = 'util'
+
+urlpatterns = [
+    path('', views.MetricsView.as_view(), name='metrics'),
+]
@@ -0,0 +1,110 @@
+import json
+from contextlib import ExitStack
+from functools import wraps
+
+from django.db import connections, transaction
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import metrics
+
+
+def atomic_request_aliases() -> list:
+    return [alias for alias in connections if connections.settings[alias].get('ATOMIC_REQUESTS')]
+
+
+class NonAtomicReadMixin:
+    """
+    Opt a DRF view out of ATOMIC_REQUESTS for safe methods. GET/HEAD/OPTIONS run
+    in autocommit without BEGIN/COMMIT round-trips, while every other method
+    still runs inside one transaction per ATOMIC_REQUESTS database.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        for alias in atomic_request_aliases():
+            view = transaction.non_atomic_requests(using=alias)(view)
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with ExitStack() as stack:
+            for alias in atomic_request_aliases():
+                stack.enter_context(transaction.atomic(using=alias))
+            return super().dispatch(request, *args, **kwargs)
+
+
+def async_api_view(view):
+    """
+    Wrap a native async view so it behaves like the DRF views next to it:
+    exempt from CSRF (token authenticated), excluded from ATOMIC_REQUESTS
+    (which Django refuses for async views) and rendering APIException
+    as the same JSON error bodies.
+    """
+
+    @transaction.non_atomic_requests
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            if isinstance(exc.detail, (list, dict)):
+                data = exc.detail
+            else:
+                data = {"detail": exc.detail}
+            response = JsonResponse(data, status=exc.status_code, safe=False)
+            if getattr(exc, "auth_header", None):
+                response["WWW-Authenticate"] = exc.auth_header
+            if getattr(exc, "wait", None) is not None:
+                response["Retry-After"] = "%d" % exc.wait
+            return response
+
+    # django.views.decorators.csrf.csrf_exempt only wraps sync views in Django 4.2
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def conditional_response(request, etag: str, last_modified):
+    """
+    Evaluate the request's preconditions against `etag` and `last_modified`.
+    Returns a 304 (or 412) response when the client's copy is still fresh,
+    otherwise None so the view goes on to build the full body.
+    """
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=int(last_modified.timestamp()),
+    )
+    if response is not None and response.status_code == 304:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag: str, last_modified):
+    response["ETag"] = quote_etag(etag)
+    response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def get_json_body(request) -> dict:
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ParseError()
+    if not isinstance(data, dict):
+        raise ParseError()
+    return data
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(metrics.snapshot())